@@ -12,6 +12,8 @@ if sys.platform == 'win32':
 
 from src.config import config
 from src.rag.document_loader import DocumentLoader
+from src.rag.embeddings import LazyEmbeddings, create_embeddings
+from src.rag.service import RetrievalClient
 from src.rag.vector_store import VectorStore
 from src.orchestrator_dynamic import DynamicMultiAgentOrchestrator
 
@@ -33,10 +35,42 @@ def initialize_system():
         print("\n💡 Crea un archivo .env basado en env.example")
         sys.exit(1)
     
+    # Servicio de búsqueda compartido: el modelo y el índice viven en otro proceso
+    if config.RETRIEVAL_SERVICE_URL:
+        print(f"🛰️ Usando el servicio de búsqueda en {config.RETRIEVAL_SERVICE_URL}")
+        try:
+            return RetrievalClient(
+                config.RETRIEVAL_SERVICE_URL,
+                timeout=config.RETRIEVAL_SERVICE_TIMEOUT
+            ).load_vectorstore()
+        except (OSError, ValueError) as e:
+            print(f"❌ No se pudo conectar con el servicio de búsqueda: {e}")
+            print("💡 Inícialo con: python scripts/retrieval_server.py")
+            sys.exit(1)
+    
+    # Snapshot del índice: arranque con un memory-map, el modelo carga en segundo plano
+    if config.SNAPSHOT_PATH and os.path.exists(config.SNAPSHOT_PATH):
+        print(f"📦 Snapshot del índice encontrado: {config.SNAPSHOT_PATH}")
+        vector_store = VectorStore(embeddings=LazyEmbeddings(create_embeddings))
+        try:
+            vector_store.load_snapshot(config.SNAPSHOT_PATH)
+        except ValueError as e:
+            print(f"❌ Error cargando el snapshot: {e}")
+            sys.exit(1)
+        return vector_store
+    
     # Verificar si existe el vectorstore
-    if os.path.exists(config.CHROMA_DIR):
+    if os.path.exists(config.INDEX_DIR):
         print("📦 Vectorstore existente encontrado")
-        response = input("¿Deseas recargar los productos? (s/n): ").lower()
+        response = input(
+            "¿Deseas recargar los productos? (s = todo / i = solo cambios / n): "
+        ).lower()
+        
+        if response == 'i':
+            print("🔄 Sincronizando solo archivos nuevos o modificados...")
+            vector_store = VectorStore()
+            vector_store.sync_vectorstore(config.PRODUCTS_DIR)
+            return vector_store
         
         if response != 's':
             print("✓ Usando vectorstore existente")
@@ -52,6 +86,19 @@ def initialize_system():
         print("💡 Crea el directorio y añade archivos de productos")
         sys.exit(1)
     
+    if config.INGEST_STREAMING:
+        print("🔮 Cargando e indexando en streaming...")
+        vector_store = VectorStore()
+        
+        try:
+            vector_store.create_vectorstore_streaming(config.PRODUCTS_DIR)
+            print("✓ Vectorstore creado exitosamente")
+        except Exception as e:
+            print(f"❌ Error creando vectorstore: {e}")
+            sys.exit(1)
+        
+        return vector_store
+    
     loader = DocumentLoader()
     
     try:
@@ -0,0 +1,157 @@
+"""
+Barrido de parámetros HNSW: recall@k frente a la búsqueda exacta y latencia
+
+Construye el índice HNSW con cada combinación de M y ef_construction y
+mide, para cada ef_search, el recall@k respecto al top-k exacto de NumPy
+y la latencia p50/p99. Sirve para elegir HNSW_M, HNSW_EF_CONSTRUCTION y
+HNSW_EF_SEARCH según el recall mínimo aceptable.
+
+Por defecto usa los embeddings reales del catálogo, leídos del snapshot de
+scripts/export_snapshot.py (SNAPSHOT_PATH o data/index.snapshot): las
+consultas son chunks del catálogo apartados del índice, así que el recall
+refleja la distribución real de los vectores y no hace falta el modelo de
+embeddings. Con un número en lugar de la ruta usa ese número de vectores
+aleatorios normalizados, útil solo para medir a escala mayor que el
+catálogo (el recall sobre datos uniformes subestima el real).
+
+Uso:
+    python scripts/benchmark_ann.py [ruta_snapshot | num_chunks_aleatorios] [num_consultas] [k]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.config import config
+from src.rag.hnsw_index import HnswVectorStore
+from src.rag.numpy_index import NumpyVectorStore
+from src.rag.snapshot import Snapshot
+
+
+DIM = 384
+M_VALUES = (8, 16, 32)
+EF_CONSTRUCTION_VALUES = (100, 200)
+EF_SEARCH_VALUES = (10, 50, 100, 200)
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Devuelve los embeddings ya calculados de los textos del benchmark"""
+
+    def __init__(self, texts, vectors: np.ndarray):
+        self._vectors = {text: vector for text, vector in zip(texts, vectors)}
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vectors[text].tolist()
+
+
+def catalog_vectors(path: str):
+    """Textos y vectores del catálogo guardados en un snapshot"""
+    snapshot = Snapshot(path, verify=False)
+    return list(snapshot.texts), np.array(snapshot.vectors, dtype=np.float32)
+
+
+def random_unit_vectors(count: int, seed: int) -> np.ndarray:
+    """Vectores aleatorios con norma L2 = 1"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def search_all(store, queries, k: int):
+    """Devuelve (filas encontradas por consulta, latencias en ms)"""
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.similarity_search_with_score(query, k=k)
+        timings.append((time.perf_counter() - start) * 1000)
+        results.append({doc.metadata["row"] for doc, _ in hits})
+    return results, timings
+
+
+def recall(expected, actual, k: int) -> float:
+    """Fracción media del top-k exacto recuperada"""
+    return float(np.mean([len(e & a) / k for e, a in zip(expected, actual)]))
+
+
+def main():
+    """Ejecuta el barrido"""
+    source = sys.argv[1] if len(sys.argv) > 1 else (
+        config.SNAPSHOT_PATH or os.path.join(config.DATA_DIR, "index.snapshot")
+    )
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print("=" * 60)
+    print("⏱️ Barrido de parámetros HNSW")
+    print("=" * 60)
+
+    if source.isdigit():
+        count = int(source)
+        texts = [f"Producto {i}" for i in range(count + num_queries)]
+        vectors = np.concatenate([random_unit_vectors(count, seed=0), random_unit_vectors(num_queries, seed=1)])
+        query_rows = np.arange(count, count + num_queries)
+        print(f"📄 {count} vectores aleatorios", end="")
+    else:
+        if not os.path.exists(source):
+            print(f"❌ No existe el snapshot {source}: créalo con python scripts/export_snapshot.py")
+            sys.exit(1)
+        texts, vectors = catalog_vectors(source)
+        # Las consultas son chunks del catálogo que se apartan del índice
+        num_queries = min(num_queries, len(texts) // 2)
+        query_rows = np.random.default_rng(1).choice(len(texts), size=num_queries, replace=False)
+        print(f"📄 {len(texts) - num_queries} chunks del catálogo ({source})", end="")
+
+    is_query = np.zeros(len(texts), dtype=bool)
+    is_query[query_rows] = True
+    rows = np.flatnonzero(~is_query)
+    queries = [texts[row] for row in query_rows]
+    ids = [f"chunk-{row}" for row in rows]
+    indexed_texts = [texts[row] for row in rows]
+    metadatas = [{"source": "benchmark", "row": int(row)} for row in rows]
+    embeddings = PrecomputedEmbeddings(texts, vectors)
+    print(f", dimensión {vectors.shape[1]}, {num_queries} consultas, k={k}\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exact = NumpyVectorStore(os.path.join(tmp, "numpy"), embeddings)
+        exact.add_embeddings(ids, indexed_texts, vectors[rows], metadatas)
+        expected, timings = search_all(exact, queries, k)
+        print(f"{'Exacto (NumPy)':<28} recall 100.0%   p50 {np.percentile(timings, 50):7.3f} ms   "
+              f"p99 {np.percentile(timings, 99):7.3f} ms\n")
+
+        for m in M_VALUES:
+            for ef_construction in EF_CONSTRUCTION_VALUES:
+                store = HnswVectorStore(
+                    os.path.join(tmp, f"hnsw-{m}-{ef_construction}"),
+                    embeddings,
+                    m=m,
+                    ef_construction=ef_construction
+                )
+                store.add_embeddings(ids, indexed_texts, vectors[rows], metadatas)
+
+                start = time.perf_counter()
+                store._ensure_index()
+                build_time = time.perf_counter() - start
+                print(f"M={m}, ef_construction={ef_construction}: construido en {build_time:.1f}s")
+
+                for ef_search in EF_SEARCH_VALUES:
+                    store.ef_search = ef_search
+                    search_all(store, queries[:10], k)  # Calentamiento
+                    actual, timings = search_all(store, queries, k)
+                    print(
+                        f"  ef_search={ef_search:<4}{'':<12} recall {recall(expected, actual, k):6.1%}   "
+                        f"p50 {np.percentile(timings, 50):7.3f} ms   p99 {np.percentile(timings, 99):7.3f} ms"
+                    )
+                print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark de codificación de embeddings en CPU (chunks/s)
+
+Compara la configuración original (HuggingFaceEmbeddings, un proceso,
+lote por defecto) con BatchedEmbeddings sobre el catálogo de
+data/products replicado N veces.
+
+Uso:
+    python scripts/benchmark_embeddings.py [replicas] [batch_size] [workers]
+"""
+import os
+import sys
+import time
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.rag.document_loader import DocumentLoader
+from src.rag.embeddings import BatchedEmbeddings
+from src.config import config
+
+
+def load_chunks(replicas: int):
+    """Carga el catálogo de ejemplo, lo divide en chunks y lo replica"""
+    documents = DocumentLoader().load_documents(config.PRODUCTS_DIR)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=config.CHUNK_SIZE,
+        chunk_overlap=config.CHUNK_OVERLAP,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    texts = [split.page_content for split in splitter.split_documents(documents)]
+    return texts * replicas
+
+
+def measure(name: str, embeddings, texts) -> float:
+    """Codifica los textos y muestra el rendimiento"""
+    embeddings.embed_documents(texts[:64])  # Calentamiento
+
+    start = time.perf_counter()
+    vectors = embeddings.embed_documents(texts)
+    elapsed = time.perf_counter() - start
+
+    rate = len(vectors) / elapsed
+    print(f"{name:<40} {elapsed:8.1f}s  {rate:10.1f} chunks/s")
+    return rate
+
+
+def main():
+    """Ejecuta el benchmark"""
+    replicas = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    print("=" * 60)
+    print("⏱️ Benchmark de embeddings en CPU")
+    print("=" * 60)
+
+    texts = load_chunks(replicas)
+    print(f"📄 {len(texts)} chunks ({replicas} réplicas del catálogo)\n")
+
+    baseline = HuggingFaceEmbeddings(
+        model_name=config.EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    base_rate = measure("HuggingFaceEmbeddings (actual)", baseline, texts)
+
+    single = BatchedEmbeddings(config.EMBEDDING_MODEL, batch_size=batch_size, workers=1)
+    measure(f"BatchedEmbeddings (lote {batch_size}, 1 proceso)", single, texts)
+
+    parallel = BatchedEmbeddings(config.EMBEDDING_MODEL, batch_size=batch_size, workers=workers)
+    try:
+        rate = measure(
+            f"BatchedEmbeddings (lote {batch_size}, {parallel.workers} procesos)",
+            parallel,
+            texts
+        )
+    finally:
+        parallel.close()
+
+    print(f"\n🚀 Aceleración frente a la configuración actual: {rate / base_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
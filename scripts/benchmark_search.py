@@ -0,0 +1,134 @@
+"""
+Benchmark de latencia de búsqueda por vector: Chroma vs índice NumPy exacto
+
+Mide también el tiempo total de resolver todas las consultas una a una
+frente a hacerlo en un único lote (VectorStore.search_many).
+
+Usa vectores aleatorios normalizados (dimensión del MiniLM), por lo que no
+necesita el modelo de embeddings y mide solo el coste del índice.
+
+Uso:
+    python scripts/benchmark_search.py [num_chunks] [num_consultas] [k]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import Embeddings
+
+from src.rag.numpy_index import NumpyVectorStore
+
+
+DIM = 384
+
+
+class _NoEmbeddings(Embeddings):
+    """Marcador: el benchmark siempre busca por vector"""
+
+    def embed_documents(self, texts):
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        raise NotImplementedError
+
+
+def random_unit_vectors(count: int, seed: int) -> np.ndarray:
+    """Vectores aleatorios con norma L2 = 1"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def latency(store, queries: np.ndarray, k: int):
+    """Devuelve (p50, p99) en milisegundos"""
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        store.similarity_search_by_vector_with_relevance_scores(query.tolist(), k=k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def total_time(search, repeat: int = 3) -> float:
+    """Mejor tiempo (ms) de varias ejecuciones de search()"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        search()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    """Ejecuta el benchmark"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    num_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print("=" * 60)
+    print("⏱️ Benchmark de búsqueda vectorial")
+    print("=" * 60)
+    print(f"📄 {count} chunks, dimensión {DIM}, {num_queries} consultas, k={k}\n")
+
+    vectors = random_unit_vectors(count, seed=0)
+    queries = random_unit_vectors(num_queries, seed=1)
+    ids = [f"chunk-{i}" for i in range(count)]
+    texts = [f"Producto {i}" for i in range(count)]
+    metadatas = [{"source": "benchmark", "row": i} for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        numpy_store = NumpyVectorStore(os.path.join(tmp, "numpy"), _NoEmbeddings())
+        numpy_store.add_embeddings(ids, texts, vectors.tolist(), metadatas)
+        numpy_store.persist()
+
+        chroma_store = Chroma(persist_directory=os.path.join(tmp, "chroma"), embedding_function=_NoEmbeddings())
+        batch = 5000
+        for start in range(0, count, batch):
+            chroma_store._collection.upsert(
+                ids=ids[start:start + batch],
+                embeddings=vectors[start:start + batch].tolist(),
+                metadatas=metadatas[start:start + batch],
+                documents=texts[start:start + batch]
+            )
+
+        # Comprobar que ambos devuelven los mismos resultados
+        sample = queries[0].tolist()
+        expected = [doc.page_content for doc, _ in numpy_store.similarity_search_by_vector_with_relevance_scores(sample, k)]
+        actual = [doc.page_content for doc, _ in chroma_store.similarity_search_by_vector_with_relevance_scores(sample, k)]
+        overlap = len(set(expected) & set(actual)) / k
+        print(f"Coincidencia top-{k} Chroma (HNSW aprox.) vs NumPy (exacto): {overlap:.0%}\n")
+
+        for name, store in (("Chroma", chroma_store), ("NumPy exacto", numpy_store)):
+            latency(store, queries[:10], k)  # Calentamiento
+            p50, p99 = latency(store, queries, k)
+            print(f"{name:<15} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+        print(f"\n{num_queries} consultas: una a una vs en un lote")
+        query_list = queries.tolist()
+        batched = {
+            "Chroma": lambda: chroma_store._collection.query(
+                query_embeddings=query_list,
+                n_results=k,
+                include=["documents", "metadatas", "distances"]
+            ),
+            "NumPy exacto": lambda: numpy_store.similarity_search_by_vectors_with_relevance_scores(query_list, k),
+        }
+        for name, store in (("Chroma", chroma_store), ("NumPy exacto", numpy_store)):
+            sequential_ms = total_time(lambda: [
+                store.similarity_search_by_vector_with_relevance_scores(query, k=k) for query in query_list
+            ])
+            batched_ms = total_time(batched[name])
+            print(
+                f"{name:<15} secuencial {sequential_ms:8.1f} ms   lote {batched_ms:8.1f} ms   "
+                f"({sequential_ms / batched_ms:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Compara los embeddings ONNX cuantizados con los de PyTorch
+
+Informa:
+- Acuerdo de coseno entre ambos embeddings de cada chunk del catálogo
+- recall@10 del backend ONNX frente a PyTorch en un conjunto fijo de consultas
+
+Uso:
+    python scripts/check_onnx_parity.py [directorio_modelo]
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.rag.document_loader import DocumentLoader
+from src.rag.embeddings import OnnxEmbeddings
+from src.config import config
+
+
+QUERIES = [
+    "laptop ligera para programar",
+    "portátil para diseño gráfico con buena pantalla",
+    "smartphone con buena cámara",
+    "teléfono barato con batería duradera",
+    "auriculares con cancelación de ruido",
+    "aspiradora robot para mascotas",
+    "cafetera de cápsulas",
+    "electrodoméstico para cocinar sin aceite",
+    "bicicleta de montaña",
+    "zapatillas para correr maratón",
+    "reloj deportivo con GPS",
+    "equipo para hacer ejercicio en casa",
+    "Roomba j7+",
+    "regalo tecnológico por menos de 300 dólares",
+    "producto para limpiar el hogar",
+]
+
+K = 10
+
+
+def load_texts():
+    """Carga y divide el catálogo de ejemplo"""
+    documents = DocumentLoader().load_documents(config.PRODUCTS_DIR)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=config.CHUNK_SIZE,
+        chunk_overlap=config.CHUNK_OVERLAP,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    return [split.page_content for split in splitter.split_documents(documents)]
+
+
+def top_k(query_vectors: np.ndarray, doc_vectors: np.ndarray, k: int) -> np.ndarray:
+    """Índices de los k documentos más similares a cada consulta"""
+    scores = query_vectors @ doc_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    """Ejecuta la comprobación de paridad"""
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else config.ONNX_MODEL_DIR
+
+    print("=" * 60)
+    print("🔍 Paridad ONNX int8 vs PyTorch")
+    print("=" * 60)
+
+    texts = load_texts()
+    k = min(K, len(texts))
+    print(f"📄 {len(texts)} chunks, {len(QUERIES)} consultas, k={k}\n")
+
+    torch_model = HuggingFaceEmbeddings(
+        model_name=config.EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    onnx_model = OnnxEmbeddings(model_dir, model_file=config.ONNX_MODEL_FILE)
+
+    torch_docs = np.array(torch_model.embed_documents(texts), dtype=np.float32)
+    onnx_docs = np.array(onnx_model.embed_documents(texts), dtype=np.float32)
+    torch_queries = np.array([torch_model.embed_query(q) for q in QUERIES], dtype=np.float32)
+    onnx_queries = np.array([onnx_model.embed_query(q) for q in QUERIES], dtype=np.float32)
+
+    # Ambos están normalizados: el producto escalar es el coseno
+    cosines = np.concatenate([
+        (torch_docs * onnx_docs).sum(axis=1),
+        (torch_queries * onnx_queries).sum(axis=1),
+    ])
+    print("Acuerdo de coseno (PyTorch vs ONNX):")
+    print(f"  media {cosines.mean():.4f} | mínimo {cosines.min():.4f} | p5 {np.percentile(cosines, 5):.4f}")
+
+    expected = top_k(torch_queries, torch_docs, k)
+    actual = top_k(onnx_queries, onnx_docs, k)
+    recalls = [len(set(e) & set(a)) / k for e, a in zip(expected, actual)]
+    print(f"\nrecall@{k} frente a PyTorch: {np.mean(recalls):.3f} (peor consulta: {min(recalls):.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Exporta el modelo de embeddings a ONNX y lo cuantiza a int8
+
+Genera en config.ONNX_MODEL_DIR:
+- model.onnx             (float32)
+- model_quantized.onnx   (pesos int8, cuantización dinámica)
+- archivos del tokenizador
+
+Solo este paso necesita acceso al modelo original (caché local de
+Hugging Face o red); después el backend ONNX funciona sin red.
+
+Uso:
+    python scripts/export_onnx.py [directorio_salida]
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import AutoModel, AutoTokenizer
+
+from src.config import config
+
+
+def export(output_dir: str):
+    """Exporta y cuantiza el modelo"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"📥 Cargando {config.EMBEDDING_MODEL}...")
+    tokenizer = AutoTokenizer.from_pretrained(config.EMBEDDING_MODEL)
+    model = AutoModel.from_pretrained(config.EMBEDDING_MODEL)
+    model.eval()
+
+    sample = tokenizer(["ejemplo de producto"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    print("🔧 Exportando a ONNX...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    print(f"✓ {fp32_path}")
+
+    int8_path = os.path.join(output_dir, "model_quantized.onnx")
+    print("🔧 Cuantizando a int8...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"✓ {int8_path}")
+
+    tokenizer.save_pretrained(output_dir)
+    print(f"✓ Tokenizador guardado en {output_dir}")
+
+    fp32_size = os.path.getsize(fp32_path) / 1e6
+    int8_size = os.path.getsize(int8_path) / 1e6
+    print(f"\n📦 Tamaño: {fp32_size:.0f} MB (float32) → {int8_size:.0f} MB (int8)")
+    print("💡 Activa el backend con EMBEDDING_BACKEND=onnx")
+
+
+if __name__ == "__main__":
+    export(sys.argv[1] if len(sys.argv) > 1 else config.ONNX_MODEL_DIR)
@@ -0,0 +1,40 @@
+"""
+Exporta el índice actual a un snapshot binario para distribuirlo
+
+El snapshot (un único archivo versionado y con checksum) incluye vectores,
+IDs, metadatos, textos y el índice BM25. Los nodos que lo cargan
+(SNAPSHOT_PATH) arrancan con un memory-map, sin reconstruir el índice ni
+abrir el backend.
+
+Uso:
+    python scripts/export_snapshot.py [ruta_snapshot]
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import config
+from src.rag.embeddings import LazyEmbeddings, create_embeddings
+from src.rag.vector_store import VectorStore
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else (
+        config.SNAPSHOT_PATH or os.path.join(config.DATA_DIR, "index.snapshot")
+    )
+
+    # Exportar no calcula embeddings: el modelo no llega a cargarse
+    vector_store = VectorStore(embeddings=LazyEmbeddings(create_embeddings, preload=False))
+    try:
+        vector_store.load_vectorstore()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    vector_store.export_snapshot(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Servicio de búsqueda compartido: carga una vez el modelo de embeddings y
+el índice y atiende a todos los procesos de la aplicación
+
+Los procesos cliente usan RetrievalClient definiendo RETRIEVAL_SERVICE_URL
+(p. ej. http://127.0.0.1:8765). El índice debe existir (crearlo antes con
+main.py o scripts/setup.py) o haber un snapshot en SNAPSHOT_PATH.
+
+Uso:
+    python scripts/retrieval_server.py [puerto]
+"""
+import os
+import sys
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import config
+from src.rag.embeddings import LazyEmbeddings, create_embeddings
+from src.rag.service import RetrievalServer
+from src.rag.vector_store import VectorStore
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else config.RETRIEVAL_SERVICE_PORT
+
+    try:
+        if config.SNAPSHOT_PATH and os.path.exists(config.SNAPSHOT_PATH):
+            vector_store = VectorStore(embeddings=LazyEmbeddings(create_embeddings))
+            vector_store.load_snapshot(config.SNAPSHOT_PATH)
+        else:
+            vector_store = VectorStore()
+            vector_store.load_vectorstore()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    server = RetrievalServer(vector_store, host=config.RETRIEVAL_SERVICE_HOST, port=port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servicio de búsqueda detenido")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,73 @@
 Clase base para todos los agentes del sistema
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+import asyncio
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
 
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
+from src.agents.llm_cache import LLMResponseCache, shared_llm_cache
 from src.config import config
 
 
+_shared_llms: Dict[Tuple[str, float], ChatGoogleGenerativeAI] = {}
+_shared_llms_lock = threading.Lock()
+
+
+def shared_llm(model: str, temperature: float) -> ChatGoogleGenerativeAI:
+    """
+    Devuelve el cliente del LLM de un modelo y temperatura, compartido por
+    todos los agentes del proceso
+    
+    Crear el cliente cuesta ~100 ms (contexto TLS), demasiado para crear
+    tres por sesión cuando se atienden cientos a la vez.
+    
+    Args:
+        model: Nombre del modelo
+        temperature: Temperatura de muestreo
+        
+    Returns:
+        Cliente compartido
+    """
+    with _shared_llms_lock:
+        if (model, temperature) not in _shared_llms:
+            _shared_llms[(model, temperature)] = ChatGoogleGenerativeAI(
+                model=model,
+                temperature=temperature,
+                google_api_key=config.GOOGLE_API_KEY
+            )
+        return _shared_llms[(model, temperature)]
+
+
 class BaseAgent(ABC):
     """Clase base abstracta para agentes"""
     
-    def __init__(self, name: str, role: str):
+    def __init__(self, name: str, role: str, use_llm_cache: bool = None):
+        """
+        Args:
+            name: Nombre del agente
+            role: Rol del agente
+            use_llm_cache: Si las respuestas del LLM se cachean (por defecto
+                config.LLM_CACHE_ENABLED, salvo que la clase esté en
+                config.LLM_CACHE_EXCLUDE)
+        """
         self.name = name
         self.role = role
-        self.llm = ChatGoogleGenerativeAI(
-            model=config.MODEL_NAME,
-            temperature=config.TEMPERATURE,
-            google_api_key=config.GOOGLE_API_KEY
-        )
+        self.llm = shared_llm(config.MODEL_NAME, config.TEMPERATURE)
         self.memory: Dict[str, Any] = {}
+        
+        if use_llm_cache is None:
+            use_llm_cache = config.LLM_CACHE_ENABLED and type(self).__name__ not in config.LLM_CACHE_EXCLUDE
+        self.use_llm_cache = use_llm_cache
+        self.llm_cache = shared_llm_cache(
+            config.LLM_CACHE_PATH,
+            ttl=config.LLM_CACHE_TTL,
+            max_entries=config.LLM_CACHE_MAX_ENTRIES
+        ) if use_llm_cache else None
+        self.llm_stats = {"calls": 0, "cache_hits": 0, "llm_ms": 0.0, "saved_ms": 0.0}
     
     @abstractmethod
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -34,6 +83,125 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process()
+        
+        Por defecto ejecuta process() en el executor del event loop; los
+        agentes la redefinen con llamadas nativas al LLM (ainvoke_llm).
+        
+        Args:
+            input_data: Datos de entrada para el agente
+            
+        Returns:
+            Resultado del procesamiento
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.process, input_data)
+    
+    def invoke_llm(self, prompt: ChatPromptTemplate, variables: Dict[str, Any]) -> BaseMessage:
+        """
+        Renderiza el prompt y llama al LLM, pasando antes por la caché de respuestas
+        
+        Args:
+            prompt: Plantilla del prompt
+            variables: Valores de las variables de la plantilla
+            
+        Returns:
+            Mensaje de respuesta del LLM (o el cacheado para un prompt idéntico)
+        """
+        messages, key = self._prepare_llm_call(prompt, variables)
+        cached = self._cached_response(key)
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        result = self.llm.invoke(messages)
+        self._record_llm_call(key, result, (time.perf_counter() - start) * 1000)
+        return result
+    
+    async def ainvoke_llm(self, prompt: ChatPromptTemplate, variables: Dict[str, Any]) -> BaseMessage:
+        """
+        Versión asíncrona de invoke_llm(): no bloquea el event loop mientras
+        espera al LLM, así que un solo hilo atiende muchas sesiones a la vez
+        
+        Las lecturas y escrituras de la caché de respuestas (SQLite en disco)
+        se ejecutan en el executor del event loop.
+        
+        Args:
+            prompt: Plantilla del prompt
+            variables: Valores de las variables de la plantilla
+            
+        Returns:
+            Mensaje de respuesta del LLM (o el cacheado para un prompt idéntico)
+        """
+        messages, key = self._prepare_llm_call(prompt, variables)
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self._cached_response, key) if key is not None else None
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        result = await self.llm.ainvoke(messages)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if key is not None:
+            await loop.run_in_executor(None, self._record_llm_call, key, result, elapsed_ms)
+        else:
+            self._record_llm_call(key, result, elapsed_ms)
+        return result
+    
+    def _prepare_llm_call(
+        self,
+        prompt: ChatPromptTemplate,
+        variables: Dict[str, Any]
+    ) -> Tuple[List[BaseMessage], Optional[str]]:
+        """
+        Renderiza el prompt y calcula su clave en la caché de respuestas
+        
+        Returns:
+            Tupla (mensajes, clave de caché o None si la caché está desactivada)
+        """
+        messages = prompt.format_messages(**variables)
+        self.llm_stats["calls"] += 1
+        
+        key = None
+        if self.use_llm_cache and self.llm_cache is not None:
+            key = LLMResponseCache.key(self._model_name(), getattr(self.llm, "temperature", None), messages)
+        return messages, key
+    
+    def _cached_response(self, key: Optional[str]) -> Optional[AIMessage]:
+        """Busca la respuesta de una clave en la caché (None si no está o no hay caché)"""
+        if key is None:
+            return None
+        cached = self.llm_cache.get(key)
+        if cached is None:
+            return None
+        content, latency_ms = cached
+        self.llm_stats["cache_hits"] += 1
+        self.llm_stats["saved_ms"] += latency_ms
+        return AIMessage(content=content)
+    
+    def _record_llm_call(self, key: Optional[str], result: BaseMessage, elapsed_ms: float):
+        """Contabiliza una llamada real al LLM y guarda la respuesta en caché"""
+        self.llm_stats["llm_ms"] += elapsed_ms
+        if key is not None and isinstance(result.content, str):
+            self.llm_cache.put(key, self._model_name(), result.content, elapsed_ms)
+    
+    def _model_name(self) -> str:
+        return getattr(self.llm, "model", config.MODEL_NAME)
+    
+    def llm_cache_stats(self) -> Dict[str, float]:
+        """
+        Obtiene los contadores de llamadas al LLM de este agente
+        
+        Returns:
+            Llamadas, aciertos de caché, ratio de aciertos, tiempo en el LLM
+            y latencia ahorrada por la caché (ms)
+        """
+        stats = dict(self.llm_stats)
+        stats["hit_ratio"] = stats["cache_hits"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+    
     def update_memory(self, key: str, value: Any):
         """Actualiza la memoria del agente"""
         self.memory[key] = value
@@ -48,4 +216,3 @@ class BaseAgent(ABC):
     
     def __str__(self):
         return f"{self.name} ({self.role})"
-
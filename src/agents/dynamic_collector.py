@@ -1,10 +1,22 @@
 """
 Agente recolector dinámico que usa LLM para generar preguntas adaptativas
 """
+import asyncio
+import json
+import re
 from typing import Dict, Any, List, Optional
 from langchain_core.prompts import ChatPromptTemplate
 
 from src.agents.base_agent import BaseAgent
+from src.config import config
+from src.rag.bm25 import fold_accents
+
+
+# Preguntas del asistente sobre el presupuesto y la categoría (sin tildes ni mayúsculas)
+_BUDGET_QUESTION_RE = re.compile(r"presupuesto|precio|gastar|invertir|dinero|costo|cuesta|pagar")
+_CATEGORY_QUESTION_RE = re.compile(
+    r"categoria|tipo de producto|que producto|que (?:estas )?buscando|que (?:te gustaria|quieres|necesitas) comprar"
+)
 
 
 class DynamicInformationCollectorAgent(BaseAgent):
@@ -31,6 +43,8 @@ class DynamicInformationCollectorAgent(BaseAgent):
         }
         self.questions_asked = 0
         self.max_questions = 7  # Máximo de preguntas antes de proceder
+        # Extracción y siguiente pregunta en una sola llamada con salida JSON
+        self.structured_turns = config.COLLECTOR_STRUCTURED_TURNS
     
     def is_information_sufficient(self) -> bool:
         """
@@ -46,6 +60,56 @@ class DynamicInformationCollectorAgent(BaseAgent):
         # O si ya hicimos suficientes preguntas
         return has_critical or self.questions_asked >= self.max_questions
     
+    def collected_budget(self) -> Any:
+        """
+        Presupuesto del usuario en texto libre (o None)
+        
+        Con turnos estructurados es el campo que extrae el LLM. En el modo
+        de dos llamadas la extracción no se interpreta, así que se toma la
+        respuesta a la última pregunta sobre el presupuesto o, si no la
+        hubo, todas las respuestas juntas: parse_budget solo reconoce en
+        ellas cantidades con forma de precio ("800 dólares", "hasta 500").
+        """
+        budget = self.information_gathered.get('presupuesto')
+        if not self._is_empty(budget):
+            return budget
+        
+        answers = self._answers_to(_BUDGET_QUESTION_RE)
+        if answers:
+            return answers[-1]
+        return "\n".join(self._user_messages()) or None
+    
+    def collected_category(self) -> Optional[str]:
+        """
+        Categoría de interés en texto libre (o None)
+        
+        Con turnos estructurados es el campo que extrae el LLM; sin ellos,
+        la respuesta a la última pregunta sobre la categoría o, si no la
+        hubo, el primer mensaje del usuario, que suele nombrar el producto.
+        El índice particionado solo la usa para enrutar si todas sus
+        palabras corresponden a categorías (ver ShardedVectorStore.route).
+        """
+        category = self.information_gathered.get('categoria')
+        if not self._is_empty(category):
+            return category
+        
+        answers = self._answers_to(_CATEGORY_QUESTION_RE) or self._user_messages()[:1]
+        return answers[-1] if answers else None
+    
+    def _answers_to(self, pattern: "re.Pattern") -> List[str]:
+        """Respuestas del usuario a las preguntas del asistente que encajan con pattern"""
+        answers = []
+        asked = False
+        for message in self.conversation_history:
+            if message['role'] == 'assistant':
+                asked = bool(pattern.search(fold_accents(message['content'])))
+            elif asked:
+                answers.append(message['content'])
+        return answers
+    
+    def _user_messages(self) -> List[str]:
+        return [message['content'] for message in self.conversation_history if message['role'] == 'user']
+    
     def generate_next_question(self, user_response: Optional[str] = None) -> str:
         """
         Genera la siguiente pregunta basada en el contexto
@@ -57,17 +121,62 @@ class DynamicInformationCollectorAgent(BaseAgent):
             Siguiente pregunta a realizar
         """
         if user_response:
-            # Guardar en historial
-            self.conversation_history.append({
-                'role': 'user',
-                'content': user_response
-            })
-            
+            self._record_user_response(user_response)
+        
+        # Una sola llamada: extrae la información y genera la pregunta
+        if self.structured_turns:
+            result = self.invoke_llm(self._turn_prompt(), self._question_variables(user_response))
+            return self._accept_turn(result.content)
+        
+        if user_response:
             # Extraer información de la respuesta
             self._extract_information(user_response)
         
         # Generar siguiente pregunta con contexto
-        prompt = ChatPromptTemplate.from_messages([
+        result = self.invoke_llm(self._question_prompt(), self._question_variables(user_response))
+        
+        return self._accept_question(result.content)
+    
+    async def agenerate_next_question(self, user_response: Optional[str] = None) -> str:
+        """
+        Versión asíncrona de generate_next_question()
+        
+        Sin turnos estructurados, la extracción y la generación de la
+        pregunta se piden a la vez: la pregunta se construye con el mismo
+        contexto que en la versión síncrona (la extracción solo se guarda en
+        memoria).
+        
+        Args:
+            user_response: Última respuesta del usuario (None para primera pregunta)
+            
+        Returns:
+            Siguiente pregunta a realizar
+        """
+        if user_response:
+            self._record_user_response(user_response)
+        
+        if self.structured_turns:
+            result = await self.ainvoke_llm(self._turn_prompt(), self._question_variables(user_response))
+            return self._accept_turn(result.content)
+        
+        question_call = self.ainvoke_llm(self._question_prompt(), self._question_variables(user_response))
+        if user_response:
+            _, result = await asyncio.gather(self._aextract_information(user_response), question_call)
+        else:
+            result = await question_call
+        
+        return self._accept_question(result.content)
+    
+    def _record_user_response(self, user_response: str):
+        """Guarda la respuesta del usuario en el historial"""
+        self.conversation_history.append({
+            'role': 'user',
+            'content': user_response
+        })
+    
+    def _question_prompt(self) -> ChatPromptTemplate:
+        """Prompt de generación de la siguiente pregunta"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Eres un asistente experto en ventas que ayuda a los clientes a encontrar productos.
 
 Tu objetivo es hacer UNA pregunta estratégica a la vez para entender las necesidades del cliente.
@@ -99,16 +208,23 @@ INSTRUCCIONES:
 Genera la siguiente pregunta:"""),
             ("user", "Última respuesta del usuario: {user_response}\n\nGenera la siguiente pregunta:")
         ])
-        
-        chain = prompt | self.llm
-        
-        result = chain.invoke({
+    
+    def _question_variables(self, user_response: Optional[str]) -> Dict[str, str]:
+        """Variables del prompt de la siguiente pregunta"""
+        return {
             "information_gathered": self._format_information_gathered(),
             "conversation_history": self._format_conversation_history(),
             "user_response": user_response or "Primera interacción"
-        })
+        }
+    
+    def _accept_question(self, content: str) -> Optional[str]:
+        """
+        Registra la pregunta generada por el LLM
         
-        question = result.content.strip()
+        Returns:
+            La pregunta, o None si el LLM indica que ya tiene suficiente información
+        """
+        question = content.strip()
         
         # Verificar si el LLM indica que tiene suficiente información
         if "INFORMACIÓN_COMPLETA" in question or "INFORMACION_COMPLETA" in question:
@@ -124,6 +240,120 @@ Genera la siguiente pregunta:"""),
         
         return question
     
+    def _turn_prompt(self) -> ChatPromptTemplate:
+        """Prompt de turno estructurado: extracción y siguiente pregunta en JSON"""
+        return ChatPromptTemplate.from_messages([
+            ("system", """Eres un asistente experto en ventas que ayuda a los clientes a encontrar productos.
+
+En cada turno haces dos cosas:
+1. Extraes de la última respuesta del usuario la información sobre lo que necesita
+2. Decides la siguiente pregunta estratégica (UNA sola) o si ya tienes suficiente información
+
+INFORMACIÓN YA RECOPILADA:
+{information_gathered}
+
+CONVERSACIÓN HASTA AHORA:
+{conversation_history}
+
+INSTRUCCIONES PARA LA PREGUNTA:
+- Haz UNA pregunta clara y específica
+- Si falta información crítica (presupuesto o categoría), pregunta por eso primero
+- Adapta la pregunta según lo que ya sabes
+- Si ya tienes información sobre algo, no preguntes de nuevo
+- Si el usuario mencionó algo pero no fue claro, pide aclaración
+- Sé conversacional y amigable
+- La información es suficiente cuando conoces al menos la categoría y el presupuesto
+
+Responde SOLO con un objeto JSON con este formato:
+{{
+  "informacion": {{
+    "presupuesto": "cantidad en dólares o rango, o null",
+    "categoria": "tipo de producto, o null",
+    "caracteristicas": ["características mencionadas"],
+    "uso_principal": "para qué lo usará, o null",
+    "preferencias_marca": "marcas mencionadas, o null",
+    "prioridades": ["qué es más importante para el usuario"],
+    "restricciones": ["limitaciones mencionadas"]
+  }},
+  "completo": false,
+  "pregunta": "siguiente pregunta, o null si completo es true"
+}}
+
+En "informacion" incluye solo lo que aparezca en la última respuesta del usuario."""),
+            ("user", "Última respuesta del usuario: {user_response}")
+        ])
+    
+    def _accept_turn(self, content: str) -> Optional[str]:
+        """
+        Incorpora la información extraída en un turno estructurado y
+        registra la pregunta
+        
+        Args:
+            content: Respuesta JSON del LLM
+            
+        Returns:
+            La pregunta, o None si el LLM indica que ya tiene suficiente información
+        """
+        turn = self._parse_turn(content)
+        if turn is None:
+            # Sin JSON válido, la respuesta se trata como una pregunta (modo de dos llamadas)
+            return self._accept_question(content)
+        
+        extracted = turn.get("informacion")
+        if isinstance(extracted, dict):
+            self._merge_information(extracted)
+        self.update_memory("last_extraction", extracted)
+        
+        question = turn.get("pregunta")
+        if turn.get("completo") is True or not isinstance(question, str) or not question.strip():
+            return None
+        return self._accept_question(question)
+    
+    @staticmethod
+    def _parse_turn(content: str) -> Optional[Dict[str, Any]]:
+        """Extrae el objeto JSON de la respuesta (con o sin bloque de código)"""
+        start, end = content.find("{"), content.rfind("}")
+        if start < 0 or end <= start:
+            return None
+        try:
+            turn = json.loads(content[start:end + 1])
+        except ValueError:
+            return None
+        return turn if isinstance(turn, dict) else None
+    
+    def _merge_information(self, extracted: Dict[str, Any]):
+        """
+        Incorpora los campos extraídos a information_gathered
+        
+        Los campos de texto se sustituyen por el valor nuevo (una lista se
+        une con comas) y las listas acumulan los elementos que no estaban;
+        se ignoran los vacíos y los campos desconocidos.
+        
+        Args:
+            extracted: Campos extraídos de la última respuesta
+        """
+        for key, value in extracted.items():
+            if key not in self.information_gathered or self._is_empty(value):
+                continue
+            
+            current = self.information_gathered[key]
+            if isinstance(current, list):
+                for item in value if isinstance(value, list) else [value]:
+                    if not self._is_empty(item) and item not in current:
+                        current.append(item)
+            elif isinstance(value, list):
+                self.information_gathered[key] = ", ".join(
+                    str(item) for item in value if not self._is_empty(item)
+                )
+            else:
+                self.information_gathered[key] = value
+    
+    @staticmethod
+    def _is_empty(value: Any) -> bool:
+        if isinstance(value, str):
+            return value.strip().lower() in ("", "null", "none", "n/a")
+        return value is None or value == [] or value == {}
+    
     def _extract_information(self, user_response: str):
         """
         Extrae información estructurada de la respuesta del usuario usando LLM
@@ -131,7 +361,26 @@ Genera la siguiente pregunta:"""),
         Args:
             user_response: Respuesta del usuario
         """
-        prompt = ChatPromptTemplate.from_messages([
+        result = self.invoke_llm(self._extraction_prompt(), {
+            "current_info": self._format_information_gathered(),
+            "user_response": user_response
+        })
+        
+        # Actualizar información (simplificado - en producción usarías un parser más robusto)
+        self.update_memory("last_extraction", result.content)
+    
+    async def _aextract_information(self, user_response: str):
+        """Versión asíncrona de _extract_information()"""
+        result = await self.ainvoke_llm(self._extraction_prompt(), {
+            "current_info": self._format_information_gathered(),
+            "user_response": user_response
+        })
+        
+        self.update_memory("last_extraction", result.content)
+    
+    def _extraction_prompt(self) -> ChatPromptTemplate:
+        """Prompt de extracción de información de una respuesta"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Analiza la respuesta del usuario y extrae información relevante.
 
 INFORMACIÓN ACTUAL:
@@ -152,16 +401,6 @@ Extrae y actualiza la siguiente información (solo menciona lo que encuentres en
 Responde en formato estructurado. Si no encuentras información para algún campo, omítelo."""),
             ("user", "{user_response}")
         ])
-        
-        chain = prompt | self.llm
-        
-        result = chain.invoke({
-            "current_info": self._format_information_gathered(),
-            "user_response": user_response
-        })
-        
-        # Actualizar información (simplificado - en producción usarías un parser más robusto)
-        self.update_memory("last_extraction", result.content)
     
     def _format_information_gathered(self) -> str:
         """Formatea la información recopilada para el prompt"""
@@ -196,7 +435,31 @@ Responde en formato estructurado. Si no encuentras información para algún camp
             Análisis estructurado de la información recopilada
         """
         # Crear análisis completo de la conversación
-        prompt = ChatPromptTemplate.from_messages([
+        result = self.invoke_llm(self._summary_prompt(), {
+            "conversation_history": self._format_conversation_history()
+        })
+        
+        return self._save_analysis(result.content)
+    
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process()
+        
+        Args:
+            input_data: Datos de entrada (opcional)
+            
+        Returns:
+            Análisis estructurado de la información recopilada
+        """
+        result = await self.ainvoke_llm(self._summary_prompt(), {
+            "conversation_history": self._format_conversation_history()
+        })
+        
+        return self._save_analysis(result.content)
+    
+    def _summary_prompt(self) -> ChatPromptTemplate:
+        """Prompt de análisis de la conversación completa"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Eres un experto analizando necesidades de clientes.
 
 Analiza la siguiente conversación y genera un resumen estructurado y detallado de:
@@ -214,16 +477,9 @@ CONVERSACIÓN COMPLETA:
 Genera un análisis detallado y estructurado que será usado para buscar productos relevantes."""),
             ("user", "Por favor, analiza la conversación y genera el resumen:")
         ])
-        
-        chain = prompt | self.llm
-        
-        result = chain.invoke({
-            "conversation_history": self._format_conversation_history()
-        })
-        
-        analysis = result.content
-        
-        # Guardar en memoria
+    
+    def _save_analysis(self, analysis: str) -> Dict[str, Any]:
+        """Guarda el análisis en memoria y construye el resultado"""
         self.update_memory("conversation_history", self.conversation_history)
         self.update_memory("analysis", analysis)
         
@@ -84,8 +84,29 @@ class InformationCollectorAgent(BaseAgent):
         """
         responses = input_data.get('responses', self.user_responses)
         
-        # Crear prompt para analizar las respuestas
-        prompt = ChatPromptTemplate.from_messages([
+        result = self.invoke_llm(self._analysis_prompt(), {"responses": self._format_responses(responses)})
+        
+        return self._save_analysis(responses, result.content)
+    
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process()
+        
+        Args:
+            input_data: Debe contener 'responses' con las respuestas del usuario
+            
+        Returns:
+            Información estructurada del usuario
+        """
+        responses = input_data.get('responses', self.user_responses)
+        
+        result = await self.ainvoke_llm(self._analysis_prompt(), {"responses": self._format_responses(responses)})
+        
+        return self._save_analysis(responses, result.content)
+    
+    def _analysis_prompt(self) -> ChatPromptTemplate:
+        """Prompt para analizar las respuestas"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Eres un asistente experto en analizar las necesidades de los clientes.
             Analiza las siguientes respuestas del usuario y extrae información estructurada sobre:
             - Presupuesto
@@ -97,26 +118,23 @@ class InformationCollectorAgent(BaseAgent):
             Sé específico y detallado en tu análisis."""),
             ("user", "Respuestas del usuario:\n{responses}\n\nPor favor, analiza y estructura esta información.")
         ])
-        
-        # Crear chain
-        chain = prompt | self.llm
-        
-        # Procesar
-        responses_text = "\n".join([
+    
+    def _format_responses(self, responses: List[str]) -> str:
+        """Empareja cada respuesta con su pregunta"""
+        return "\n".join([
             f"Pregunta {i+1}: {self.questions[i]}\nRespuesta: {resp}"
             for i, resp in enumerate(responses)
         ])
-        
-        result = chain.invoke({"responses": responses_text})
-        
-        # Guardar en memoria
+    
+    def _save_analysis(self, responses: List[str], analysis: str) -> Dict[str, Any]:
+        """Guarda el análisis en memoria y construye el resultado"""
         self.update_memory("raw_responses", responses)
-        self.update_memory("analysis", result.content)
+        self.update_memory("analysis", analysis)
         
         return {
             "agent": self.name,
             "raw_responses": responses,
-            "analysis": result.content,
+            "analysis": analysis,
             "status": "completed"
         }
     
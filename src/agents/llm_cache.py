@@ -0,0 +1,189 @@
+"""
+Caché persistente de respuestas del LLM por coincidencia exacta del prompt
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+
+
+class LLMResponseCache:
+    """
+    Caché en SQLite de respuestas del LLM
+
+    La clave es un hash de (modelo, temperatura, mensajes renderizados), así
+    que solo acierta con prompts idénticos. Las entradas caducan tras ttl
+    segundos y, al superar max_entries, se desalojan las usadas hace más
+    tiempo. Cada entrada guarda lo que tardó la llamada original, para
+    contabilizar la latencia ahorrada en cada acierto.
+
+    Es segura entre hilos y se puede compartir entre agentes y procesos
+    (SQLite serializa las escrituras).
+    """
+
+    def __init__(self, path: str, ttl: float = 0, max_entries: int = 10000):
+        """
+        Args:
+            path: Ruta del archivo SQLite
+            ttl: Segundos de validez de cada respuesta (0 = sin caducidad)
+            max_entries: Número máximo de respuestas guardadas
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                latency_ms REAL NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(model: str, temperature: float, messages: List[BaseMessage]) -> str:
+        """
+        Clave de caché de una llamada al LLM
+
+        Args:
+            model: Nombre del modelo
+            temperature: Temperatura de muestreo
+            messages: Mensajes ya renderizados que se envían al modelo
+
+        Returns:
+            Hash SHA-256 de la llamada
+        """
+        payload = json.dumps(
+            [model, temperature, [[message.type, message.content] for message in messages]],
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        Busca una respuesta y la marca como usada recientemente
+
+        Args:
+            key: Clave de la llamada (ver key())
+
+        Returns:
+            Tupla (texto de la respuesta, latencia original en ms) o None
+            si no está o ha caducado
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, latency_ms, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_ms += row[1]
+            return row[0], row[1]
+
+    def put(self, key: str, model: str, content: str, latency_ms: float):
+        """
+        Guarda una respuesta
+
+        Args:
+            key: Clave de la llamada (ver key())
+            model: Nombre del modelo
+            content: Texto de la respuesta
+            latency_ms: Lo que tardó la llamada original
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, latency_ms, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self):
+        """Elimina todas las respuestas"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        """Devuelve aciertos, fallos, ratio de aciertos y latencia ahorrada"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "saved_ms": self.saved_ms,
+            "entries": len(self),
+        }
+
+    def close(self):
+        """Cierra la conexión"""
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self, now: float):
+        """Elimina las respuestas caducadas y las menos usadas si sobran"""
+        if self.ttl:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+
+
+_shared_caches: Dict[str, LLMResponseCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_llm_cache(path: str, ttl: float = 0, max_entries: int = 10000) -> LLMResponseCache:
+    """
+    Devuelve la caché de un archivo, compartida por todos los agentes del proceso
+
+    Args:
+        path: Ruta del archivo SQLite
+        ttl: Segundos de validez de cada respuesta (0 = sin caducidad)
+        max_entries: Número máximo de respuestas guardadas
+
+    Returns:
+        Caché compartida
+    """
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = LLMResponseCache(path, ttl=ttl, max_entries=max_entries)
+        return _shared_caches[path]
@@ -34,8 +34,53 @@ class PreferenceAnalyzerAgent(BaseAgent):
         if not user_analysis:
             raise ValueError("Se requiere 'user_analysis' del agente recolector")
         
-        # Crear prompt para análisis profundo
-        prompt = ChatPromptTemplate.from_messages([
+        # Criterios y, a partir de ellos, query de búsqueda optimizada
+        criteria = self.generate_criteria(user_analysis)
+        search_query = self.generate_search_query(user_analysis, criteria)
+        
+        return self.save_results(criteria, search_query)
+    
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process()
+        
+        Args:
+            input_data: Debe contener 'user_analysis' del agente anterior
+            
+        Returns:
+            Criterios de búsqueda estructurados
+        """
+        user_analysis = input_data.get('user_analysis', '')
+        
+        if not user_analysis:
+            raise ValueError("Se requiere 'user_analysis' del agente recolector")
+        
+        criteria = await self.agenerate_criteria(user_analysis)
+        search_query = await self.agenerate_search_query(user_analysis, criteria)
+        
+        return self.save_results(criteria, search_query)
+    
+    def generate_criteria(self, user_analysis: str) -> str:
+        """
+        Genera los criterios de búsqueda a partir del análisis del usuario
+        
+        Args:
+            user_analysis: Análisis del usuario
+            
+        Returns:
+            Criterios de búsqueda
+        """
+        result = self.invoke_llm(self._criteria_prompt(), {"user_analysis": user_analysis})
+        return result.content
+    
+    async def agenerate_criteria(self, user_analysis: str) -> str:
+        """Versión asíncrona de generate_criteria()"""
+        result = await self.ainvoke_llm(self._criteria_prompt(), {"user_analysis": user_analysis})
+        return result.content
+    
+    def _criteria_prompt(self) -> ChatPromptTemplate:
+        """Prompt de análisis profundo de las preferencias"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Eres un experto en análisis de preferencias de clientes y recomendaciones de productos.
             
             Tu tarea es analizar la información del usuario y generar:
@@ -50,28 +95,20 @@ class PreferenceAnalyzerAgent(BaseAgent):
 
 Por favor, genera criterios de búsqueda detallados y optimizados.""")
         ])
-        
-        # Crear chain
-        chain = prompt | self.llm
-        
-        # Procesar
-        result = chain.invoke({"user_analysis": user_analysis})
-        
-        # Generar query de búsqueda optimizada
-        search_query = self._generate_search_query(user_analysis, result.content)
-        
-        # Guardar en memoria
-        self.update_memory("criteria", result.content)
+    
+    def save_results(self, criteria: str, search_query: str) -> Dict[str, Any]:
+        """Guarda criterios y query en memoria y construye el resultado"""
+        self.update_memory("criteria", criteria)
         self.update_memory("search_query", search_query)
         
         return {
             "agent": self.name,
-            "criteria": result.content,
+            "criteria": criteria,
             "search_query": search_query,
             "status": "completed"
         }
     
-    def _generate_search_query(self, user_analysis: str, criteria: str) -> str:
+    def generate_search_query(self, user_analysis: str, criteria: str) -> str:
         """
         Genera una query de búsqueda optimizada para el RAG
         
@@ -82,7 +119,25 @@ Por favor, genera criterios de búsqueda detallados y optimizados.""")
         Returns:
             Query de búsqueda
         """
-        prompt = ChatPromptTemplate.from_messages([
+        result = self.invoke_llm(self._search_query_prompt(), {
+            "user_analysis": user_analysis,
+            "criteria": criteria
+        })
+        
+        return result.content.strip()
+    
+    async def agenerate_search_query(self, user_analysis: str, criteria: str) -> str:
+        """Versión asíncrona de generate_search_query()"""
+        result = await self.ainvoke_llm(self._search_query_prompt(), {
+            "user_analysis": user_analysis,
+            "criteria": criteria
+        })
+        
+        return result.content.strip()
+    
+    def _search_query_prompt(self) -> ChatPromptTemplate:
+        """Prompt de generación de la query de búsqueda"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Genera una consulta de búsqueda concisa y efectiva para encontrar productos relevantes.
             La consulta debe incluir las palabras clave más importantes y características esenciales.
             Máximo 2-3 oraciones."""),
@@ -94,12 +149,3 @@ Criterios:
 
 Genera la consulta de búsqueda:""")
         ])
-        
-        chain = prompt | self.llm
-        result = chain.invoke({
-            "user_analysis": user_analysis,
-            "criteria": criteria
-        })
-        
-        return result.content.strip()
-
@@ -1,10 +1,15 @@
 """
 Agente recomendador con RAG
 """
-from typing import Dict, Any, List
+import asyncio
+import time
+from typing import Dict, Any, List, Tuple
 from langchain_core.prompts import ChatPromptTemplate
 
 from src.agents.base_agent import BaseAgent
+from src.config import config
+from src.rag.ranking import adaptive_cutoff, aggregate_by_product
+from src.rag.reranker import CrossEncoderReranker
 from src.rag.vector_store import VectorStore
 
 
@@ -20,51 +25,281 @@ class RecommenderAgent(BaseAgent):
             role="Generar recomendaciones personalizadas de productos"
         )
         self.vector_store = vector_store
+        
+        # Reordenación opcional con cross-encoder antes de construir el contexto
+        self.reranker = None
+        if config.RERANK_ENABLED:
+            print("🔧 Cargando cross-encoder para reordenar candidatos...")
+            self.reranker = CrossEncoderReranker(
+                config.RERANK_MODEL,
+                batch_size=config.RERANK_BATCH_SIZE
+            )
     
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Genera recomendaciones basadas en las preferencias del usuario
         
         Args:
-            input_data: Debe contener 'search_query' y 'criteria'
+            input_data: Debe contener 'search_query' y 'criteria'; opcionalmente
+                'filters' con restricciones de producto (precio, categoría,
+                marca, stock) que se aplican dentro de la búsqueda y
+                'category' con la categoría de interés en texto libre (con
+                el índice particionado solo se consultan sus shards)
             
         Returns:
             Recomendaciones de productos
         """
-        search_query = input_data.get('search_query', '')
-        criteria = input_data.get('criteria', '')
-        user_analysis = input_data.get('user_analysis', '')
+        search_query, filters, category = self._search_inputs(input_data)
+        
+        # Buscar y preparar el contexto de productos
+        relevant_products, search_stats, retrieval_stats, products_context = self.build_context(
+            search_query, filters, category
+        )
+        
+        # Generar recomendaciones personalizadas
+        start = time.perf_counter()
+        recommendations = self.generate_recommendations(
+            products_context,
+            input_data.get('user_analysis', ''),
+            input_data.get('criteria', '')
+        )
+        retrieval_stats["generation_ms"] = (time.perf_counter() - start) * 1000
+        
+        return self.save_results(relevant_products, recommendations, search_stats, retrieval_stats, filters)
+    
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process()
         
+        La búsqueda (embedding, índice y reranker, todo CPU) se ejecuta en el
+        executor del event loop y la generación con ainvoke_llm().
+        
+        Args:
+            input_data: Igual que en process()
+            
+        Returns:
+            Recomendaciones de productos
+        """
+        search_query, filters, category = self._search_inputs(input_data)
+        
+        loop = asyncio.get_running_loop()
+        relevant_products, search_stats, retrieval_stats, products_context = await loop.run_in_executor(
+            None, self.build_context, search_query, filters, category
+        )
+        
+        start = time.perf_counter()
+        recommendations = await self.agenerate_recommendations(
+            products_context,
+            input_data.get('user_analysis', ''),
+            input_data.get('criteria', '')
+        )
+        retrieval_stats["generation_ms"] = (time.perf_counter() - start) * 1000
+        
+        return self.save_results(relevant_products, recommendations, search_stats, retrieval_stats, filters)
+    
+    @staticmethod
+    def _search_inputs(input_data: Dict[str, Any]) -> tuple:
+        """
+        Valida la entrada y extrae query, filtros y categoría
+        
+        Returns:
+            Tupla (search_query, filters, category)
+        """
+        search_query = input_data.get('search_query', '')
         if not search_query:
             raise ValueError("Se requiere 'search_query' del analizador de preferencias")
+        return search_query, input_data.get('filters') or None, input_data.get('category') or None
+    
+    def build_context(
+        self,
+        search_query: str,
+        filters: Dict[str, Any] = None,
+        category: str = None
+    ) -> tuple:
+        """
+        Busca los productos y construye el contexto del prompt
         
-        # Buscar productos relevantes en el vectorstore
-        relevant_products = self.vector_store.search_with_scores(
-            search_query,
-            k=10  # Buscamos más productos para tener opciones
-        )
+        Args:
+            search_query: Consulta de búsqueda
+            filters: Filtros de producto para la búsqueda
+            category: Categoría de interés para enrutar la búsqueda
+            
+        Returns:
+            Tupla (productos seleccionados, estadísticas de búsqueda,
+            estadísticas de la selección, contexto formateado)
+        """
+        # Buscar productos relevantes en el vectorstore (modo según config.SEARCH_MODE)
+        relevant_products, search_stats = self._retrieve_products(search_query, filters, category)
+        self._report_search_latency(search_stats)
+        
+        # Decidir cuántos productos entran en el contexto
+        relevant_products, retrieval_stats = self._select_products(relevant_products)
         
         # Formatear productos encontrados
         products_context = self._format_products(relevant_products)
-        
-        # Generar recomendaciones personalizadas
-        recommendations = self._generate_recommendations(
-            products_context,
-            user_analysis,
-            criteria
+        retrieval_stats["context_chars"] = len(products_context)
+        return relevant_products, search_stats, retrieval_stats, products_context
+    
+    def save_results(
+        self,
+        relevant_products: List[tuple],
+        recommendations: str,
+        search_stats: Dict[str, Any],
+        retrieval_stats: Dict[str, Any],
+        filters: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Informa de la selección, guarda en memoria y construye el resultado"""
+        print(
+            f"📏 {retrieval_stats['chosen_k']} de {retrieval_stats['candidates']} productos en el contexto "
+            f"(corte: {retrieval_stats['stop_reason']}, {retrieval_stats['context_chars']} caracteres, "
+            f"LLM {retrieval_stats['generation_ms'] / 1000:.1f}s)"
         )
         
         # Guardar en memoria
         self.update_memory("relevant_products", relevant_products)
         self.update_memory("recommendations", recommendations)
+        self.update_memory("search_stats", search_stats)
+        self.update_memory("retrieval_stats", retrieval_stats)
+        self.update_memory("filters", filters)
         
         return {
             "agent": self.name,
             "recommendations": recommendations,
             "products_found": len(relevant_products),
+            "search_stats": search_stats,
+            "retrieval_stats": retrieval_stats,
             "status": "completed"
         }
     
+    def _retrieve_products(
+        self,
+        search_query: str,
+        filters: Dict[str, Any] = None,
+        category: str = None
+    ) -> Tuple[List[tuple], Dict[str, Any]]:
+        """
+        Recupera chunks candidatos y los agrupa en productos distintos
+        
+        Con reranker se recupera un conjunto amplio (config.RERANK_CANDIDATES)
+        y el cross-encoder lo reduce a config.RERANK_TOP_N productos.
+        
+        Args:
+            search_query: Consulta de búsqueda
+            filters: Filtros de producto para la búsqueda
+            category: Categoría de interés para enrutar la búsqueda
+            
+        Returns:
+            Tupla (lista de tuplas (documento, distancia) con un documento por
+            producto, estadísticas de la búsqueda)
+        """
+        k = config.RERANK_CANDIDATES if self.reranker else config.RECOMMENDER_TOP_K
+        chunks = self.vector_store.search_with_scores(
+            search_query,
+            k=k,  # Buscamos más chunks para tener opciones
+            filters=filters,
+            category=category
+        )
+        if filters and not chunks:
+            print("⚠️ Ningún producto cumple los filtros, buscando sin ellos")
+            chunks = self.vector_store.search_with_scores(search_query, k=k, category=category)
+        # Las estadísticas son por hilo: no las pisan otras sesiones concurrentes
+        search_stats = dict(self.vector_store.last_search_stats)
+        
+        self.update_memory("retrieved_chunks", chunks)
+        if config.PRODUCT_AGGREGATION == "none":
+            products = chunks
+        else:
+            if self.reranker:
+                top_n = len(chunks)  # El reranker decide con todos los productos
+            elif config.ADAPTIVE_K:
+                top_n = config.ADAPTIVE_MAX_K
+            else:
+                top_n = config.PRODUCT_TOP_N
+            products = aggregate_by_product(
+                chunks,
+                top_n=top_n,
+                score_mode=config.PRODUCT_AGGREGATION,
+                chunks_per_product=config.PRODUCT_CHUNKS
+            )
+            print(f"📦 {len(chunks)} chunks agrupados en {len(products)} productos")
+        
+        if self.reranker:
+            products = self._rerank(search_query, products)
+        return products, search_stats
+    
+    def _rerank(self, search_query: str, products: List[tuple]) -> List[tuple]:
+        """
+        Reordena los candidatos con el cross-encoder y registra su coste
+        
+        Compara los tokens del contexto que se habría enviado sin reordenar
+        (los config.PRODUCT_TOP_N primeros de la búsqueda) con los del
+        contexto reducido, estimados como caracteres / 4.
+        
+        Args:
+            search_query: Consulta de búsqueda
+            products: Candidatos (documento, distancia)
+            
+        Returns:
+            Los config.RERANK_TOP_N mejores candidatos según el cross-encoder
+        """
+        reranked = self.reranker.rerank(search_query, products, top_n=config.RERANK_TOP_N)
+        
+        stats = dict(self.reranker.last_stats)
+        stats["tokens_before"] = len(self._format_products(products[:config.PRODUCT_TOP_N])) // 4
+        stats["tokens_after"] = len(self._format_products(reranked)) // 4
+        self.update_memory("rerank_stats", stats)
+        
+        saved = stats["tokens_before"] - stats["tokens_after"]
+        print(
+            f"🔀 Rerank: {stats['candidates']} → {stats['kept']} candidatos en {stats['rerank_ms']:.0f} ms; "
+            f"contexto ~{stats['tokens_before']} → ~{stats['tokens_after']} tokens ({saved} ahorrados)"
+        )
+        return reranked
+    
+    def _select_products(self, products: List[tuple]) -> tuple:
+        """
+        Recorta la lista de productos con k adaptativo (si está activado)
+        
+        Args:
+            products: Tuplas (documento, distancia), menor = mejor
+            
+        Returns:
+            Tupla (productos seleccionados, estadísticas de la selección)
+        """
+        if config.ADAPTIVE_K:
+            return adaptive_cutoff(
+                products,
+                min_k=config.ADAPTIVE_MIN_K,
+                max_k=config.ADAPTIVE_MAX_K,
+                min_similarity=config.ADAPTIVE_MIN_SIMILARITY,
+                max_gap=config.ADAPTIVE_MAX_GAP
+            )
+        
+        # k fijo: se usan todos, pero se registran las mismas estadísticas
+        _, stats = adaptive_cutoff(
+            products,
+            min_k=len(products),
+            max_k=len(products),
+            min_similarity=float("-inf"),
+            max_gap=float("inf")
+        )
+        stats["stop_reason"] = "fixed"
+        return products, stats
+    
+    @staticmethod
+    def _report_search_latency(stats: Dict[str, Any]):
+        """Muestra la latencia de cada parte de la búsqueda"""
+        if stats.get("cached"):
+            print(f"⏱️ Búsqueda ({stats['mode']}): resultado en caché")
+            return
+        legs = [
+            f"{label} {stats[key]:.1f} ms"
+            for label, key in (("vector", "vector_ms"), ("BM25", "bm25_ms"), ("fusión", "fusion_ms"))
+            if key in stats
+        ]
+        if legs:
+            print(f"⏱️ Búsqueda ({stats['mode']}): {', '.join(legs)}")
+    
     def _format_products(self, products_with_scores: List[tuple]) -> str:
         """
         Formatea los productos encontrados para el contexto
@@ -84,7 +319,7 @@ class RecommenderAgent(BaseAgent):
         
         return "\n".join(formatted)
     
-    def _generate_recommendations(
+    def generate_recommendations(
         self,
         products_context: str,
         user_analysis: str,
@@ -101,7 +336,32 @@ class RecommenderAgent(BaseAgent):
         Returns:
             Recomendaciones en texto
         """
-        prompt = ChatPromptTemplate.from_messages([
+        result = self.invoke_llm(self._recommendations_prompt(), {
+            "user_analysis": user_analysis,
+            "criteria": criteria,
+            "products_context": products_context
+        })
+        
+        return result.content
+    
+    async def agenerate_recommendations(
+        self,
+        products_context: str,
+        user_analysis: str,
+        criteria: str
+    ) -> str:
+        """Versión asíncrona de generate_recommendations()"""
+        result = await self.ainvoke_llm(self._recommendations_prompt(), {
+            "user_analysis": user_analysis,
+            "criteria": criteria,
+            "products_context": products_context
+        })
+        
+        return result.content
+    
+    def _recommendations_prompt(self) -> ChatPromptTemplate:
+        """Prompt de generación de recomendaciones"""
+        return ChatPromptTemplate.from_messages([
             ("system", """Eres un experto asesor de productos con años de experiencia.
             
             Tu tarea es analizar los productos disponibles y las necesidades del usuario,
@@ -128,16 +388,6 @@ PRODUCTOS DISPONIBLES:
 
 Por favor, genera tus recomendaciones personalizadas:""")
         ])
-        
-        chain = prompt | self.llm
-        
-        result = chain.invoke({
-            "user_analysis": user_analysis,
-            "criteria": criteria,
-            "products_context": products_context
-        })
-        
-        return result.content
     
     def get_detailed_comparison(self, product_names: List[str]) -> str:
         """
@@ -149,11 +399,10 @@ Por favor, genera tus recomendaciones personalizadas:""")
         Returns:
             Comparación detallada
         """
-        # Buscar información específica de cada producto
+        # Buscar información específica de cada producto (todas las búsquedas en un lote)
         comparisons = []
         
-        for name in product_names:
-            products = self.vector_store.search(name, k=2)
+        for products in self.vector_store.search_many(product_names, k=2):
             if products:
                 comparisons.append(products[0].page_content)
         
@@ -168,8 +417,7 @@ Por favor, genera tus recomendaciones personalizadas:""")
             ("user", "Productos a comparar:\n\n{products}")
         ])
         
-        chain = prompt | self.llm
-        result = chain.invoke({"products": "\n\n---\n\n".join(comparisons)})
+        result = self.invoke_llm(prompt, {"products": "\n\n---\n\n".join(comparisons)})
         
         return result.content
 
@@ -0,0 +1,169 @@
+"""
+Caché semántica de respuestas a preguntas de seguimiento
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from src.rag.bm25 import tokenize
+
+
+def _inflections(*stems: str) -> FrozenSet[str]:
+    """Formas en género y número de adjetivos terminados en -o ("barat" -> barato, baratas...)"""
+    return frozenset(stem + ending for stem in stems for ending in ("o", "a", "os", "as"))
+
+
+# Pares de polos opuestos (ya sin tildes). Los embeddings de frases sitúan
+# "¿cuál es más barato?" y "¿cuál es más caro?" casi en el mismo punto
+_OPPOSITES = [
+    (_inflections("barat", "economic"), _inflections("car", "costos")),
+    (frozenset({"mejor", "mejores"}), frozenset({"peor", "peores"})),
+    (frozenset({"grande", "grandes", "mayor", "mayores"}), _inflections("pequen") | {"menor", "menores"}),
+    (_inflections("liger", "livian"), _inflections("pesad")),
+    (_inflections("rapid"), _inflections("lent")),
+    (_inflections("nuev") | {"reciente", "recientes"}, _inflections("viej", "antigu")),
+]
+
+
+def polarity(question: str) -> FrozenSet[Tuple[int, int]]:
+    """
+    Polos de comparación que menciona una pregunta
+
+    Returns:
+        Conjunto de (par de opuestos, +1 o -1)
+    """
+    terms = set(tokenize(question))
+    return frozenset(
+        (axis, sign)
+        for axis, poles in enumerate(_OPPOSITES)
+        for sign, words in ((1, poles[0]), (-1, poles[1]))
+        if terms & words
+    )
+
+
+def contradicts(a: FrozenSet[Tuple[int, int]], b: FrozenSet[Tuple[int, int]]) -> bool:
+    """Indica si dos preguntas piden polos opuestos ("más barato" frente a "más caro")"""
+    return any((axis, -sign) in b for axis, sign in a)
+
+
+class SemanticAnswerCache:
+    """
+    Reutiliza respuestas del LLM para preguntas equivalentes sobre el mismo contexto
+
+    Cada pregunta se embebe con el modelo local; una respuesta guardada se
+    reutiliza si la huella del contexto (análisis y recomendaciones) es la
+    misma y la similitud coseno entre preguntas alcanza el umbral
+    ("¿cuál es más barato?" / "¿cuál cuesta menos?"), salvo que las preguntas
+    pidan polos opuestos ("más barato" / "más caro"), que los embeddings no
+    distinguen. Acotada por número de entradas con desalojo LRU.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], List[List[float]]],
+        threshold: float = 0.92,
+        max_entries: int = 256
+    ):
+        """
+        Args:
+            embed: Función que calcula embeddings de consultas en lote
+                (p. ej. VectorStore.embed_queries)
+            threshold: Similitud coseno mínima entre preguntas
+            max_entries: Número máximo de respuestas guardadas
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+        # (huella, pregunta) -> (embedding normalizado, respuesta, latencia original)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(*context: str) -> str:
+        """Huella del contexto de la respuesta (cambia si cambia cualquier parte)"""
+        digest = hashlib.sha256()
+        for part in context:
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, question: str, context: str) -> Tuple[Optional[str], np.ndarray]:
+        """
+        Busca una respuesta para una pregunta equivalente con el mismo contexto
+
+        Args:
+            question: Pregunta del usuario
+            context: Huella del contexto (ver fingerprint())
+
+        Returns:
+            Tupla (respuesta o None, embedding de la pregunta); el embedding
+            se pasa a store() para no calcularlo dos veces
+        """
+        vector = self._normalize(self.embed([question])[0])
+        poles = polarity(question)
+        with self._lock:
+            best_key, best_similarity = None, self.threshold
+            for key, (stored, _, _) in self._entries.items():
+                if key[0] != context:
+                    continue
+                similarity = float(stored @ vector)
+                if similarity >= best_similarity and not contradicts(poles, polarity(key[1])):
+                    best_key, best_similarity = key, similarity
+
+            if best_key is None:
+                self.misses += 1
+                return None, vector
+
+            self._entries.move_to_end(best_key)
+            _, answer, latency_ms = self._entries[best_key]
+            self.hits += 1
+            self.saved_ms += latency_ms
+            return answer, vector
+
+    def store(self, question: str, context: str, answer: str, vector: np.ndarray, latency_ms: float = 0.0):
+        """
+        Guarda una respuesta
+
+        Args:
+            question: Pregunta del usuario
+            context: Huella del contexto (ver fingerprint())
+            answer: Respuesta del LLM
+            vector: Embedding de la pregunta devuelto por lookup()
+            latency_ms: Lo que tardó en generarse la respuesta
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(context, question)] = (vector, answer, latency_ms)
+            self._entries.move_to_end((context, question))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Elimina todas las respuestas"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Devuelve aciertos, fallos, ratio de aciertos y latencia ahorrada"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "saved_ms": self.saved_ms,
+            "entries": len(self._entries),
+        }
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
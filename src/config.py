@@ -17,15 +17,117 @@ class Config:
     MODEL_NAME = os.getenv("MODEL_NAME", "gemini-1.5-flash")
     TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
     
+    # Caché de respuestas del LLM (prompts idénticos), compartida por los agentes
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))  # Segundos (0 = sin caducidad)
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+    LLM_CACHE_EXCLUDE = [  # Clases de agente sin caché (el recomendador muestrea con temperatura > 0)
+        name.strip() for name in os.getenv("LLM_CACHE_EXCLUDE", "RecommenderAgent").split(",") if name.strip()
+    ]
+    # Caché semántica de preguntas de seguimiento (misma pregunta con otras palabras)
+    FOLLOWUP_CACHE_ENABLED = os.getenv("FOLLOWUP_CACHE_ENABLED", "false").lower() == "true"
+    FOLLOWUP_CACHE_THRESHOLD = float(os.getenv("FOLLOWUP_CACHE_THRESHOLD", "0.92"))  # Similitud coseno mínima
+    FOLLOWUP_CACHE_SIZE = int(os.getenv("FOLLOWUP_CACHE_SIZE", "256"))
+    # Flujo de recomendación: buscar con el análisis del usuario en paralelo a
+    # los criterios, sin esperar a la query generada por el LLM (por defecto
+    # se busca con la query del LLM)
+    WORKFLOW_EARLY_RETRIEVAL = os.getenv("WORKFLOW_EARLY_RETRIEVAL", "false").lower() == "true"
+    # Recolector dinámico: extracción de información y siguiente pregunta en una
+    # sola llamada con salida JSON (false = dos llamadas por turno)
+    COLLECTOR_STRUCTURED_TURNS = os.getenv("COLLECTOR_STRUCTURED_TURNS", "false").lower() == "true"
+    
     # RAG
     CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
     TOP_K_RESULTS = int(os.getenv("TOP_K_RESULTS", "5"))
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))  # Entradas por caché (0 = desactivada)
+    QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "600"))  # Segundos (0 = sin caducidad)
+    RECOMMENDER_TOP_K = int(os.getenv("RECOMMENDER_TOP_K", "10"))  # Chunks candidatos por recomendación
+    PRODUCT_AGGREGATION = os.getenv("PRODUCT_AGGREGATION", "max")  # max | sum | none (chunks sin agrupar)
+    PRODUCT_TOP_N = int(os.getenv("PRODUCT_TOP_N", "8"))  # Productos distintos enviados al LLM
+    PRODUCT_CHUNKS = int(os.getenv("PRODUCT_CHUNKS", "2"))  # Fragmentos por producto en el contexto
+    
+    # Reordenación con cross-encoder local (amplio conjunto de candidatos → pocos productos)
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))  # Chunks recuperados para reordenar
+    RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "4"))  # Productos que pasan al LLM
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+    
+    # k adaptativo: cuántos productos entran en el contexto según la curva de scores
+    ADAPTIVE_K = os.getenv("ADAPTIVE_K", "false").lower() == "true"
+    ADAPTIVE_MIN_K = int(os.getenv("ADAPTIVE_MIN_K", "3"))
+    ADAPTIVE_MAX_K = int(os.getenv("ADAPTIVE_MAX_K", "10"))
+    ADAPTIVE_MIN_SIMILARITY = float(os.getenv("ADAPTIVE_MIN_SIMILARITY", "0.0"))  # 1 - distancia
+    ADAPTIVE_MAX_GAP = float(os.getenv("ADAPTIVE_MAX_GAP", "0.25"))  # Caída relativa que marca el codo
+    FILTER_BY_BUDGET = os.getenv("FILTER_BY_BUDGET", "true").lower() == "true"  # Filtrar por precio según el presupuesto
+    FILTER_IN_STOCK = os.getenv("FILTER_IN_STOCK", "false").lower() == "true"  # Excluir productos sin stock
+    
+    # Búsqueda: vector | bm25 | hybrid (vector + BM25 combinados con Reciprocal Rank Fusion)
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "vector")
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # Candidatos por índice antes de fusionar
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    
+    # Índice HNSW (backends chroma y hnsw): más M/ef = mejor recall, más latencia
+    HNSW_M = int(os.getenv("HNSW_M", "16"))
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "50"))
+    
+    # Índice particionado: un índice por categoría de producto, con enrutado de consultas
+    SHARD_BY_CATEGORY = os.getenv("SHARD_BY_CATEGORY", "false").lower() == "true"
+    SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "4"))  # Hilos para consultar varios shards a la vez
+    
+    # Servicio de búsqueda compartido (scripts/retrieval_server.py): si se define la URL,
+    # main.py usa el servicio en lugar de cargar el modelo y el índice en cada proceso
+    RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL", "")  # p. ej. http://127.0.0.1:8765
+    RETRIEVAL_SERVICE_HOST = os.getenv("RETRIEVAL_SERVICE_HOST", "127.0.0.1")
+    RETRIEVAL_SERVICE_PORT = int(os.getenv("RETRIEVAL_SERVICE_PORT", "8765"))
+    RETRIEVAL_SERVICE_TIMEOUT = float(os.getenv("RETRIEVAL_SERVICE_TIMEOUT", "30"))  # Segundos por petición
+    
+    # Snapshot binario del índice (scripts/export_snapshot.py): si existe, main.py y el
+    # servicio de búsqueda arrancan desde él sin abrir el backend ni reconstruir
+    SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")  # p. ej. data/index.snapshot
+    SNAPSHOT_VERIFY = os.getenv("SNAPSHOT_VERIFY", "true").lower() == "true"  # Comprobar el checksum al cargar
+    
+    # Embeddings
+    EMBEDDING_MODEL = os.getenv(
+        "EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    )
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")  # huggingface | batched | onnx
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))  # Procesos (backend batched), 0 = todos los núcleos
+    ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join("models", "minilm-onnx-int8"))
+    ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "model_quantized.onnx")
+    ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 = valor por defecto de ONNX Runtime
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+    
+    # Carga de documentos
+    LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", "1"))  # 1 = secuencial, 0 = todos los núcleos
+    LOADER_CHUNK_ROWS = int(os.getenv("LOADER_CHUNK_ROWS", "10000"))  # Filas por bloque en modo streaming
+    
+    # Ingesta en streaming (carga → división → embeddings → upsert)
+    INGEST_STREAMING = os.getenv("INGEST_STREAMING", "false").lower() == "true"
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))  # Chunks por lote
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))  # Lotes en vuelo entre etapas
     
     # Directorios
     DATA_DIR = "data"
     PRODUCTS_DIR = os.path.join(DATA_DIR, "products")
     CHROMA_DIR = os.path.join(DATA_DIR, "chroma_db")
+    NUMPY_INDEX_DIR = os.path.join(DATA_DIR, "numpy_index")
+    HNSW_INDEX_DIR = os.path.join(DATA_DIR, "hnsw_index")
+    
+    # Backend del índice vectorial: chroma | numpy (búsqueda exacta en memoria) | hnsw (aproximada)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+    INDEX_DIR = {
+        "numpy": NUMPY_INDEX_DIR,
+        "hnsw": HNSW_INDEX_DIR,
+    }.get(VECTOR_BACKEND, CHROMA_DIR)
+    INDEX_MANIFEST_PATH = os.path.join(INDEX_DIR, "manifest.json")
+    BM25_INDEX_PATH = os.path.join(INDEX_DIR, "bm25.json")
+    EMBEDDING_CACHE_DIR = os.path.join(DATA_DIR, "embedding_cache")
+    LLM_CACHE_PATH = os.path.join(DATA_DIR, "llm_cache.sqlite")
     
     @classmethod
     def validate(cls):
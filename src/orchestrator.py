@@ -1,25 +1,21 @@
 """
 Orquestador del sistema multiagentes
 """
+import asyncio
+import time
 from typing import Dict, Any, Optional
-from enum import Enum
 
 from src.agents.information_collector import InformationCollectorAgent
 from src.agents.preference_analyzer import PreferenceAnalyzerAgent
 from src.agents.recommender import RecommenderAgent
+from src.agents.semantic_cache import SemanticAnswerCache
+from src.config import config
+from src.rag.filters import recommendation_filters
 from src.rag.vector_store import VectorStore
+from src.workflow import RecommendationWorkflow, WorkflowState
 
 
-class WorkflowState(Enum):
-    """Estados del flujo de trabajo"""
-    INIT = "init"
-    COLLECTING_INFO = "collecting_info"
-    ANALYZING_PREFERENCES = "analyzing_preferences"
-    GENERATING_RECOMMENDATIONS = "generating_recommendations"
-    COMPLETED = "completed"
-
-
-class MultiAgentOrchestrator:
+class MultiAgentOrchestrator(RecommendationWorkflow):
     """
     Orquestador que coordina el flujo de trabajo entre múltiples agentes
     """
@@ -37,6 +33,14 @@ class MultiAgentOrchestrator:
         self.collector = InformationCollectorAgent()
         self.analyzer = PreferenceAnalyzerAgent()
         self.recommender = RecommenderAgent(vector_store)
+        self.workflow_graph = self._build_workflow_graph()
+        
+        # Respuestas reutilizables para preguntas de seguimiento equivalentes
+        self.followup_cache = SemanticAnswerCache(
+            vector_store.embed_queries,
+            threshold=config.FOLLOWUP_CACHE_THRESHOLD,
+            max_entries=config.FOLLOWUP_CACHE_SIZE
+        ) if config.FOLLOWUP_CACHE_ENABLED else None
         
         # Estado del flujo
         self.state = WorkflowState.INIT
@@ -86,6 +90,39 @@ class MultiAgentOrchestrator:
                 "status": "error"
             }
     
+    async def astart_session(self) -> str:
+        """Versión asíncrona de start_session()"""
+        return self.start_session()
+    
+    async def aprocess_user_input(self, user_input: str) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process_user_input()
+        
+        Las llamadas al LLM no bloquean el event loop y la búsqueda se
+        ejecuta en su executor, así que un solo event loop atiende muchas
+        sesiones concurrentes (un orquestador por sesión).
+        
+        Args:
+            user_input: Respuesta del usuario
+            
+        Returns:
+            Respuesta del sistema con siguiente acción
+        """
+        if self.state == WorkflowState.COLLECTING_INFO:
+            self.collector.add_response(user_input)
+            if self.collector.has_more_questions():
+                return self._next_question_response()
+            return await self._aprocess_workflow()
+        
+        elif self.state == WorkflowState.COMPLETED:
+            return await self._ahandle_followup_question(user_input)
+        
+        else:
+            return {
+                "message": "Estado inválido del sistema. Por favor, reinicia la sesión.",
+                "status": "error"
+            }
+    
     def _handle_collection(self, user_input: str) -> Dict[str, Any]:
         """
         Maneja la recolección de información
@@ -101,62 +138,49 @@ class MultiAgentOrchestrator:
         
         # Verificar si hay más preguntas
         if self.collector.has_more_questions():
-            next_question = self.collector.get_next_question()
-            return {
-                "message": next_question,
-                "status": "collecting",
-                "progress": f"{self.collector.current_question_index}/{len(self.collector.questions)}"
-            }
+            return self._next_question_response()
         
         # No hay más preguntas, procesar información
         return self._process_workflow()
     
+    def _next_question_response(self) -> Dict[str, Any]:
+        """Respuesta con la siguiente pregunta del recolector"""
+        next_question = self.collector.get_next_question()
+        return {
+            "message": next_question,
+            "status": "collecting",
+            "progress": f"{self.collector.current_question_index}/{len(self.collector.questions)}"
+        }
+    
     def _process_workflow(self) -> Dict[str, Any]:
         """
         Ejecuta el flujo completo de análisis y recomendación
         
+        Las etapas se ejecutan según el grafo de self.workflow_graph (las
+        independientes a la vez) y sus tiempos quedan en workflow_data.
+        
         Returns:
             Recomendaciones finales
         """
         try:
-            # Paso 1: Analizar respuestas del usuario
             print("\n🔍 Analizando tus respuestas...")
             self.state = WorkflowState.ANALYZING_PREFERENCES
             
-            collector_result = self.collector.process({})
-            self.workflow_data['user_analysis'] = collector_result['analysis']
-            
-            # Paso 2: Generar criterios de búsqueda
-            print("📊 Generando criterios de búsqueda...")
-            
-            analyzer_result = self.analyzer.process({
-                'user_analysis': self.workflow_data['user_analysis']
-            })
-            self.workflow_data['criteria'] = analyzer_result['criteria']
-            self.workflow_data['search_query'] = analyzer_result['search_query']
-            
-            # Paso 3: Generar recomendaciones
-            print("🎯 Buscando los mejores productos para ti...")
-            self.state = WorkflowState.GENERATING_RECOMMENDATIONS
-            
-            recommender_result = self.recommender.process({
-                'search_query': self.workflow_data['search_query'],
-                'criteria': self.workflow_data['criteria'],
-                'user_analysis': self.workflow_data['user_analysis']
-            })
-            
-            self.workflow_data['recommendations'] = recommender_result['recommendations']
-            self.workflow_data['products_found'] = recommender_result['products_found']
-            
-            # Completado
-            self.state = WorkflowState.COMPLETED
+            return self._complete_workflow(self.workflow_graph.run())
             
+        except Exception as e:
             return {
-                "message": self._format_final_response(),
-                "status": "completed",
-                "recommendations": self.workflow_data['recommendations'],
-                "products_found": self.workflow_data['products_found']
+                "message": f"Error procesando la información: {str(e)}",
+                "status": "error"
             }
+    
+    async def _aprocess_workflow(self) -> Dict[str, Any]:
+        """Versión asíncrona de _process_workflow()"""
+        try:
+            print("\n🔍 Analizando tus respuestas...")
+            self.state = WorkflowState.ANALYZING_PREFERENCES
+            
+            return self._complete_workflow(await self.workflow_graph.arun())
             
         except Exception as e:
             return {
@@ -164,6 +188,28 @@ class MultiAgentOrchestrator:
                 "status": "error"
             }
     
+    def _analyze(self) -> str:
+        """Etapa de análisis: el recolector analiza las respuestas del usuario"""
+        return self._analysis_done(self.collector.process({}))
+    
+    async def _aanalyze(self) -> str:
+        """Versión asíncrona de _analyze()"""
+        return self._analysis_done(await self.collector.aprocess({}))
+    
+    def _analysis_done(self, collector_result: Dict[str, Any]) -> str:
+        self.workflow_data['user_analysis'] = collector_result['analysis']
+        print("📊 Generando criterios de búsqueda...")
+        return collector_result['analysis']
+    
+    def _search_inputs(self) -> tuple:
+        """Etapa de filtros y categoría de la búsqueda a partir de las respuestas"""
+        # La primera pregunta del recolector es el presupuesto
+        responses = self.collector.user_responses
+        self.workflow_data['filters'] = recommendation_filters(responses[0] if responses else None)
+        # y la segunda, la categoría (enruta la búsqueda en el índice particionado)
+        self.workflow_data['category'] = responses[1] if len(responses) > 1 else None
+        return self.workflow_data['filters'], self.workflow_data['category']
+    
     def _format_final_response(self) -> str:
         """
         Formatea la respuesta final con las recomendaciones
@@ -199,9 +245,33 @@ Puedo ayudarte con:
         Returns:
             Respuesta a la pregunta
         """
+        context, question_vector, cached = self._followup_lookup(user_input)
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        result = self.recommender.invoke_llm(self._followup_prompt(), self._followup_variables(user_input))
+        
+        return self._followup_response(user_input, result.content, context, question_vector, start)
+    
+    async def _ahandle_followup_question(self, user_input: str) -> Dict[str, Any]:
+        """Versión asíncrona de _handle_followup_question()"""
+        # El embedding de la pregunta (CPU) se calcula en el executor
+        loop = asyncio.get_running_loop()
+        context, question_vector, cached = await loop.run_in_executor(None, self._followup_lookup, user_input)
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        result = await self.recommender.ainvoke_llm(self._followup_prompt(), self._followup_variables(user_input))
+        
+        return self._followup_response(user_input, result.content, context, question_vector, start)
+    
+    def _followup_prompt(self):
+        """Prompt de las preguntas de seguimiento"""
         from langchain_core.prompts import ChatPromptTemplate
         
-        prompt = ChatPromptTemplate.from_messages([
+        return ChatPromptTemplate.from_messages([
             ("system", """Eres AURA, un asistente experto en productos.
             Ya has generado recomendaciones para el usuario.
             Ahora responde sus preguntas adicionales basándote en:
@@ -223,17 +293,54 @@ PREGUNTA DEL USUARIO:
 
 Por favor, responde la pregunta:""")
         ])
-        
-        chain = prompt | self.recommender.llm
-        
-        result = chain.invoke({
+    
+    def _followup_variables(self, user_input: str) -> Dict[str, str]:
+        """Variables del prompt de seguimiento"""
+        return {
             "user_analysis": self.workflow_data.get('user_analysis', ''),
             "recommendations": self.workflow_data.get('recommendations', ''),
             "question": user_input
-        })
+        }
+    
+    def _followup_lookup(self, user_input: str) -> tuple:
+        """
+        Busca la respuesta de una pregunta equivalente sobre las mismas recomendaciones
+        
+        Returns:
+            Tupla (huella del contexto, embedding de la pregunta, respuesta
+            cacheada o None); sin caché semántica, (None, None, None)
+        """
+        if self.followup_cache is None:
+            return None, None, None
+        
+        context = SemanticAnswerCache.fingerprint(
+            self.workflow_data.get('user_analysis', ''),
+            self.workflow_data.get('recommendations', '')
+        )
+        answer, question_vector = self.followup_cache.lookup(user_input, context)
+        if answer is None:
+            return context, question_vector, None
+        return context, question_vector, {
+            "message": answer,
+            "status": "followup",
+            "cached": True
+        }
+    
+    def _followup_response(
+        self,
+        user_input: str,
+        answer: str,
+        context: Optional[str],
+        question_vector,
+        start: float
+    ) -> Dict[str, Any]:
+        """Guarda la respuesta en la caché semántica y construye el resultado"""
+        latency_ms = (time.perf_counter() - start) * 1000
+        if context is not None:
+            self.followup_cache.store(user_input, context, answer, question_vector, latency_ms)
         
         return {
-            "message": result.content,
+            "message": answer,
             "status": "followup"
         }
     
@@ -241,6 +348,37 @@ Por favor, responde la pregunta:""")
         """Obtiene el estado actual del flujo"""
         return self.state.value
     
+    def llm_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Obtiene los contadores de llamadas al LLM y de su caché
+        
+        Returns:
+            Estadísticas por agente, de la caché compartida ("cache") y de
+            la caché semántica de preguntas de seguimiento ("followup_cache")
+        """
+        agents = (self.collector, self.analyzer, self.recommender)
+        stats = {agent.name: agent.llm_cache_stats() for agent in agents}
+        cache = next((agent.llm_cache for agent in agents if agent.llm_cache is not None), None)
+        if cache is not None:
+            stats["cache"] = cache.stats()
+        if self.followup_cache is not None:
+            stats["followup_cache"] = self.followup_cache.stats()
+        return stats
+    
+    def stage_timings(self) -> Dict[str, Any]:
+        """
+        Obtiene los tiempos de la última ejecución del flujo de recomendación
+        
+        Returns:
+            Inicio, fin y duración (ms) de cada etapa y la ruta crítica
+        """
+        path, path_ms = self.workflow_graph.last_critical_path
+        return {
+            "stages": self.workflow_graph.last_timings,
+            "critical_path": path,
+            "critical_path_ms": path_ms
+        }
+    
     def reset(self):
         """Reinicia el orquestador"""
         self.collector.reset()
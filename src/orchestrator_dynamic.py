@@ -1,25 +1,21 @@
 """
 Orquestador del sistema multiagentes con recolección dinámica
 """
+import asyncio
+import time
 from typing import Dict, Any, Optional
-from enum import Enum
 
 from src.agents.dynamic_collector import DynamicInformationCollectorAgent
 from src.agents.preference_analyzer import PreferenceAnalyzerAgent
 from src.agents.recommender import RecommenderAgent
+from src.agents.semantic_cache import SemanticAnswerCache
+from src.config import config
+from src.rag.filters import recommendation_filters
 from src.rag.vector_store import VectorStore
+from src.workflow import RecommendationWorkflow, WorkflowState
 
 
-class WorkflowState(Enum):
-    """Estados del flujo de trabajo"""
-    INIT = "init"
-    COLLECTING_INFO = "collecting_info"
-    ANALYZING_PREFERENCES = "analyzing_preferences"
-    GENERATING_RECOMMENDATIONS = "generating_recommendations"
-    COMPLETED = "completed"
-
-
-class DynamicMultiAgentOrchestrator:
+class DynamicMultiAgentOrchestrator(RecommendationWorkflow):
     """
     Orquestador que usa recolección dinámica de información
     """
@@ -37,6 +33,14 @@ class DynamicMultiAgentOrchestrator:
         self.collector = DynamicInformationCollectorAgent()
         self.analyzer = PreferenceAnalyzerAgent()
         self.recommender = RecommenderAgent(vector_store)
+        self.workflow_graph = self._build_workflow_graph()
+        
+        # Respuestas reutilizables para preguntas de seguimiento equivalentes
+        self.followup_cache = SemanticAnswerCache(
+            vector_store.embed_queries,
+            threshold=config.FOLLOWUP_CACHE_THRESHOLD,
+            max_entries=config.FOLLOWUP_CACHE_SIZE
+        ) if config.FOLLOWUP_CACHE_ENABLED else None
         
         # Estado del flujo
         self.state = WorkflowState.INIT
@@ -62,6 +66,23 @@ class DynamicMultiAgentOrchestrator:
         # Generar primera pregunta dinámica
         self.current_question = self.collector.generate_next_question()
         
+        return self._greeting()
+    
+    async def astart_session(self) -> str:
+        """Versión asíncrona de start_session()"""
+        self.collector.reset()
+        self.analyzer.clear_memory()
+        self.recommender.clear_memory()
+        
+        self.state = WorkflowState.COLLECTING_INFO
+        self.workflow_data = {}
+        
+        self.current_question = await self.collector.agenerate_next_question()
+        
+        return self._greeting()
+    
+    def _greeting(self) -> str:
+        """Mensaje de bienvenida con la primera pregunta"""
         greeting = f"""👋 ¡Hola! Soy AURA, tu asistente inteligente de recomendaciones.
 
 Voy a hacerte algunas preguntas para entender exactamente lo que necesitas y así poder recomendarte los mejores productos.
@@ -93,6 +114,36 @@ Voy a hacerte algunas preguntas para entender exactamente lo que necesitas y as
                 "status": "error"
             }
     
+    async def aprocess_user_input(self, user_input: str) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process_user_input()
+        
+        Las llamadas al LLM no bloquean el event loop y la búsqueda se
+        ejecuta en su executor, así que un solo event loop atiende muchas
+        sesiones concurrentes (un orquestador por sesión).
+        
+        Args:
+            user_input: Respuesta del usuario
+            
+        Returns:
+            Respuesta del sistema con siguiente acción
+        """
+        if self.state == WorkflowState.COLLECTING_INFO:
+            next_question = await self.collector.agenerate_next_question(user_input)
+            if next_question is None or self.collector.is_information_sufficient():
+                print("\n✓ Información suficiente recopilada")
+                return await self._aprocess_workflow()
+            return self._next_question_response(next_question)
+        
+        elif self.state == WorkflowState.COMPLETED:
+            return await self._ahandle_followup_question(user_input)
+        
+        else:
+            return {
+                "message": "Estado inválido del sistema. Por favor, reinicia la sesión.",
+                "status": "error"
+            }
+    
     def _handle_dynamic_collection(self, user_input: str) -> Dict[str, Any]:
         """
         Maneja la recolección dinámica de información
@@ -112,6 +163,10 @@ Voy a hacerte algunas preguntas para entender exactamente lo que necesitas y as
             return self._process_workflow()
         
         # Continuar con siguiente pregunta
+        return self._next_question_response(next_question)
+    
+    def _next_question_response(self, next_question: str) -> Dict[str, Any]:
+        """Respuesta con la siguiente pregunta del recolector"""
         self.current_question = next_question
         
         return {
@@ -124,49 +179,31 @@ Voy a hacerte algunas preguntas para entender exactamente lo que necesitas y as
         """
         Ejecuta el flujo completo de análisis y recomendación
         
+        Las etapas se ejecutan según el grafo de self.workflow_graph (las
+        independientes a la vez) y sus tiempos quedan en workflow_data.
+        
         Returns:
             Recomendaciones finales
         """
         try:
-            # Paso 1: Analizar conversación completa
             print("\n🔍 Analizando la conversación...")
             self.state = WorkflowState.ANALYZING_PREFERENCES
             
-            collector_result = self.collector.process({})
-            self.workflow_data['user_analysis'] = collector_result['analysis']
-            self.workflow_data['conversation_history'] = collector_result['conversation_history']
-            
-            # Paso 2: Generar criterios de búsqueda
-            print("📊 Generando criterios de búsqueda optimizados...")
-            
-            analyzer_result = self.analyzer.process({
-                'user_analysis': self.workflow_data['user_analysis']
-            })
-            self.workflow_data['criteria'] = analyzer_result['criteria']
-            self.workflow_data['search_query'] = analyzer_result['search_query']
-            
-            # Paso 3: Generar recomendaciones
-            print("🎯 Buscando los mejores productos para ti...")
-            self.state = WorkflowState.GENERATING_RECOMMENDATIONS
-            
-            recommender_result = self.recommender.process({
-                'search_query': self.workflow_data['search_query'],
-                'criteria': self.workflow_data['criteria'],
-                'user_analysis': self.workflow_data['user_analysis']
-            })
-            
-            self.workflow_data['recommendations'] = recommender_result['recommendations']
-            self.workflow_data['products_found'] = recommender_result['products_found']
-            
-            # Completado
-            self.state = WorkflowState.COMPLETED
+            return self._complete_workflow(self.workflow_graph.run())
             
+        except Exception as e:
             return {
-                "message": self._format_final_response(),
-                "status": "completed",
-                "recommendations": self.workflow_data['recommendations'],
-                "products_found": self.workflow_data['products_found']
+                "message": f"Error procesando la información: {str(e)}",
+                "status": "error"
             }
+    
+    async def _aprocess_workflow(self) -> Dict[str, Any]:
+        """Versión asíncrona de _process_workflow()"""
+        try:
+            print("\n🔍 Analizando la conversación...")
+            self.state = WorkflowState.ANALYZING_PREFERENCES
+            
+            return self._complete_workflow(await self.workflow_graph.arun())
             
         except Exception as e:
             return {
@@ -174,6 +211,26 @@ Voy a hacerte algunas preguntas para entender exactamente lo que necesitas y as
                 "status": "error"
             }
     
+    def _analyze(self) -> str:
+        """Etapa de análisis: el recolector analiza la conversación completa"""
+        return self._analysis_done(self.collector.process({}))
+    
+    async def _aanalyze(self) -> str:
+        """Versión asíncrona de _analyze()"""
+        return self._analysis_done(await self.collector.aprocess({}))
+    
+    def _analysis_done(self, collector_result: Dict[str, Any]) -> str:
+        self.workflow_data['user_analysis'] = collector_result['analysis']
+        self.workflow_data['conversation_history'] = collector_result['conversation_history']
+        print("📊 Generando criterios de búsqueda optimizados...")
+        return collector_result['analysis']
+    
+    def _search_inputs(self) -> tuple:
+        """Etapa de filtros y categoría de la búsqueda a partir de la información recopilada"""
+        self.workflow_data['filters'] = recommendation_filters(self.collector.collected_budget())
+        self.workflow_data['category'] = self.collector.collected_category()
+        return self.workflow_data['filters'], self.workflow_data['category']
+    
     def _format_final_response(self) -> str:
         """
         Formatea la respuesta final con las recomendaciones
@@ -209,9 +266,33 @@ Puedo ayudarte con:
         Returns:
             Respuesta a la pregunta
         """
+        context, question_vector, cached = self._followup_lookup(user_input)
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        result = self.recommender.invoke_llm(self._followup_prompt(), self._followup_variables(user_input))
+        
+        return self._followup_response(user_input, result.content, context, question_vector, start)
+    
+    async def _ahandle_followup_question(self, user_input: str) -> Dict[str, Any]:
+        """Versión asíncrona de _handle_followup_question()"""
+        # El embedding de la pregunta (CPU) se calcula en el executor
+        loop = asyncio.get_running_loop()
+        context, question_vector, cached = await loop.run_in_executor(None, self._followup_lookup, user_input)
+        if cached is not None:
+            return cached
+        
+        start = time.perf_counter()
+        result = await self.recommender.ainvoke_llm(self._followup_prompt(), self._followup_variables(user_input))
+        
+        return self._followup_response(user_input, result.content, context, question_vector, start)
+    
+    def _followup_prompt(self):
+        """Prompt de las preguntas de seguimiento"""
         from langchain_core.prompts import ChatPromptTemplate
         
-        prompt = ChatPromptTemplate.from_messages([
+        return ChatPromptTemplate.from_messages([
             ("system", """Eres AURA, un asistente experto en productos.
             Ya has generado recomendaciones para el usuario después de una conversación detallada.
             Ahora responde sus preguntas adicionales basándote en:
@@ -237,24 +318,61 @@ PREGUNTA DEL USUARIO:
 
 Por favor, responde la pregunta de forma clara y útil:""")
         ])
-        
-        chain = prompt | self.recommender.llm
-        
+    
+    def _followup_variables(self, user_input: str) -> Dict[str, str]:
+        """Variables del prompt de seguimiento"""
         # Crear resumen de conversación
         conversation_summary = "\n".join([
             f"{'AURA' if msg['role'] == 'assistant' else 'Usuario'}: {msg['content']}"
             for msg in self.workflow_data.get('conversation_history', [])[-4:]
         ])
         
-        result = chain.invoke({
+        return {
             "conversation_summary": conversation_summary,
             "user_analysis": self.workflow_data.get('user_analysis', ''),
             "recommendations": self.workflow_data.get('recommendations', ''),
             "question": user_input
-        })
+        }
+    
+    def _followup_lookup(self, user_input: str) -> tuple:
+        """
+        Busca la respuesta de una pregunta equivalente sobre las mismas recomendaciones
+        
+        Returns:
+            Tupla (huella del contexto, embedding de la pregunta, respuesta
+            cacheada o None); sin caché semántica, (None, None, None)
+        """
+        if self.followup_cache is None:
+            return None, None, None
+        
+        context = SemanticAnswerCache.fingerprint(
+            self.workflow_data.get('user_analysis', ''),
+            self.workflow_data.get('recommendations', '')
+        )
+        answer, question_vector = self.followup_cache.lookup(user_input, context)
+        if answer is None:
+            return context, question_vector, None
+        return context, question_vector, {
+            "message": answer,
+            "status": "followup",
+            "cached": True
+        }
+    
+    def _followup_response(
+        self,
+        user_input: str,
+        answer: str,
+        context: Optional[str],
+        question_vector,
+        start: float
+    ) -> Dict[str, Any]:
+        """Guarda la respuesta en la caché semántica y construye el resultado"""
+        latency_ms = (time.perf_counter() - start) * 1000
+        if context is not None:
+            self.followup_cache.store(user_input, context, answer, question_vector, latency_ms)
         
         return {
-            "message": result.content,
+            "message": answer,
             "status": "followup"
         }
     
@@ -262,6 +380,37 @@ Por favor, responde la pregunta de forma clara y útil:""")
         """Obtiene el estado actual del flujo"""
         return self.state.value
     
+    def llm_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Obtiene los contadores de llamadas al LLM y de su caché
+        
+        Returns:
+            Estadísticas por agente, de la caché compartida ("cache") y de
+            la caché semántica de preguntas de seguimiento ("followup_cache")
+        """
+        agents = (self.collector, self.analyzer, self.recommender)
+        stats = {agent.name: agent.llm_cache_stats() for agent in agents}
+        cache = next((agent.llm_cache for agent in agents if agent.llm_cache is not None), None)
+        if cache is not None:
+            stats["cache"] = cache.stats()
+        if self.followup_cache is not None:
+            stats["followup_cache"] = self.followup_cache.stats()
+        return stats
+    
+    def stage_timings(self) -> Dict[str, Any]:
+        """
+        Obtiene los tiempos de la última ejecución del flujo de recomendación
+        
+        Returns:
+            Inicio, fin y duración (ms) de cada etapa y la ruta crítica
+        """
+        path, path_ms = self.workflow_graph.last_critical_path
+        return {
+            "stages": self.workflow_graph.last_timings,
+            "critical_path": path,
+            "critical_path_ms": path_ms
+        }
+    
     def reset(self):
         """Reinicia el orquestador"""
         self.collector.reset()
@@ -0,0 +1,264 @@
+"""
+Índice léxico BM25 con tokenización para español
+"""
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from src.rag.filters import matches
+
+
+# Palabras vacías frecuentes en español (ya sin tildes)
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun cada como con contra cual
+cuales cuando de del desde donde dos el ella ellas ello ellos en entre era eran es esa esas ese
+eso esos esta estaba estan estar estas este esto estos fue fueron ha hay la las le les lo los mas
+me mi mis muy nada ni no nos o os otra otras otro otros para pero poco por porque que quien se
+sea segun ser si sin sobre solo son su sus tambien tan te tiene tienen tu tus un una unas uno unos
+y ya yo
+""".split())
+
+# Los "+" finales forman parte del término ("j7+", "c++"), no los intermedios ("5+3")
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\+(?![a-z0-9]))*")
+
+
+def fold_accents(text: str) -> str:
+    """Pasa a minúsculas y elimina tildes y diéresis ("Cámara" -> "camara")"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Divide un texto en términos para BM25
+
+    Pliega tildes y mayúsculas y descarta palabras vacías. Los códigos y
+    modelos alfanuméricos ("HOME002", "j7+") se conservan como un término.
+
+    Args:
+        text: Texto a tokenizar
+
+    Returns:
+        Lista de términos
+    """
+    return [token for token in _TOKEN_RE.findall(fold_accents(text)) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Índice invertido con puntuación Okapi BM25
+
+    Los documentos se identifican por el mismo ID de chunk que usa el
+    índice vectorial, de modo que ambos se actualizan juntos. Se persiste
+    como JSON y el índice invertido se reconstruye al cargar.
+    """
+
+    # 2: los términos conservan los "+" finales
+    VERSION = 2
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            path: Ruta del archivo JSON del índice
+            k1: Saturación de la frecuencia de término
+            b: Normalización por longitud del documento
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+
+        self._documents: Dict[str, Tuple[str, dict]] = {}
+        self._term_freqs: Dict[str, Dict[str, int]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    @classmethod
+    def load(cls, path: str, **params: float) -> "BM25Index":
+        """
+        Carga el índice desde disco (vacío si no existe)
+
+        Args:
+            path: Ruta del archivo JSON del índice
+            **params: k1 y b
+
+        Returns:
+            Índice cargado
+        """
+        data = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        return cls.from_dict(path, data, **params)
+
+    @classmethod
+    def from_dict(cls, path: str, data: Optional[dict], **params: float) -> "BM25Index":
+        """
+        Reconstruye el índice a partir de los datos de to_dict()
+
+        Args:
+            path: Ruta donde se guardará el índice
+            data: Datos serializados (None = índice vacío; los de otra
+                versión se vuelven a tokenizar a partir de sus textos)
+            **params: k1 y b
+
+        Returns:
+            Índice reconstruido
+        """
+        index = cls(path, **params)
+        if not data:
+            return index
+        if data.get("version") == cls.VERSION:
+            for chunk_id, (text, metadata, term_freqs) in data["documents"].items():
+                index._store(chunk_id, text, metadata, term_freqs)
+        else:
+            for chunk_id, (text, metadata, _) in data.get("documents", {}).items():
+                index.add([chunk_id], [text], [metadata])
+        return index
+
+    def to_dict(self) -> dict:
+        """Datos serializables del índice (textos, metadatos y frecuencias)"""
+        return {
+            "version": self.VERSION,
+            "documents": {
+                chunk_id: [text, metadata, self._term_freqs[chunk_id]]
+                for chunk_id, (text, metadata) in self._documents.items()
+            },
+        }
+
+    def save(self):
+        """Guarda el índice en disco de forma atómica"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[dict]] = None):
+        """
+        Indexa (o reemplaza) chunks
+
+        Args:
+            ids: IDs de los chunks
+            texts: Texto de cada chunk
+            metadatas: Metadatos de cada chunk
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            self._remove(chunk_id)
+            self._store(chunk_id, text, dict(metadata or {}), dict(Counter(tokenize(text))))
+
+    def delete(self, ids: List[str]):
+        """Elimina chunks por ID"""
+        for chunk_id in ids:
+            self._remove(chunk_id)
+
+    def clear(self):
+        """Vacía el índice"""
+        self._documents, self._term_freqs, self._postings, self._lengths = {}, {}, {}, {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def search(self, query: str, k: int = 4, where: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """
+        Busca los k chunks con mayor puntuación BM25
+
+        Args:
+            query: Consulta de búsqueda
+            k: Número de resultados
+            where: Cláusula where sobre los metadatos (ver src.rag.filters)
+
+        Returns:
+            Lista de tuplas (documento, puntuación BM25), de mayor a menor
+        """
+        count = len(self._documents)
+        if not count:
+            return []
+
+        average_length = self._total_length / count
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, freq in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+
+        if where:
+            scores = {
+                chunk_id: score for chunk_id, score in scores.items()
+                if matches(self._documents[chunk_id][1], where)
+            }
+        top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self._document(chunk_id), score) for chunk_id, score in top]
+
+    def _store(self, chunk_id: str, text: str, metadata: dict, term_freqs: Dict[str, int]):
+        """Registra un chunk ya tokenizado en el índice invertido"""
+        self._documents[chunk_id] = (text, metadata)
+        self._term_freqs[chunk_id] = term_freqs
+        length = sum(term_freqs.values())
+        self._lengths[chunk_id] = length
+        self._total_length += length
+        for term, freq in term_freqs.items():
+            self._postings.setdefault(term, {})[chunk_id] = freq
+
+    def _remove(self, chunk_id: str):
+        """Quita un chunk del índice invertido si existe"""
+        if chunk_id not in self._documents:
+            return
+        for term in self._term_freqs.pop(chunk_id):
+            postings = self._postings[term]
+            del postings[chunk_id]
+            if not postings:
+                del self._postings[term]
+        del self._documents[chunk_id]
+        self._total_length -= self._lengths.pop(chunk_id)
+
+    def _document(self, chunk_id: str) -> Document:
+        text, metadata = self._documents[chunk_id]
+        return Document(page_content=text, metadata=dict(metadata))
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]],
+    k: int,
+    rrf_k: int = 60
+) -> List[Tuple[Document, float]]:
+    """
+    Combina varias listas ordenadas con Reciprocal Rank Fusion
+
+    Cada documento suma 1 / (rrf_k + posición) por cada lista en la que
+    aparece. Los documentos se identifican por origen y contenido, ya que
+    no todos los backends devuelven el ID del chunk.
+
+    Args:
+        rankings: Listas de documentos, cada una de más a menos relevante
+        k: Número de resultados
+        rrf_k: Constante de suavizado (60 en el artículo original)
+
+    Returns:
+        Lista de tuplas (documento, distancia) donde la distancia es
+        1 - rrf / rrf_máximo: 0 si el documento fue el primero en todas
+        las listas, cerca de 1 si apenas aparece
+    """
+    scores: Dict[tuple, float] = {}
+    documents: Dict[tuple, Document] = {}
+    for ranking in rankings:
+        for position, doc in enumerate(ranking, 1):
+            key = (str(doc.metadata.get("source", "")), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + position)
+            documents.setdefault(key, doc)
+
+    best_possible = len(rankings) / (rrf_k + 1)
+    top = sorted(scores.items(), key=lambda item: -item[1])[:k]
+    return [(documents[key], 1.0 - score / best_possible) for key, score in top]
@@ -1,8 +1,12 @@
 """
 Cargador de documentos para diferentes tipos de archivos
 """
+import numbers
 import os
-from typing import List
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 
 from langchain_community.document_loaders import (
@@ -16,6 +20,95 @@ from langchain_core.documents import Document
 import json
 import pandas as pd
 
+from src.config import config
+from src.rag.bm25 import fold_accents
+from src.rag.filters import extract_price
+
+
+# Atributos de producto que se copian a los metadatos, con su tipo
+PRODUCT_ATTRIBUTES = {
+    "id": str,
+    "nombre": str,
+    "categoria": str,
+    "marca": str,
+    "precio": float,
+    "stock": int,
+}
+
+
+def product_metadata(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extrae los atributos de producto tipados de un registro
+    
+    Los nombres de campo se comparan sin mayúsculas ni tildes
+    ("Categoría" -> categoria). Los valores vacíos o no convertibles se
+    omiten, de modo que los filtros nunca comparan tipos distintos.
+    
+    Args:
+        record: Campos del producto (fila de CSV/Excel u objeto JSON)
+        
+    Returns:
+        Metadatos con id, nombre, categoria, marca, precio y stock
+    """
+    metadata = {}
+    for field, value in record.items():
+        name = fold_accents(str(field)).strip()
+        if name in PRODUCT_ATTRIBUTES:
+            converted = _convert_attribute(PRODUCT_ATTRIBUTES[name], value)
+            if converted is not None:
+                metadata[name] = converted
+    return metadata
+
+
+def _convert_attribute(kind: type, value: Any) -> Any:
+    """Convierte un valor al tipo del atributo (None si está vacío o no es válido)"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, numbers.Number):
+        if value != value:  # NaN
+            return None
+        return str(value) if kind is str else kind(value)
+    
+    text = str(value).strip()
+    if not text:
+        return None
+    if kind is str:
+        return text
+    # Ignorar símbolos de moneda y admitir ambos formatos ("$1,299.99", "1.299,99 €")
+    number = extract_price(text)
+    return kind(number) if number is not None else None
+
+
+def _numeric_columns_as_text(file_path: str) -> Dict[str, type]:
+    """
+    dtype de pandas que lee como texto las columnas de precio y stock de un CSV
+
+    pandas interpreta "1.200" como 1.2; leídas como texto, _convert_attribute
+    distingue el separador de miles del decimal ("1.299,99", "1,299.99").
+    """
+    columns = pd.read_csv(file_path, nrows=0).columns
+    return {
+        column: str for column in columns
+        if PRODUCT_ATTRIBUTES.get(fold_accents(str(column)).strip()) in (float, int)
+    }
+
+
+def _load_file(file_path: str) -> Tuple[List[Document], Optional[str]]:
+    """
+    Carga un archivo en un proceso trabajador
+    
+    Args:
+        file_path: Ruta al archivo
+        
+    Returns:
+        Tupla (documentos, mensaje de error o None)
+    """
+    loader = DocumentLoader()
+    try:
+        return loader.load_file(file_path), None
+    except Exception as e:
+        return [], str(e)
+
 
 class DocumentLoader:
     """Cargador universal de documentos de productos"""
@@ -32,15 +125,17 @@ class DocumentLoader:
             '.xls': self._load_excel,
         }
     
-    def load_documents(self, directory: str) -> List[Document]:
+    def load_documents(self, directory: str, workers: int = None) -> List[Document]:
         """
         Carga todos los documentos de un directorio
         
         Args:
             directory: Ruta al directorio con los archivos
+            workers: Número de procesos para la carga en paralelo
+                (por defecto config.LOADER_WORKERS; 1 = secuencial, 0 = todos los núcleos)
             
         Returns:
-            Lista de documentos cargados
+            Lista de documentos cargados, en el orden de los archivos
         """
         documents = []
         directory_path = Path(directory)
@@ -48,19 +143,124 @@ class DocumentLoader:
         if not directory_path.exists():
             raise ValueError(f"El directorio {directory} no existe")
         
-        for file_path in directory_path.rglob('*'):
-            if file_path.is_file():
-                ext = file_path.suffix.lower()
-                if ext in self.supported_extensions:
-                    try:
-                        docs = self.supported_extensions[ext](str(file_path))
-                        documents.extend(docs)
-                        print(f"✓ Cargado: {file_path.name}")
-                    except Exception as e:
-                        print(f"✗ Error cargando {file_path.name}: {e}")
+        files = self.list_files(directory)
+        
+        workers = config.LOADER_WORKERS if workers is None else workers
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(files)) or 1
+        
+        start = time.perf_counter()
+        
+        if workers == 1:
+            results = map(_load_file, files)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            # map() conserva el orden de entrada aunque los archivos terminen en otro orden
+            chunksize = max(1, len(files) // (workers * 4))
+            results = executor.map(_load_file, files, chunksize=chunksize)
+        
+        try:
+            for file_path, (docs, error) in zip(files, results):
+                name = Path(file_path).name
+                if error is None:
+                    documents.extend(docs)
+                    print(f"✓ Cargado: {name}")
+                else:
+                    print(f"✗ Error cargando {name}: {error}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print(
+            f"⏱️ {len(files)} archivos, {len(documents)} documentos en {elapsed:.2f}s "
+            f"({len(files) / elapsed:.1f} archivos/s, {len(documents) / elapsed:.1f} docs/s, "
+            f"{workers} proceso{'s' if workers != 1 else ''})"
+        )
         
         return documents
     
+    def iter_documents(self, directory: str, chunk_rows: int = None) -> Iterator[Document]:
+        """
+        Recorre los documentos de un directorio sin cargarlos todos en memoria
+        
+        Los CSV y Excel (.xlsx) se leen en bloques de filas acotados, de modo
+        que el consumo de memoria no depende del tamaño del archivo. El resto
+        de formatos, incluido el Excel antiguo (.xls), que openpyxl no puede
+        leer en modo read-only, se carga entero archivo a archivo.
+        
+        Args:
+            directory: Ruta al directorio con los archivos
+            chunk_rows: Filas por bloque (por defecto config.LOADER_CHUNK_ROWS)
+            
+        Yields:
+            Documentos a medida que se generan
+        """
+        if not Path(directory).exists():
+            raise ValueError(f"El directorio {directory} no existe")
+        
+        for file_path in self.list_files(directory):
+            name = Path(file_path).name
+            try:
+                yield from self.iter_file(file_path, chunk_rows)
+                print(f"✓ Cargado: {name}")
+            except Exception as e:
+                print(f"✗ Error cargando {name}: {e}")
+    
+    def iter_file(self, file_path: str, chunk_rows: int = None) -> Iterator[Document]:
+        """
+        Recorre los documentos de un archivo, en bloques si el formato lo permite
+        
+        Args:
+            file_path: Ruta al archivo
+            chunk_rows: Filas por bloque (por defecto config.LOADER_CHUNK_ROWS)
+            
+        Yields:
+            Documentos del archivo
+        """
+        chunk_rows = chunk_rows or config.LOADER_CHUNK_ROWS
+        ext = Path(file_path).suffix.lower()
+        
+        if ext == '.csv':
+            yield from self._iter_csv(file_path, chunk_rows)
+        elif ext == '.xlsx':
+            yield from self._iter_excel(file_path, chunk_rows)
+        else:
+            yield from self.load_file(file_path)
+    
+    def list_files(self, directory: str) -> List[str]:
+        """
+        Lista los archivos soportados de un directorio en orden determinista
+        
+        Args:
+            directory: Ruta al directorio con los archivos
+            
+        Returns:
+            Rutas de los archivos ordenadas
+        """
+        return sorted(
+            str(file_path)
+            for file_path in Path(directory).rglob('*')
+            if file_path.is_file() and file_path.suffix.lower() in self.supported_extensions
+        )
+    
+    def load_file(self, file_path: str) -> List[Document]:
+        """
+        Carga un único archivo según su extensión
+        
+        Args:
+            file_path: Ruta al archivo
+            
+        Returns:
+            Lista de documentos del archivo
+        """
+        ext = Path(file_path).suffix.lower()
+        if ext not in self.supported_extensions:
+            raise ValueError(f"Extensión no soportada: {ext}")
+        return self.supported_extensions[ext](file_path)
+    
     def _load_pdf(self, file_path: str) -> List[Document]:
         """Carga archivos PDF"""
         loader = PyPDFLoader(file_path)
@@ -74,18 +274,8 @@ class DocumentLoader:
     def _load_csv(self, file_path: str) -> List[Document]:
         """Carga archivos CSV"""
         try:
-            df = pd.read_csv(file_path)
-            documents = []
-            
-            for idx, row in df.iterrows():
-                content = "\n".join([f"{col}: {row[col]}" for col in df.columns])
-                doc = Document(
-                    page_content=content,
-                    metadata={"source": file_path, "row": idx}
-                )
-                documents.append(doc)
-            
-            return documents
+            df = pd.read_csv(file_path, dtype=_numeric_columns_as_text(file_path))
+            return self._dataframe_to_documents(df, file_path)
         except Exception as e:
             # Fallback al loader estándar
             loader = CSVLoader(file_path)
@@ -102,17 +292,23 @@ class DocumentLoader:
         if isinstance(data, list):
             for idx, item in enumerate(data):
                 content = json.dumps(item, indent=2, ensure_ascii=False)
+                metadata = {"source": file_path, "index": idx}
+                if isinstance(item, dict):
+                    metadata.update(product_metadata(item))
                 doc = Document(
                     page_content=content,
-                    metadata={"source": file_path, "index": idx}
+                    metadata=metadata
                 )
                 documents.append(doc)
         # Si es un objeto único
         else:
             content = json.dumps(data, indent=2, ensure_ascii=False)
+            metadata = {"source": file_path}
+            if isinstance(data, dict):
+                metadata.update(product_metadata(data))
             doc = Document(
                 page_content=content,
-                metadata={"source": file_path}
+                metadata=metadata
             )
             documents.append(doc)
         
@@ -127,19 +323,140 @@ class DocumentLoader:
         """Carga archivos Excel"""
         try:
             df = pd.read_excel(file_path)
-            documents = []
-            
-            for idx, row in df.iterrows():
-                content = "\n".join([f"{col}: {row[col]}" for col in df.columns])
-                doc = Document(
-                    page_content=content,
-                    metadata={"source": file_path, "row": idx}
-                )
-                documents.append(doc)
-            
-            return documents
+            return self._dataframe_to_documents(df, file_path)
         except Exception as e:
             # Fallback al loader estándar
             loader = UnstructuredExcelLoader(file_path)
             return loader.load()
-
+    
+    def _iter_csv(self, file_path: str, chunk_rows: int) -> Iterator[Document]:
+        """
+        Lee un CSV en bloques de filas
+        
+        pandas infiere los tipos de cada bloque por separado, así que una
+        columna entera con huecos en un bloque puede mostrarse como float
+        en ese bloque (p. ej. "stock: 5.0"). Si pandas no puede leer el
+        archivo se recurre, igual que en _load_csv, al CSVLoader estándar,
+        continuando a partir de la última fila ya generada.
+        """
+        emitted = 0
+        try:
+            dtype = _numeric_columns_as_text(file_path)
+            for chunk in pd.read_csv(file_path, chunksize=chunk_rows, dtype=dtype):
+                for doc in self._dataframe_to_documents(chunk, file_path):
+                    yield doc
+                    emitted += 1
+        except Exception:
+            # Fallback al loader estándar
+            loader = CSVLoader(file_path)
+            yield from islice(loader.lazy_load(), emitted, None)
+    
+    def _iter_excel(self, file_path: str, chunk_rows: int) -> Iterator[Document]:
+        """
+        Lee la primera hoja de un Excel en bloques con openpyxl en modo read-only
+        
+        Numera las filas igual que pd.read_excel en _load_excel: las filas
+        vacías intermedias se conservan y solo se descartan las del final,
+        que las hojas read-only suelen arrastrar. Si openpyxl no puede leer
+        el archivo se recurre, igual que en _load_excel, al
+        UnstructuredExcelLoader, continuando a partir del último documento
+        ya generado.
+        """
+        emitted = 0
+        try:
+            from openpyxl import load_workbook
+            
+            workbook = load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                rows = workbook.worksheets[0].iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    return
+                columns = [
+                    name if name is not None else f"Unnamed: {i}"
+                    for i, name in enumerate(header)
+                ]
+                
+                buffer = []
+                blank = []
+                offset = 0
+                for values in rows:
+                    # Las filas vacías solo se emiten si después hay datos
+                    if all(value is None for value in values):
+                        blank.append(values)
+                        continue
+                    buffer.extend(blank)
+                    blank = []
+                    buffer.append(values)
+                    if len(buffer) >= chunk_rows:
+                        for doc in self._rows_to_documents(buffer, columns, offset, file_path):
+                            yield doc
+                            emitted += 1
+                        offset += len(buffer)
+                        buffer = []
+                
+                for doc in self._rows_to_documents(buffer, columns, offset, file_path):
+                    yield doc
+                    emitted += 1
+            finally:
+                workbook.close()
+        except Exception:
+            # Fallback al loader estándar
+            loader = UnstructuredExcelLoader(file_path)
+            yield from islice(loader.lazy_load(), emitted, None)
+    
+    def _rows_to_documents(
+        self,
+        rows: List[tuple],
+        columns: List[str],
+        offset: int,
+        file_path: str
+    ) -> List[Document]:
+        """Convierte un bloque de filas crudas en documentos numerados desde offset"""
+        # Celdas vacías como NaN, igual que en pd.read_excel
+        rows = [[float("nan") if value is None else value for value in values] for values in rows]
+        df = pd.DataFrame(rows, columns=columns, index=range(offset, offset + len(rows)))
+        df = df.infer_objects()
+        return self._dataframe_to_documents(df, file_path)
+    
+    def _dataframe_to_documents(self, df: pd.DataFrame, file_path: str) -> List[Document]:
+        """
+        Convierte cada fila de un DataFrame en un documento "columna: valor"
+        
+        Construye los textos columna a columna en lugar de recorrer las filas
+        con iterrows(). Los valores se toman de df.to_numpy(), que aplica la
+        misma conversión de tipos que iterrows(), por lo que el texto generado
+        es idéntico. Los atributos de producto (precio, categoría, etc.) se
+        copian además a los metadatos con su tipo.
+        
+        Args:
+            df: DataFrame con una fila por producto
+            file_path: Ruta del archivo de origen
+            
+        Returns:
+            Lista de documentos, uno por fila
+        """
+        if df.empty:
+            return []
+        
+        values = df.to_numpy()
+        columns = [
+            [f"{col}: {value}" for value in values[:, j]]
+            for j, col in enumerate(df.columns)
+        ]
+        contents = ["\n".join(parts) for parts in zip(*columns)]
+        
+        metadatas = [{"source": file_path, "row": idx} for idx in df.index.tolist()]
+        for j, col in enumerate(df.columns):
+            name = fold_accents(str(col)).strip()
+            if name not in PRODUCT_ATTRIBUTES:
+                continue
+            for metadata, value in zip(metadatas, values[:, j]):
+                converted = _convert_attribute(PRODUCT_ATTRIBUTES[name], value)
+                if converted is not None:
+                    metadata[name] = converted
+        
+        return [
+            Document(page_content=content, metadata=metadata)
+            for content, metadata in zip(contents, metadatas)
+        ]
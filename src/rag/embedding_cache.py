@@ -0,0 +1,301 @@
+"""
+Caché persistente de embeddings indexada por el hash del contenido
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCache:
+    """
+    Caché en disco de embeddings: SQLite para el índice de claves y una
+    matriz float32 memory-mapped para los vectores
+
+    Cada combinación (modelo, normalización) usa su propio subdirectorio,
+    de modo que cambiar de modelo nunca devuelve vectores incompatibles.
+    Cuando se supera max_entries se desalojan las entradas usadas hace más
+    tiempo y sus filas de la matriz se reutilizan.
+    """
+
+    _GROWTH = 1024
+
+    def __init__(self, directory: str, model_name: str, normalize: bool, max_entries: int):
+        """
+        Args:
+            directory: Directorio raíz de la caché
+            model_name: Nombre del modelo de embeddings
+            normalize: Si los embeddings se normalizan
+            max_entries: Número máximo de vectores guardados
+        """
+        namespace = hashlib.sha1(f"{model_name}|{normalize}".encode('utf-8')).hexdigest()[:16]
+        self.directory = os.path.join(directory, namespace)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._matrix_path = os.path.join(self.directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite"),
+            check_same_thread=False
+        )
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used);
+            CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta VALUES ('model', ?)", (model_name,)
+        )
+        self._conn.commit()
+
+        self.dim: Optional[int] = self._get_meta("dim", int)
+        self._matrix: Optional[np.memmap] = None
+        if self.dim is not None and os.path.exists(self._matrix_path):
+            self._open_matrix()
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Clave de caché de un texto"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Busca varios embeddings
+
+        Args:
+            keys: Claves a buscar
+
+        Returns:
+            Diccionario clave → embedding con las claves encontradas
+        """
+        if not keys or self._matrix is None:
+            self.misses += len(keys)
+            return {}
+
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # La transacción de lectura mantiene el bloqueo compartido de
+            # SQLite mientras se copian las filas: un escritor (BEGIN
+            # EXCLUSIVE en put_many) no puede desalojar esas claves y
+            # reutilizar sus filas hasta que terminemos
+            self._conn.execute("BEGIN")
+            try:
+                slots = self._lookup_slots(list(dict.fromkeys(keys)))
+                if slots and max(slots.values()) >= self._matrix.shape[0]:
+                    # Otro proceso amplió la matriz después de mapearla
+                    self._open_matrix()
+                for key, slot in slots.items():
+                    found[key] = self._matrix[slot].tolist()
+            finally:
+                self._conn.commit()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """
+        Guarda varios embeddings
+
+        Args:
+            items: Diccionario clave → embedding
+        """
+        if not items:
+            return
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = len(next(iter(items.values())))
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+                self._conn.commit()
+                self._open_matrix()
+
+            # BEGIN EXCLUSIVE toma el bloqueo de escritura antes de leer, así
+            # que otro proceso con la misma caché no puede asignar las mismas
+            # filas entre la lectura de next_slot y su actualización. Al ser
+            # exclusivo espera además a que terminen las lecturas de get_many,
+            # que podrían estar copiando las filas que se van a reutilizar
+            # (requiere el journal por defecto de SQLite, no WAL)
+            self._conn.execute("BEGIN EXCLUSIVE")
+            try:
+                self._store(items)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        """Devuelve contadores de aciertos y fallos"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        """Cierra la conexión y libera el mapeo de memoria"""
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
+
+    # Almacenamiento
+
+    def _store(self, items: Dict[str, List[float]]):
+        """Guarda los embeddings que no estén ya en la caché (dentro de una transacción)"""
+        stored = self._lookup_slots(list(items.keys()))
+        new_items = [(key, vector) for key, vector in items.items() if key not in stored]
+        if not new_items:
+            return
+        # Un lote mayor que la caché solo guarda sus últimos max_entries
+        # vectores: guardarlo entero la haría crecer sin límite
+        new_items = new_items[-self.max_entries:] if self.max_entries > 0 else []
+        if not new_items:
+            return
+
+        self._evict(len(new_items))
+        slots = self._allocate(len(new_items))
+
+        now = time.time()
+        for (key, vector), slot in zip(new_items, slots):
+            self._matrix[slot] = np.asarray(vector, dtype=np.float32)
+        self._matrix.flush()
+
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+            [(key, slot, now) for (key, _), slot in zip(new_items, slots)]
+        )
+
+    def _lookup_slots(self, keys: List[str]) -> Dict[str, int]:
+        """Devuelve la fila de la matriz de cada clave presente"""
+        slots: Dict[str, int] = {}
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            slots.update(rows)
+        return slots
+
+    def _evict(self, incoming: int):
+        """Desaloja las entradas menos usadas para dejar sitio a incoming"""
+        overflow = len(self) + incoming - self.max_entries
+        if overflow <= 0:
+            return
+        evicted = self._conn.execute(
+            "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (overflow,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+        self._conn.executemany("INSERT OR IGNORE INTO free_slots VALUES (?)", [(slot,) for _, slot in evicted])
+
+    def _allocate(self, count: int) -> List[int]:
+        """Devuelve filas libres de la matriz, ampliándola si hace falta"""
+        free = [
+            slot for (slot,) in self._conn.execute(
+                "SELECT slot FROM free_slots LIMIT ?", (count,)
+            ).fetchall()
+        ]
+        self._conn.executemany("DELETE FROM free_slots WHERE slot = ?", [(slot,) for slot in free])
+
+        missing = count - len(free)
+        if missing > 0:
+            next_slot = self._get_meta("next_slot", int) or 0
+            free.extend(range(next_slot, next_slot + missing))
+            next_slot += missing
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('next_slot', ?)", (str(next_slot),))
+
+            capacity = self._matrix.shape[0]
+            if next_slot > capacity:
+                self._resize(max(next_slot, capacity + max(self._GROWTH, capacity // 2)))
+
+        return free
+
+    def _open_matrix(self):
+        if not os.path.exists(self._matrix_path):
+            self._resize(self._GROWTH)
+            return
+        rows = os.path.getsize(self._matrix_path) // (4 * self.dim)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+', shape=(rows, self.dim))
+
+    def _resize(self, rows: int):
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        # Nunca encoger: otro proceso puede haber ampliado ya el archivo
+        if os.path.exists(self._matrix_path):
+            rows = max(rows, os.path.getsize(self._matrix_path) // (4 * self.dim))
+        with open(self._matrix_path, 'ab') as f:
+            f.truncate(rows * self.dim * 4)
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+', shape=(rows, self.dim))
+
+    def _get_meta(self, name: str, cast):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return cast(row[0]) if row else None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envuelve un modelo de embeddings consultando primero la caché persistente
+
+    Solo se cachean los embeddings de documentos; las consultas se
+    delegan directamente al modelo.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Devuelve los embeddings de los textos, calculando solo los que faltan"""
+        keys = [EmbeddingCache.key(text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Calcula el embedding de una consulta"""
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Calcula los embeddings de varias consultas en un lote (sin pasar por la caché)"""
+        return self.embeddings.embed_documents(texts)
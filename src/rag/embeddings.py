@@ -0,0 +1,323 @@
+"""
+Modelos de embeddings locales
+"""
+import os
+import threading
+from typing import Callable, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.config import config
+from src.rag.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Codificador de sentence-transformers pensado para indexaciones masivas en CPU
+
+    - Tamaño de lote configurable
+    - Ordena los textos por longitud antes de codificar para que cada lote
+      tenga longitudes parecidas y se desperdicie menos padding
+    - Reparte los lotes entre un pool de procesos (uno por núcleo por
+      defecto) cuando la entrada es lo bastante grande; el pool se crea la
+      primera vez que se necesita y se reutiliza entre llamadas
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        normalize: bool = True,
+        batch_size: int = 32,
+        workers: int = 1
+    ):
+        """
+        Args:
+            model_name: Nombre o ruta local del modelo de sentence-transformers
+            normalize: Si se normalizan los embeddings (norma L2 = 1)
+            batch_size: Textos por lote de codificación
+            workers: Procesos de codificación (0 = todos los núcleos)
+        """
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self._pool = None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Calcula los embeddings de varios textos conservando su orden"""
+        if not texts:
+            return []
+
+        order = np.argsort([len(text) for text in texts], kind='stable')
+        sorted_texts = [texts[i] for i in order]
+
+        if self.workers > 1 and len(texts) >= self.batch_size * self.workers:
+            vectors = self._encode_parallel(sorted_texts)
+        else:
+            vectors = self.model.encode(
+                sorted_texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=self.normalize,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+
+        result = np.empty_like(vectors)
+        result[order] = vectors
+        return result.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Calcula el embedding de una consulta en el proceso actual"""
+        return self.model.encode(
+            [text],
+            normalize_embeddings=self.normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )[0].tolist()
+
+    def close(self):
+        """Detiene el pool de procesos si está activo"""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def _encode_parallel(self, sorted_texts: List[str]) -> np.ndarray:
+        """Codifica en el pool de procesos, con trozos contiguos por longitud"""
+        if self._pool is None:
+            self._pool = self.model.start_multi_process_pool(target_devices=['cpu'] * self.workers)
+
+        # Trozos de varios lotes: cada proceso recibe textos de longitud similar
+        chunk_size = max(self.batch_size, len(sorted_texts) // (self.workers * 4))
+        vectors = self.model.encode_multi_process(
+            sorted_texts,
+            self._pool,
+            batch_size=self.batch_size,
+            chunk_size=chunk_size
+        )
+
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.clip(norms, 1e-12, None)
+
+        return vectors.astype(np.float32)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Embeddings con un modelo exportado a ONNX (p. ej. MiniLM cuantizado a int8)
+    ejecutado con ONNX Runtime en CPU
+
+    El directorio del modelo debe contener el archivo .onnx y los archivos
+    del tokenizador (ver scripts/export_onnx.py). Todo se carga desde
+    disco, sin acceso a la red. Aplica mean pooling sobre la máscara de
+    atención, igual que el modelo de sentence-transformers original.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_file: str = "model.onnx",
+        normalize: bool = True,
+        batch_size: int = 32,
+        threads: int = 0,
+        max_length: int = 128
+    ):
+        """
+        Args:
+            model_dir: Directorio local con el modelo ONNX y el tokenizador
+            model_file: Nombre del archivo .onnx dentro de model_dir
+            normalize: Si se normalizan los embeddings (norma L2 = 1)
+            batch_size: Textos por lote de inferencia
+            threads: Hilos intra-op de ONNX Runtime (0 = valor por defecto)
+            max_length: Longitud máxima en tokens
+        """
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "El backend ONNX requiere onnxruntime y transformers: "
+                "pip install onnxruntime transformers"
+            ) from e
+
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise ValueError(
+                f"No existe el modelo ONNX en {model_path}. "
+                "Genéralo con: python scripts/export_onnx.py"
+            )
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+
+        self.model_dir = model_dir
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Calcula los embeddings de varios textos conservando su orden"""
+        if not texts:
+            return []
+
+        order = np.argsort([len(text) for text in texts], kind='stable')
+        vectors = np.concatenate([
+            self._encode([texts[i] for i in order[start:start + self.batch_size]])
+            for start in range(0, len(texts), self.batch_size)
+        ])
+
+        result = np.empty_like(vectors)
+        result[order] = vectors
+        return result.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Calcula el embedding de una consulta"""
+        return self._encode([text])[0].tolist()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Tokeniza, ejecuta el modelo y aplica mean pooling a un lote"""
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors='np'
+        )
+        inputs = {
+            name: encoded[name].astype(np.int64)
+            for name in ('input_ids', 'attention_mask', 'token_type_ids')
+            if name in self._input_names and name in encoded
+        }
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        mask = encoded['attention_mask'][..., None].astype(np.float32)
+        vectors = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.clip(norms, 1e-12, None)
+
+        return vectors.astype(np.float32)
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Crea el modelo de embeddings en segundo plano o al usarlo por primera vez
+
+    Permite abrir el índice (p. ej. desde un snapshot) sin esperar a que
+    cargue el modelo; las llamadas que lleguen antes esperan a que termine.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], preload: bool = True):
+        """
+        Args:
+            factory: Función que crea el modelo (p. ej. create_embeddings)
+            preload: Si se empieza a cargar ya en un hilo aparte
+        """
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+        if preload:
+            threading.Thread(target=self._load, daemon=True).start()
+
+    @property
+    def model(self) -> Embeddings:
+        """Modelo cargado (espera a la carga si está en curso)"""
+        return self._model or self._load()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.model.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Calcula los embeddings de varias consultas en un lote"""
+        model = self.model
+        if hasattr(model, "embed_queries"):
+            return model.embed_queries(texts)
+        return model.embed_documents(texts)
+
+    def _load(self) -> Embeddings:
+        with self._lock:
+            if self._model is None:
+                self._model = self._factory()
+                print("✓ Modelo de embeddings listo")
+        return self._model
+
+
+def create_embeddings() -> Embeddings:
+    """
+    Crea el modelo de embeddings según config.EMBEDDING_BACKEND
+
+    Returns:
+        Modelo de embeddings (envuelto en la caché persistente si está activa)
+    """
+    backend = config.EMBEDDING_BACKEND
+    cache_namespace = config.EMBEDDING_MODEL
+
+    if backend == "huggingface":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        embeddings = HuggingFaceEmbeddings(
+            model_name=config.EMBEDDING_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={
+                'normalize_embeddings': True,
+                'batch_size': config.EMBEDDING_BATCH_SIZE,
+            }
+        )
+    elif backend == "batched":
+        embeddings = BatchedEmbeddings(
+            config.EMBEDDING_MODEL,
+            normalize=True,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            workers=config.EMBEDDING_WORKERS
+        )
+    elif backend == "onnx":
+        embeddings = OnnxEmbeddings(
+            config.ONNX_MODEL_DIR,
+            model_file=config.ONNX_MODEL_FILE,
+            normalize=True,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            threads=config.ONNX_THREADS
+        )
+        # Los vectores cuantizados no son idénticos a los de PyTorch
+        cache_namespace = f"onnx:{os.path.abspath(config.ONNX_MODEL_DIR)}/{config.ONNX_MODEL_FILE}"
+    else:
+        raise ValueError(
+            f"EMBEDDING_BACKEND desconocido: {backend}. "
+            "Valores válidos: huggingface, batched, onnx"
+        )
+
+    # Reutilizar embeddings de chunks idénticos entre reconstrucciones
+    if config.EMBEDDING_CACHE_ENABLED:
+        embeddings = CachedEmbeddings(
+            embeddings,
+            EmbeddingCache(
+                config.EMBEDDING_CACHE_DIR,
+                model_name=cache_namespace,
+                normalize=True,
+                max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES
+            )
+        )
+
+    return embeddings
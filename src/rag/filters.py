@@ -0,0 +1,343 @@
+"""
+Filtros estructurados sobre los metadatos de producto
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import config
+
+
+# Claves admitidas en los filtros de VectorStore.search*
+FILTER_KEYS = ("precio_min", "precio_max", "categoria", "marca", "en_stock")
+PRICE_KEYS = ("precio_min", "precio_max")
+
+_NUMBER_RE = re.compile(r"\d[\d.,]*")
+
+# Cantidad con moneda y escala opcionales: "$1.200", "800 dólares", "1,5 millones de pesos"
+_AMOUNT_RE = re.compile(
+    r"(?P<currency>us\$|\$|€|usd\s|eur\s)?\s*"
+    r"(?P<number>\d[\d.,]*\d|\d)"
+    r"(?:\s*(?P<scale>millones|millón|millon|mil|k)\b)?"
+    r"(?:\s*(?:de\s+)?(?P<unit>dólares|dolares|dólar|dolar|usd|euros|euro|eur|€|pesos|mxn)(?![a-z]))?"
+)
+_SCALES = {"mil": 1_000, "k": 1_000, "millón": 1_000_000, "millon": 1_000_000, "millones": 1_000_000}
+_MAX_BEFORE_RE = re.compile(
+    r"(?:hasta|m[aá]ximo|m[aá]x\.?|como mucho|menos de|no m[aá]s de|tope de|alrededor de|"
+    r"unos|aproximadamente|aprox\.?|cerca de|presupuesto(?: es)? de)\s*$"
+)
+_MIN_BEFORE_RE = re.compile(r"(?:desde|m[ií]nimo(?: de)?)\s*$")
+_RANGE_START_RE = re.compile(r"(?:entre|de|desde)\s*$")
+_RANGE_JOIN_RE = re.compile(r"\s*(?:y|a|hasta|-|–)\s*")
+_NEXT_WORD_RE = re.compile(r"\s*([a-záéíóúñü]+)")
+_LINK_WORDS = {"y", "o", "para", "por", "en", "como", "mas", "más", "aprox", "aproximadamente", "aunque", "pero"}
+
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[dict]:
+    """
+    Traduce filtros de producto a una cláusula where (sintaxis de Chroma)
+
+    Filtros admitidos:
+    - precio_min / precio_max: rango de precio (inclusive)
+    - categoria / marca: valor exacto o lista de valores aceptados
+    - en_stock: True para exigir stock > 0
+
+    Los documentos sin el atributo filtrado (p. ej. catálogos en texto
+    libre sin precio) no cumplen la cláusula; VectorStore.search* vuelve a
+    incluir los que no tienen precio (ver without_price y merge_unpriced).
+
+    Args:
+        filters: Diccionario de filtros (None o vacío = sin filtro)
+
+    Returns:
+        Cláusula where o None si no hay condiciones
+    """
+    if not filters:
+        return None
+
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(
+            f"Filtros desconocidos: {', '.join(sorted(unknown))}. "
+            f"Valores válidos: {', '.join(FILTER_KEYS)}"
+        )
+
+    conditions = []
+    if filters.get("precio_min") is not None:
+        conditions.append({"precio": {"$gte": float(filters["precio_min"])}})
+    if filters.get("precio_max") is not None:
+        conditions.append({"precio": {"$lte": float(filters["precio_max"])}})
+    for field in ("categoria", "marca"):
+        value = filters.get(field)
+        if isinstance(value, (list, tuple, set)):
+            if value:
+                conditions.append({field: {"$in": list(value)}})
+        elif value:
+            conditions.append({field: {"$eq": value}})
+    if filters.get("en_stock"):
+        conditions.append({"stock": {"$gt": 0}})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def without_price(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Filtros sin el rango de precio, para buscar los documentos sin precio
+
+    Un filtro de precio no puede evaluarse sobre documentos sin precio
+    (PDF, DOCX o TXT en texto libre): en lugar de descartarlos se buscan
+    aparte con el resto de filtros y se mezclan con merge_unpriced().
+
+    Args:
+        filters: Diccionario de filtros
+
+    Returns:
+        Filtros sin precio_min / precio_max, o None si no había filtro de precio
+    """
+    if not filters or all(filters.get(key) is None for key in PRICE_KEYS):
+        return None
+    return {key: value for key, value in filters.items() if key not in PRICE_KEYS}
+
+
+def merge_unpriced(
+    results: List[Tuple[Any, float]],
+    unfiltered: List[Tuple[Any, float]],
+    k: int,
+    higher_is_better: bool = False
+) -> List[Tuple[Any, float]]:
+    """
+    Añade a resultados filtrados por precio los documentos sin precio
+
+    Args:
+        results: Tuplas (documento, score) que cumplen el filtro de precio
+        unfiltered: Tuplas (documento, score) de la misma búsqueda sin filtro de precio
+        k: Número de resultados
+        higher_is_better: True si el score es una puntuación (BM25) y no una distancia
+
+    Returns:
+        Los k mejores resultados de ambas listas, ordenados por score
+    """
+    unpriced = [(doc, score) for doc, score in unfiltered if "precio" not in doc.metadata]
+    if not unpriced:
+        return results[:k]
+    merged = sorted(results + unpriced, key=lambda item: -item[1] if higher_is_better else item[1])
+    return merged[:k]
+
+
+def matches(metadata: dict, where: Optional[dict]) -> bool:
+    """
+    Evalúa una cláusula where sobre los metadatos de un documento
+
+    Implementa el subconjunto de operadores que genera build_where() más
+    $or, $ne y $nin, para los índices que filtran en Python (NumPy, HNSW
+    y BM25).
+
+    Args:
+        metadata: Metadatos del documento
+        where: Cláusula where (None = sin filtro)
+
+    Returns:
+        True si el documento cumple la cláusula
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, clause) for clause in condition):
+                return False
+        elif not _matches_field(metadata.get(key), condition):
+            return False
+    return True
+
+
+def _matches_field(value: Any, condition: Any) -> bool:
+    """Evalúa las condiciones de un campo (valor directo o {"$op": operando})"""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    if value is None:
+        return False
+
+    for operator, operand in condition.items():
+        try:
+            if operator == "$eq":
+                ok = value == operand
+            elif operator == "$ne":
+                ok = value != operand
+            elif operator == "$gt":
+                ok = value > operand
+            elif operator == "$gte":
+                ok = value >= operand
+            elif operator == "$lt":
+                ok = value < operand
+            elif operator == "$lte":
+                ok = value <= operand
+            elif operator == "$in":
+                ok = value in operand
+            elif operator == "$nin":
+                ok = value not in operand
+            else:
+                raise ValueError(f"Operador de filtro no soportado: {operator}")
+        except TypeError:
+            # Tipos no comparables (p. ej. texto frente a número)
+            ok = False
+        if not ok:
+            return False
+    return True
+
+
+def parse_budget(text: Any) -> Dict[str, float]:
+    """
+    Extrae un rango de precio de un presupuesto en texto libre
+
+    Solo se tienen en cuenta las cantidades con forma de precio: con
+    moneda ("$800", "800 dólares", "500 €"), con escala ("5 mil", "1,5
+    millones"), precedidas de "hasta", "máximo", "unos"... o que forman un
+    rango ("entre 500 y 1.000"). Un número suelto solo cuenta si es todo el
+    texto ("1000"). Así "hasta 800 dólares para 2 personas" ->
+    {"precio_max": 800}. El precio mínimo solo se fija con "desde",
+    "mínimo" o un rango.
+
+    Args:
+        text: Presupuesto (texto o número)
+
+    Returns:
+        Filtros precio_min / precio_max (vacío si no hay cantidades)
+    """
+    if text is None or isinstance(text, bool):
+        return {}
+    if isinstance(text, (int, float)):
+        return {"precio_max": float(text)}
+
+    text = str(text).lower()
+    amounts = []
+    for match in _AMOUNT_RE.finditer(text):
+        value = _amount_value(match)
+        if value is not None:
+            amounts.append((match, value))
+
+    minimums: List[float] = []
+    maximums: List[float] = []
+    position = 0
+    while position < len(amounts):
+        match, value = amounts[position]
+        before = text[:match.start()]
+
+        # Rango: "entre 500 y 1.000", "de 500 a 800 dólares", "desde 2 hasta 3 millones"
+        if position + 1 < len(amounts) and _RANGE_START_RE.search(before):
+            following, upper = amounts[position + 1]
+            if _RANGE_JOIN_RE.fullmatch(text[match.end():following.start()]) and (
+                _has_unit(match) or _has_unit(following) or _ends_amount(text, following)
+            ):
+                if match.group("scale") is None and following.group("scale") is not None:
+                    value *= _SCALES[following.group("scale")]
+                minimums.append(value)
+                maximums.append(upper)
+                position += 2
+                continue
+
+        if _MIN_BEFORE_RE.search(before):
+            if _has_unit(match) or _ends_amount(text, match):
+                minimums.append(value)
+        elif _has_unit(match) or (_MAX_BEFORE_RE.search(before) and _ends_amount(text, match)):
+            maximums.append(value)
+        elif text.strip(" .") == match.group().strip():
+            maximums.append(value)
+        position += 1
+
+    filters: Dict[str, float] = {}
+    if minimums:
+        filters["precio_min"] = min(minimums)
+    if maximums:
+        filters["precio_max"] = max(maximums)
+    return filters
+
+
+def extract_price(text: str) -> Optional[float]:
+    """
+    Extrae el precio de un texto, ignorando el símbolo de moneda
+
+    Args:
+        text: Precio en texto ("$1,299.99", "1.299,99 €", "-5")
+
+    Returns:
+        Primer número del texto con su signo, o None si no hay ninguno
+    """
+    match = _NUMBER_RE.search(text)
+    amount = parse_amount(match.group()) if match else None
+    if amount is not None and text[:match.start()].strip().startswith("-"):
+        amount = -amount
+    return amount
+
+
+def recommendation_filters(budget: Any = None) -> Dict[str, Any]:
+    """
+    Filtros que se aplican a la búsqueda de recomendaciones
+
+    Args:
+        budget: Presupuesto del usuario en texto libre (o None)
+
+    Returns:
+        Filtros según config.FILTER_BY_BUDGET y config.FILTER_IN_STOCK
+    """
+    filters: Dict[str, Any] = {}
+    if config.FILTER_BY_BUDGET:
+        filters.update(parse_budget(budget))
+    if config.FILTER_IN_STOCK:
+        filters["en_stock"] = True
+    return filters
+
+
+def _amount_value(match: "re.Match") -> Optional[float]:
+    """Valor de una cantidad de _AMOUNT_RE, aplicando su escala (mil, millones)"""
+    amount = parse_amount(match.group("number"))
+    if amount is None:
+        return None
+    return amount * _SCALES.get(match.group("scale"), 1)
+
+
+def _has_unit(match: "re.Match") -> bool:
+    """Indica si la cantidad lleva moneda o escala"""
+    return any(match.group(name) for name in ("currency", "scale", "unit"))
+
+
+def _ends_amount(text: str, match: "re.Match") -> bool:
+    """
+    Indica si tras el número no viene un sustantivo ("2 personas", "3 años")
+
+    Se admiten el final del texto, la puntuación y palabras de enlace.
+    """
+    following = _NEXT_WORD_RE.match(text, match.end())
+    return following is None or following.group(1) in _LINK_WORDS
+
+
+def parse_amount(raw: str) -> Optional[float]:
+    """
+    Convierte una cantidad en float con cualquiera de los dos formatos
+
+    Un único separador seguido de tres cifras se toma como separador de
+    miles ("1.200" -> 1200.0); si no, el último separador es el decimal
+    ("1.299,99" y "1,299.99" -> 1299.99).
+
+    Args:
+        raw: Cifras con separadores, sin moneda ni signo
+
+    Returns:
+        Valor numérico, o None si no es un número
+    """
+    raw = raw.rstrip(".,")
+    parts: List[str] = re.split(r"[.,]", raw)
+    if len(parts) > 1 and len(parts[-1]) != 3:
+        integer, decimals = "".join(parts[:-1]), parts[-1]
+    else:
+        integer, decimals = "".join(parts), "0"
+    try:
+        return float(f"{integer}.{decimals}")
+    except ValueError:
+        return None
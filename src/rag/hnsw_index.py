@@ -0,0 +1,280 @@
+"""
+Índice vectorial aproximado (HNSW) con hnswlib
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.rag.numpy_index import NumpyVectorStore
+
+
+class HnswVectorStore(NumpyVectorStore):
+    """
+    Búsqueda aproximada de vecinos con un grafo HNSW (hnswlib)
+
+    Reutiliza el almacenamiento de NumpyVectorStore (vectores .npy y
+    documentos en JSON) y añade un grafo HNSW persistido aparte, con la
+    etiqueta del grafo de cada fila. El grafo se actualiza de forma
+    incremental: los chunks nuevos o reemplazados se insertan (reutilizando
+    los huecos de los borrados) y los eliminados se marcan como borrados.
+    Solo se reconstruye entero cuando los borrados superan COMPACT_RATIO
+    de los nodos.
+
+    Parámetros:
+    - m: conexiones por nodo (más = mejor recall, más memoria)
+    - ef_construction: amplitud de búsqueda al construir (más = mejor grafo, más lento)
+    - ef_search: amplitud de búsqueda al consultar (más = mejor recall, más latencia)
+
+    Los scores son distancias L2 al cuadrado, como en Chroma y NumpyVectorStore.
+    """
+
+    INDEX_FILE = "hnsw.bin"
+    LABELS_FILE = "hnsw_labels.npy"
+    # Con filtros que dejan menos filas que esto, la búsqueda exacta es más barata
+    EXACT_FILTER_THRESHOLD = 10_000
+    # Fracción de nodos borrados del grafo a partir de la cual se reconstruye
+    COMPACT_RATIO = 0.25
+
+    def __init__(
+        self,
+        directory: str,
+        embedding_function: Embeddings,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 50
+    ):
+        """
+        Args:
+            directory: Directorio donde se persiste el índice
+            embedding_function: Modelo de embeddings para las consultas
+            m: Conexiones por nodo del grafo
+            ef_construction: Amplitud de búsqueda durante la construcción
+            ef_search: Amplitud de búsqueda durante las consultas
+        """
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError as e:
+            raise ImportError('El backend HNSW requiere hnswlib: pip install -e ".[hnsw]"') from e
+
+        super().__init__(directory, embedding_function)
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._index = None
+        self._dirty = False
+        # Las etiquetas del grafo no cambian al borrar filas (las filas sí)
+        self._label_by_id: Dict[str, int] = {}
+        self._id_by_label: Dict[int, str] = {}
+        self._next_label = 0
+
+    @classmethod
+    def load(
+        cls,
+        directory: str,
+        embedding_function: Embeddings,
+        **params: Any
+    ) -> "HnswVectorStore":
+        """
+        Abre un índice persistido (vacío si el directorio no tiene índice)
+
+        Args:
+            directory: Directorio del índice
+            embedding_function: Modelo de embeddings para las consultas
+            **params: m, ef_construction y ef_search
+
+        Returns:
+            Índice cargado
+        """
+        import hnswlib
+
+        store = super().load(directory, embedding_function, **params)
+
+        index_path = os.path.join(directory, cls.INDEX_FILE)
+        labels_path = os.path.join(directory, cls.LABELS_FILE)
+        vectors = store._matrix()
+        # Índices anteriores a las actualizaciones incrementales: etiqueta = fila
+        labels = np.load(labels_path) if os.path.exists(labels_path) else np.arange(len(vectors))
+        if len(vectors) and os.path.exists(index_path) and len(labels) == len(vectors):
+            index = hnswlib.Index(space='l2', dim=vectors.shape[1])
+            index.load_index(index_path, allow_replace_deleted=True)
+            store._index = index
+            store._set_labels(labels.tolist())
+            store._next_label = max(index.get_ids_list(), default=-1) + 1
+        else:
+            store._dirty = bool(len(vectors))
+
+        return store
+
+    def persist(self):
+        """Guarda vectores, documentos, el grafo HNSW y sus etiquetas"""
+        super().persist()
+        self._ensure_index()
+        index_path = os.path.join(self.directory, self.INDEX_FILE)
+        labels_path = os.path.join(self.directory, self.LABELS_FILE)
+        if self._index is not None:
+            self._index.save_index(f"{index_path}.tmp")
+            os.replace(f"{index_path}.tmp", index_path)
+            labels = np.fromiter((self._label_by_id[chunk_id] for chunk_id in self._ids), dtype=np.int64)
+            with open(f"{labels_path}.tmp", 'wb') as f:
+                np.save(f, labels)
+            os.replace(f"{labels_path}.tmp", labels_path)
+        else:
+            for path in (index_path, labels_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def delete_collection(self):
+        """Elimina todos los vectores del índice y sus archivos"""
+        super().delete_collection()
+        self._index = None
+        self._dirty = False
+        self._set_labels([])
+        for name in (self.INDEX_FILE, self.LABELS_FILE):
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def add_embeddings(
+        self,
+        ids: List[str],
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None
+    ):
+        """
+        Añade chunks con embeddings ya calculados; los IDs existentes se reemplazan
+
+        Los chunks se insertan en el grafo existente con etiquetas nuevas
+        (ampliando su capacidad si hace falta), sin reconstruirlo.
+        """
+        super().add_embeddings(ids, texts, embeddings, metadatas)
+        if self._index is None or self._dirty:
+            self._dirty = True
+            return
+
+        labels = list(range(self._next_label, self._next_label + len(ids)))
+        self._next_label += len(ids)
+        needed = self._index.get_current_count() + len(ids)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        self._index.add_items(np.asarray(embeddings, dtype=np.float32), labels, replace_deleted=True)
+        for chunk_id, label in zip(ids, labels):
+            self._label_by_id[chunk_id] = label
+            self._id_by_label[label] = chunk_id
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Elimina chunks por ID
+
+        Sus nodos se marcan como borrados en el grafo; si los borrados
+        superan COMPACT_RATIO, el grafo se reconstruirá en la próxima
+        búsqueda o al guardar.
+        """
+        removed = [chunk_id for chunk_id in dict.fromkeys(ids or []) if chunk_id in self._row_by_id]
+        result = super().delete(ids, **kwargs)
+        if not removed or self._index is None or self._dirty:
+            return result
+
+        for chunk_id in removed:
+            label = self._label_by_id.pop(chunk_id)
+            del self._id_by_label[label]
+            self._index.mark_deleted(label)
+
+        nodes = self._index.get_current_count()
+        if nodes - len(self._label_by_id) > self.COMPACT_RATIO * nodes:
+            self._dirty = True
+        return result
+
+    def similarity_search_by_vectors_with_relevance_scores(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Top-k aproximado de varias consultas con una sola llamada a knn_query
+
+        Con filter= el grafo solo visita filas que cumplen la cláusula; si
+        quedan pocas, se hace búsqueda exacta sobre ellas.
+
+        Args:
+            embeddings: Embedding de cada consulta
+            k: Número de resultados por consulta
+            **kwargs: filter con una cláusula where sobre los metadatos
+
+        Returns:
+            Por cada consulta, lista de tuplas (documento, distancia) de menor
+            a mayor distancia
+        """
+        rows = self._filter_rows(kwargs.get("filter"))
+        if rows is not None and len(rows) < self.EXACT_FILTER_THRESHOLD:
+            return super().similarity_search_by_vectors_with_relevance_scores(embeddings, k, **kwargs)
+
+        self._ensure_index()
+        if self._index is None or not len(embeddings):
+            return [[] for _ in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        if rows is None:
+            k = min(k, len(self._ids))
+            self._index.set_ef(max(self.ef_search, k))
+            labels, distances = self._index.knn_query(queries, k=k)
+        else:
+            allowed = {self._label_by_id[self._ids[row]] for row in rows.tolist()}
+            k = min(k, len(allowed))
+            self._index.set_ef(max(self.ef_search, k))
+            labels, distances = self._index.knn_query(
+                queries,
+                k=k,
+                num_threads=1,
+                filter=lambda label: label in allowed
+            )
+
+        return [
+            [
+                (self._document(self._row_by_id[self._id_by_label[int(label)]]), float(distance))
+                for label, distance in zip(query_labels, query_distances)
+            ]
+            for query_labels, query_distances in zip(labels, distances)
+        ]
+
+    def _ensure_index(self):
+        """Construye el grafo desde cero si no existe o necesita compactarse"""
+        if not self._dirty and (self._index is not None or not len(self._ids)):
+            return
+
+        import hnswlib
+
+        with self._lock:
+            # Otra búsqueda concurrente puede haberlo construido ya
+            if not self._dirty and (self._index is not None or not len(self._ids)):
+                return
+
+            vectors = self._matrix()
+            if not len(vectors):
+                self._index = None
+                self._set_labels([])
+                self._dirty = False
+                return
+
+            index = hnswlib.Index(space='l2', dim=vectors.shape[1])
+            index.init_index(
+                max_elements=len(vectors),
+                ef_construction=self.ef_construction,
+                M=self.m,
+                allow_replace_deleted=True
+            )
+            # Al reconstruir, las etiquetas vuelven a ser las filas de la matriz
+            index.add_items(np.asarray(vectors), np.arange(len(vectors)))
+            self._set_labels(list(range(len(vectors))))
+            self._index = index
+            self._dirty = False
+
+    def _set_labels(self, labels: List[int]):
+        """Asocia cada fila (en el orden de self._ids) con su etiqueta del grafo"""
+        self._label_by_id = dict(zip(self._ids, labels))
+        self._id_by_label = dict(zip(labels, self._ids))
+        self._next_label = max(labels, default=-1) + 1
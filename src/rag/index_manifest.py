@@ -0,0 +1,146 @@
+"""
+Manifiesto de indexación para la re-indexación incremental
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Any, Tuple
+
+
+def file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    Calcula el hash SHA-256 del contenido de un archivo
+
+    Args:
+        file_path: Ruta al archivo
+        block_size: Tamaño de bloque de lectura
+
+    Returns:
+        Hash hexadecimal del contenido
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """
+    Registra, por archivo indexado, su mtime, tamaño, hash de contenido
+    y los IDs de los chunks que produjo
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "IndexManifest":
+        """
+        Carga un manifiesto desde disco (vacío si no existe)
+
+        Args:
+            path: Ruta al archivo del manifiesto
+
+        Returns:
+            Manifiesto cargado
+        """
+        manifest = cls(path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                manifest.files = data.get("files", {})
+        return manifest
+
+    def exists(self) -> bool:
+        """Indica si el manifiesto está guardado en disco"""
+        return os.path.exists(self.path)
+
+    def save(self):
+        """Guarda el manifiesto de forma atómica"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {"version": self.VERSION, "files": self.files},
+                f,
+                ensure_ascii=False,
+                indent=1
+            )
+        os.replace(tmp_path, self.path)
+
+    def record(self, file_path: str, chunk_ids: List[str], content_hash: str = None):
+        """
+        Registra un archivo indexado
+
+        Args:
+            file_path: Ruta al archivo
+            chunk_ids: IDs de los chunks generados a partir del archivo
+            content_hash: Hash del contenido (se calcula si no se indica)
+        """
+        stat = os.stat(file_path)
+        self.files[file_path] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "hash": content_hash or file_hash(file_path),
+            "chunk_ids": list(chunk_ids),
+        }
+
+    def forget(self, file_path: str) -> List[str]:
+        """
+        Elimina un archivo del manifiesto
+
+        Args:
+            file_path: Ruta al archivo
+
+        Returns:
+            IDs de los chunks que tenía asociados
+        """
+        entry = self.files.pop(file_path, None)
+        return entry["chunk_ids"] if entry else []
+
+    def diff(self, file_paths: List[str]) -> Tuple[List[str], List[str], List[str], Dict[str, str]]:
+        """
+        Compara los archivos actuales con los registrados
+
+        Solo se calcula el hash de los archivos cuyo mtime o tamaño cambió;
+        si el contenido resulta idéntico se actualiza el mtime y se
+        consideran sin cambios.
+
+        Args:
+            file_paths: Archivos presentes actualmente en el catálogo
+
+        Returns:
+            Tupla (añadidos, modificados, eliminados, hashes calculados)
+        """
+        added, changed = [], []
+        hashes: Dict[str, str] = {}
+        current = set(file_paths)
+
+        for file_path in file_paths:
+            entry = self.files.get(file_path)
+            stat = os.stat(file_path)
+
+            if entry is None:
+                hashes[file_path] = file_hash(file_path)
+                added.append(file_path)
+                continue
+
+            if entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                continue
+
+            content_hash = file_hash(file_path)
+            if content_hash == entry["hash"]:
+                entry["mtime"] = stat.st_mtime
+                continue
+
+            hashes[file_path] = content_hash
+            changed.append(file_path)
+
+        removed = [file_path for file_path in self.files if file_path not in current]
+
+        return added, changed, removed, hashes
@@ -0,0 +1,233 @@
+"""
+Pipeline de ingesta en streaming: carga → división → embeddings → upsert
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+from src.config import config
+
+
+_DONE = object()
+
+
+class _StageError:
+    """Envuelve una excepción ocurrida en una etapa para propagarla"""
+
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+
+
+class IngestionPipeline:
+    """
+    Mueve lotes de tamaño acotado por las etapas de indexación
+
+    Cada etapa corre en su propio hilo y se comunica con la siguiente
+    mediante una cola acotada: si una etapa se retrasa, las anteriores se
+    bloquean al llenarse la cola (backpressure). Así la memoria máxima es
+    proporcional al tamaño de lote, no al del catálogo, y la carga y
+    división de archivos avanzan por delante del modelo de embeddings,
+    que nunca espera por E/S de disco.
+    """
+
+    def __init__(self, vector_store, batch_size: int = None, queue_size: int = None):
+        """
+        Args:
+            vector_store: VectorStore destino (con el vectorstore ya abierto)
+            batch_size: Chunks por lote de embeddings/upsert
+            queue_size: Lotes en vuelo entre cada par de etapas
+        """
+        self.vector_store = vector_store
+        self.batch_size = batch_size or config.INGEST_BATCH_SIZE
+        self.queue_size = queue_size or config.INGEST_QUEUE_SIZE
+
+        self.chunk_ids_by_source: Dict[str, List[str]] = {}
+        self.stats: Dict[str, Any] = {}
+        self._counters: Dict[str, int] = {}
+
+    def run(self, documents: Iterable[Document]) -> Dict[str, Any]:
+        """
+        Indexa un flujo de documentos
+
+        Args:
+            documents: Iterable de documentos (p. ej. DocumentLoader.iter_documents)
+
+        Returns:
+            Estadísticas de la ingesta
+        """
+        self.chunk_ids_by_source = {}
+        self._counters = {}
+        self.stats = {
+            "documents": 0,
+            "chunks": 0,
+            "batches": 0,
+            "busy_seconds": {"load": 0.0, "split": 0.0, "embed": 0.0, "upsert": 0.0},
+        }
+
+        split_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embed_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        upsert_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        stages = [
+            ("load", lambda: self._load_stage(documents, split_queue, stop)),
+            ("split", lambda: self._map_stage("split", self._split, split_queue, embed_queue, stop)),
+            ("embed", lambda: self._map_stage("embed", self._embed, embed_queue, upsert_queue, stop)),
+        ]
+        threads = [
+            threading.Thread(target=self._guard, args=(name, target, stop, out), daemon=True)
+            for (name, target), out in zip(stages, [split_queue, embed_queue, upsert_queue])
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        error: Optional[_StageError] = None
+        try:
+            error = self._upsert_stage(upsert_queue, stop)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        if error is not None:
+            raise RuntimeError(f"Error en la etapa '{error.stage}' de la ingesta: {error.error}") from error.error
+
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.stats["seconds"] = elapsed
+        self.stats["chunks_per_second"] = self.stats["chunks"] / elapsed
+
+        busy = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stats["busy_seconds"].items())
+        print(
+            f"✓ Ingesta completada: {self.stats['documents']} documentos, "
+            f"{self.stats['chunks']} chunks en {elapsed:.1f}s "
+            f"({self.stats['chunks_per_second']:.1f} chunks/s; {busy})"
+        )
+
+        return self.stats
+
+    # Etapas
+
+    def _load_stage(self, documents: Iterable[Document], out: queue.Queue, stop: threading.Event):
+        """Agrupa los documentos de entrada en lotes"""
+        batch: List[Document] = []
+        iterator: Iterator[Document] = iter(documents)
+        while True:
+            started = time.perf_counter()
+            document = next(iterator, _DONE)
+            self.stats["busy_seconds"]["load"] += time.perf_counter() - started
+            if document is _DONE:
+                break
+            batch.append(document)
+            self.stats["documents"] += 1
+            if len(batch) >= self.batch_size:
+                if not self._put(out, batch, stop):
+                    return
+                batch = []
+        if batch:
+            self._put(out, batch, stop)
+
+    def _split(self, documents: List[Document]) -> List[Dict[str, Any]]:
+        """Divide un lote de documentos en lotes de chunks con IDs deterministas"""
+        splits, ids = self.vector_store._split_with_ids(documents, self._counters)
+        return [
+            {"splits": splits[i:i + self.batch_size], "ids": ids[i:i + self.batch_size]}
+            for i in range(0, len(splits), self.batch_size)
+        ]
+
+    def _embed(self, batch: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Calcula los embeddings de un lote de chunks"""
+        texts = [split.page_content for split in batch["splits"]]
+        batch["embeddings"] = self.vector_store.embeddings.embed_documents(texts)
+        return [batch]
+
+    def _upsert_stage(self, source: queue.Queue, stop: threading.Event) -> Optional[_StageError]:
+        """Inserta los lotes en el índice (hilo principal)"""
+        while True:
+            item = self._get(source, stop)
+            if item is _DONE:
+                return None
+            if isinstance(item, _StageError):
+                return item
+
+            started = time.perf_counter()
+            try:
+                splits = item["splits"]
+                self.vector_store._upsert(
+                    ids=item["ids"],
+                    texts=[split.page_content for split in splits],
+                    embeddings=item["embeddings"],
+                    metadatas=[split.metadata for split in splits],
+                )
+                for split, chunk_id in zip(splits, item["ids"]):
+                    source_path = str(split.metadata.get("source", ""))
+                    self.chunk_ids_by_source.setdefault(source_path, []).append(chunk_id)
+            except Exception as e:
+                return _StageError("upsert", e)
+
+            self.stats["busy_seconds"]["upsert"] += time.perf_counter() - started
+            self.stats["chunks"] += len(item["ids"])
+            self.stats["batches"] += 1
+
+    # Infraestructura
+
+    def _map_stage(
+        self,
+        name: str,
+        func: Callable[[Any], List[Any]],
+        source: queue.Queue,
+        out: queue.Queue,
+        stop: threading.Event
+    ):
+        """Aplica func a cada lote de source y envía los lotes resultantes a out"""
+        while True:
+            item = self._get(source, stop)
+            if item is _DONE or isinstance(item, _StageError):
+                # Propagar fin o error a la siguiente etapa
+                self._put(out, item, stop)
+                return
+            started = time.perf_counter()
+            results = func(item)
+            self.stats["busy_seconds"][name] += time.perf_counter() - started
+            for result in results:
+                if not self._put(out, result, stop):
+                    return
+
+    def _guard(self, name: str, target: Callable[[], None], stop: threading.Event, out: queue.Queue):
+        """Ejecuta una etapa, reenviando el fin de flujo o el error a la siguiente"""
+        try:
+            target()
+            if name == "load":
+                self._put(out, _DONE, stop)
+        except Exception as e:
+            self._put(out, _StageError(name, e), stop)
+
+    @staticmethod
+    def _put(out: queue.Queue, item: Any, stop: threading.Event) -> bool:
+        """
+        Encola un elemento, bloqueando mientras la cola esté llena
+
+        Devuelve False si la ingesta se detuvo mientras se esperaba.
+        """
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(source: queue.Queue, stop: threading.Event) -> Any:
+        """Desencola un elemento; devuelve _DONE si la ingesta se detuvo"""
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
@@ -0,0 +1,394 @@
+"""
+Índice vectorial exacto en memoria con NumPy
+"""
+import json
+import os
+import threading
+import uuid
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangChainVectorStore
+
+from src.rag.filters import matches
+from src.rag.snapshot import Snapshot
+
+
+class NumpyVectorStore(LangChainVectorStore):
+    """
+    Búsqueda exacta por producto escalar sobre una matriz float32 contigua
+
+    Pensado para catálogos pequeños y medianos (hasta unos cientos de miles
+    de chunks) con embeddings normalizados: el top-k es un producto
+    matriz-vector seguido de argpartition, sin ida y vuelta a una base de
+    datos. Los vectores se guardan en un .npy que se abre con memory-map y
+    los textos/metadatos en un JSON auxiliar.
+
+    Los scores devueltos son distancias L2 al cuadrado, igual que Chroma con
+    su configuración por defecto: menor es más similar.
+
+    Las búsquedas aceptan filter= con una cláusula where (ver
+    src.rag.filters): solo se puntúan las filas que la cumplen.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    DOCUMENTS_FILE = "documents.json"
+    FILTER_CACHE_SIZE = 64
+
+    def __init__(self, directory: str, embedding_function: Embeddings):
+        """
+        Args:
+            directory: Directorio donde se persiste el índice
+            embedding_function: Modelo de embeddings para las consultas
+        """
+        self.directory = directory
+        self.embedding_function = embedding_function
+
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._pending: List[np.ndarray] = []
+        self._row_by_id: dict = {}
+        self._filter_rows_cache: dict = {}
+        # Estado que se calcula al buscar (matriz, normas): las búsquedas
+        # concurrentes no deben calcularlo a la vez
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    # Persistencia
+
+    @classmethod
+    def load(cls, directory: str, embedding_function: Embeddings, **kwargs: Any) -> "NumpyVectorStore":
+        """
+        Abre un índice persistido (vacío si el directorio no tiene índice)
+
+        Args:
+            directory: Directorio del índice
+            embedding_function: Modelo de embeddings para las consultas
+            **kwargs: Parámetros adicionales del constructor
+
+        Returns:
+            Índice cargado
+        """
+        store = cls(directory, embedding_function, **kwargs)
+        vectors_path = os.path.join(directory, cls.VECTORS_FILE)
+        documents_path = os.path.join(directory, cls.DOCUMENTS_FILE)
+
+        if os.path.exists(vectors_path) and os.path.exists(documents_path):
+            with open(documents_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            store._ids = data["ids"]
+            store._texts = data["texts"]
+            store._metadatas = data["metadatas"]
+            store._vectors = np.load(vectors_path, mmap_mode='r')
+            store._row_by_id = {chunk_id: row for row, chunk_id in enumerate(store._ids)}
+
+        return store
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snapshot: Snapshot,
+        embedding_function: Embeddings,
+        directory: str = None,
+        **kwargs: Any
+    ) -> "NumpyVectorStore":
+        """
+        Abre un índice sobre un snapshot ya mapeado en memoria (ver src.rag.snapshot)
+
+        Vectores y normas se usan directamente desde el mmap; los textos se
+        decodifican al leerlos y se copian a memoria solo si el índice se
+        modifica.
+
+        Args:
+            snapshot: Snapshot abierto
+            embedding_function: Modelo de embeddings para las consultas
+            directory: Directorio donde se persistiría el índice si cambia
+            **kwargs: Parámetros adicionales del constructor
+
+        Returns:
+            Índice cargado
+        """
+        store = cls(directory, embedding_function, **kwargs)
+        store._ids = list(snapshot.ids)
+        store._texts = snapshot.texts
+        store._metadatas = snapshot.metadatas
+        store._vectors = snapshot.vectors
+        store._norms = snapshot.norms
+        store._row_by_id = {chunk_id: row for row, chunk_id in enumerate(store._ids)}
+        return store
+
+    def persist(self):
+        """
+        Guarda vectores y documentos en disco de forma atómica
+
+        Si la matriz está mapeada desde el propio vectors.npy se copia antes a
+        memoria y se libera el mapeo: Windows no permite reemplazar un archivo
+        mapeado.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        vectors_path = os.path.join(self.directory, self.VECTORS_FILE)
+        vectors = self._matrix()
+        if isinstance(vectors, np.memmap) and os.path.abspath(vectors.filename) == os.path.abspath(vectors_path):
+            vectors = np.array(vectors)
+            self._vectors = vectors
+
+        with open(f"{vectors_path}.tmp", 'wb') as f:
+            np.save(f, vectors)
+        os.replace(f"{vectors_path}.tmp", vectors_path)
+
+        documents_path = os.path.join(self.directory, self.DOCUMENTS_FILE)
+        with open(f"{documents_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(
+                {"ids": self._ids, "texts": list(self._texts), "metadatas": self._metadatas},
+                f,
+                ensure_ascii=False
+            )
+        os.replace(f"{documents_path}.tmp", documents_path)
+
+        # Volver a abrir en modo memory-map para no duplicar la matriz en RAM
+        self._vectors = np.load(vectors_path, mmap_mode='r')
+
+    def delete_collection(self):
+        """Elimina todos los vectores del índice y sus archivos"""
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._vectors, self._norms, self._pending = None, None, []
+        self._row_by_id = {}
+        self._filter_rows_cache = {}
+        for name in (self.VECTORS_FILE, self.DOCUMENTS_FILE):
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Escritura
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        """Calcula los embeddings de los textos y los añade (o reemplaza por ID)"""
+        texts = list(texts)
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+        embeddings = self.embedding_function.embed_documents(texts)
+        self.add_embeddings(ids, texts, embeddings, metadatas)
+        return list(ids)
+
+    def add_embeddings(
+        self,
+        ids: List[str],
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None
+    ):
+        """
+        Añade chunks con embeddings ya calculados; los IDs existentes se reemplazan
+
+        Args:
+            ids: IDs de los chunks
+            texts: Texto de cada chunk
+            embeddings: Embedding de cada chunk
+            metadatas: Metadatos de cada chunk
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        existing = [chunk_id for chunk_id in ids if chunk_id in self._row_by_id]
+        if existing:
+            self.delete(existing)
+        if not isinstance(self._texts, list):
+            self._texts = list(self._texts)  # Textos de un snapshot (solo lectura)
+
+        for chunk_id, text, metadata in zip(ids, texts, metadatas):
+            self._row_by_id[chunk_id] = len(self._ids)
+            self._ids.append(chunk_id)
+            self._texts.append(text)
+            self._metadatas.append(dict(metadata))
+
+        self._pending.append(np.asarray(embeddings, dtype=np.float32))
+        self._norms = None
+        self._filter_rows_cache = {}
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Elimina chunks por ID"""
+        rows = sorted(self._row_by_id[chunk_id] for chunk_id in ids or [] if chunk_id in self._row_by_id)
+        if not rows:
+            return True
+
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[rows] = False
+        vectors = self._matrix()[keep]
+
+        self._ids = [chunk_id for chunk_id, kept in zip(self._ids, keep) if kept]
+        self._texts = [text for text, kept in zip(self._texts, keep) if kept]
+        self._metadatas = [metadata for metadata, kept in zip(self._metadatas, keep) if kept]
+        self._row_by_id = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._vectors = np.ascontiguousarray(vectors)
+        self._norms = None
+        self._filter_rows_cache = {}
+        return True
+
+    # Lectura
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        """Busca los k documentos más similares a la consulta"""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Busca los k documentos más similares a la consulta, con su distancia"""
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        """Busca los k documentos más similares a un embedding"""
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, **kwargs)]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """
+        Top-k exacto por distancia L2 al cuadrado
+
+        Args:
+            embedding: Embedding de la consulta
+            k: Número de resultados
+            **kwargs: filter con una cláusula where sobre los metadatos
+
+        Returns:
+            Lista de tuplas (documento, distancia), de menor a mayor distancia
+        """
+        return self.similarity_search_by_vectors_with_relevance_scores([embedding], k, **kwargs)[0]
+
+    def similarity_search_by_vectors_with_relevance_scores(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Top-k exacto de varias consultas con un único producto matricial
+
+        Args:
+            embeddings: Embedding de cada consulta
+            k: Número de resultados por consulta
+            **kwargs: filter con una cláusula where sobre los metadatos
+
+        Returns:
+            Por cada consulta, lista de tuplas (documento, distancia) de menor
+            a mayor distancia
+        """
+        vectors = self._matrix()
+        if not len(vectors) or not len(embeddings):
+            return [[] for _ in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        rows = self._filter_rows(kwargs.get("filter"))
+        if rows is None:
+            candidates, norms = vectors, self._vector_norms()
+            rows = np.arange(len(vectors))
+        elif len(rows):
+            candidates, norms = vectors[rows], self._vector_norms()[rows]
+        else:
+            return [[] for _ in embeddings]
+
+        # ||q - v||² = ||q||² + ||v||² - 2·q·v, para todas las consultas a la vez
+        distances = np.einsum('ij,ij->i', queries, queries)[:, None] + norms[None, :] - 2.0 * (queries @ candidates.T)
+
+        k = min(k, distances.shape[1])
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+        results = []
+        for query_distances, query_top in zip(distances, top):
+            query_top = query_top[np.argsort(query_distances[query_top], kind='stable')]
+            results.append([(self._document(int(rows[i])), float(query_distances[i])) for i in query_top])
+        return results
+
+    def get(self, ids: Optional[List[str]] = None) -> dict:
+        """Devuelve IDs, textos y metadatos (todos o los indicados)"""
+        rows = range(len(self._ids)) if ids is None else [
+            self._row_by_id[chunk_id] for chunk_id in ids if chunk_id in self._row_by_id
+        ]
+        return {
+            "ids": [self._ids[row] for row in rows],
+            "documents": [self._texts[row] for row in rows],
+            "metadatas": [self._metadatas[row] for row in rows],
+        }
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        directory: str = None,
+        **kwargs: Any
+    ) -> "NumpyVectorStore":
+        """Crea un índice a partir de textos y lo persiste si se indica directorio"""
+        store = cls(directory, embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        if directory:
+            store.persist()
+        return store
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    # Internos
+
+    def _matrix(self) -> np.ndarray:
+        """Matriz de vectores, incorporando los añadidos pendientes"""
+        with self._lock:
+            if self._pending:
+                parts = ([self._vectors] if self._vectors is not None and len(self._vectors) else []) + self._pending
+                self._vectors = np.ascontiguousarray(np.concatenate(parts), dtype=np.float32)
+                self._pending = []
+                self._norms = None
+            if self._vectors is None:
+                return np.empty((0, 0), dtype=np.float32)
+            return self._vectors
+
+    def _vector_norms(self) -> np.ndarray:
+        """Normas al cuadrado de los vectores (se recalculan tras cambios)"""
+        with self._lock:
+            if self._norms is None:
+                vectors = self._matrix()
+                self._norms = np.einsum('ij,ij->i', vectors, vectors)
+            return self._norms
+
+    def _filter_rows(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        """
+        Filas cuyos metadatos cumplen la cláusula where (None = sin filtro)
+
+        El resultado se cachea por cláusula hasta el siguiente cambio del índice.
+        """
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, default=str)
+        rows = self._filter_rows_cache.get(key)
+        if rows is None:
+            rows = np.fromiter(
+                (row for row, metadata in enumerate(self._metadatas) if matches(metadata, where)),
+                dtype=np.int64
+            )
+            if len(self._filter_rows_cache) >= self.FILTER_CACHE_SIZE:
+                self._filter_rows_cache.clear()
+            self._filter_rows_cache[key] = rows
+        return rows
+
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self._texts[row], metadata=dict(self._metadatas[row]))
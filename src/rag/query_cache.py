@@ -0,0 +1,90 @@
+"""
+Caché LRU con caducidad para consultas al vectorstore
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Caché en memoria acotada por número de entradas (LRU) y, opcionalmente,
+    por antigüedad (TTL)
+
+    Es segura entre hilos y lleva contadores de aciertos y fallos.
+    """
+
+    def __init__(self, max_size: int, ttl: float = 0):
+        """
+        Args:
+            max_size: Número máximo de entradas (0 desactiva la caché)
+            ttl: Segundos de validez de cada entrada (0 = sin caducidad)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Obtiene un valor y lo marca como usado recientemente
+
+        Args:
+            key: Clave a buscar
+            default: Valor devuelto si no está o ha caducado
+
+        Returns:
+            Valor guardado o default
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, stored_at = entry
+                if not self.ttl or time.monotonic() - stored_at <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Guarda un valor, desalojando el menos usado si se supera el tamaño
+
+        Args:
+            key: Clave
+            value: Valor a guardar
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Vacía la caché (los contadores se conservan)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        """Devuelve contadores de aciertos, fallos y ocupación"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "size": len(self._data),
+            "max_size": self.max_size,
+        }
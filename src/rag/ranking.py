@@ -0,0 +1,138 @@
+"""
+Post-procesado de resultados de búsqueda: agregación por producto y k adaptativo
+"""
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+
+# Separador entre los fragmentos de un mismo producto
+CHUNK_SEPARATOR = "\n[...]\n"
+
+
+def product_key(doc: Document) -> tuple:
+    """
+    Identidad del producto al que pertenece un chunk
+
+    Usa el ID extraído al cargar si existe; si no, el archivo de origen
+    más la fila (CSV/Excel), la posición (JSON) o la página (PDF). Los
+    chunks sin ninguna de ellas (p. ej. un catálogo .txt con varios
+    productos) no se agrupan.
+
+    Args:
+        doc: Chunk recuperado
+
+    Returns:
+        Clave hashable del producto
+    """
+    metadata = doc.metadata
+    if metadata.get("id") is not None:
+        return ("id", str(metadata["id"]))
+
+    source = str(metadata.get("source", ""))
+    for field in ("row", "index", "page"):
+        if field in metadata:
+            return (source, field, metadata[field])
+    return (source, "chunk", doc.page_content)
+
+
+def aggregate_by_product(
+    results: List[Tuple[Document, float]],
+    top_n: int,
+    score_mode: str = "max",
+    chunks_per_product: int = 2
+) -> List[Tuple[Document, float]]:
+    """
+    Agrupa los chunks recuperados por producto y devuelve los mejores productos
+
+    La similitud de cada chunk es 1 - distancia (la misma escala que se
+    muestra como "Relevancia"). Un producto puntúa con la mejor similitud
+    de sus chunks (max) o con la suma de todas (sum, favorece productos con
+    varios chunks relevantes).
+
+    Args:
+        results: Tuplas (chunk, distancia) de la búsqueda, menor = mejor
+        top_n: Número máximo de productos distintos
+        score_mode: max o sum
+        chunks_per_product: Fragmentos de cada producto que se conservan
+
+    Returns:
+        Tuplas (documento, distancia) de menor a mayor distancia; cada
+        documento une los mejores fragmentos del producto y su metadata es
+        la del mejor, con "chunks" = número de chunks recuperados. La
+        distancia es 1 - puntuación del producto.
+    """
+    if score_mode not in ("max", "sum"):
+        raise ValueError(f"Modo de agregación desconocido: {score_mode}. Valores válidos: max, sum")
+
+    groups: Dict[tuple, List[Tuple[Document, float]]] = {}
+    for doc, distance in results:
+        groups.setdefault(product_key(doc), []).append((doc, distance))
+
+    products = []
+    for hits in groups.values():
+        hits.sort(key=lambda hit: hit[1])
+        similarities = [1.0 - distance for _, distance in hits]
+        score = max(similarities) if score_mode == "max" else sum(similarities)
+
+        best_doc = hits[0][0]
+        content = CHUNK_SEPARATOR.join(doc.page_content for doc, _ in hits[:chunks_per_product])
+        metadata = {**best_doc.metadata, "chunks": len(hits)}
+        products.append((Document(page_content=content, metadata=metadata), 1.0 - score))
+
+    products.sort(key=lambda product: product[1])
+    return products[:top_n]
+
+
+def adaptive_cutoff(
+    results: List[Tuple[Document, float]],
+    min_k: int,
+    max_k: int,
+    min_similarity: float,
+    max_gap: float
+) -> Tuple[List[Tuple[Document, float]], Dict[str, Any]]:
+    """
+    Decide cuántos resultados conservar según la distribución de scores
+
+    Recorre los resultados (ordenados de menor a mayor distancia) y corta
+    en el primero que cumpla alguna condición, respetando siempre min_k:
+    - su similitud (1 - distancia) es menor que min_similarity
+    - cae más de max_gap en términos relativos respecto al anterior
+      (codo de la curva de scores)
+    - ya se alcanzaron max_k resultados
+
+    Args:
+        results: Tuplas (documento, distancia), menor = mejor
+        min_k: Resultados mínimos (si los hay)
+        max_k: Resultados máximos
+        min_similarity: Similitud mínima para entrar en el contexto
+        max_gap: Caída relativa máxima entre resultados consecutivos
+
+    Returns:
+        Tupla (resultados conservados, estadísticas con candidates,
+        chosen_k, top_score, cutoff_score, score_spread y stop_reason)
+    """
+    similarities = [1.0 - distance for _, distance in results]
+    chosen = min(len(results), max_k)
+    stop_reason = "max_k" if len(results) > max_k else "exhausted"
+
+    for i in range(min(min_k, chosen), chosen):
+        if similarities[i] < min_similarity:
+            chosen, stop_reason = i, "min_similarity"
+            break
+        if i > 0:
+            previous = similarities[i - 1]
+            gap = (previous - similarities[i]) / max(abs(previous), 1e-9)
+            if gap > max_gap:
+                chosen, stop_reason = i, "gap"
+                break
+
+    stats = {
+        "candidates": len(results),
+        "chosen_k": chosen,
+        "top_score": similarities[0] if similarities else None,
+        "cutoff_score": similarities[chosen - 1] if chosen else None,
+        "score_spread": similarities[0] - similarities[-1] if similarities else 0.0,
+        "stop_reason": stop_reason,
+    }
+    return results[:chosen], stats
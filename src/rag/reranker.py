@@ -0,0 +1,90 @@
+"""
+Reordenación de candidatos con un cross-encoder local
+"""
+import hashlib
+import time
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from src.rag.query_cache import LRUCache
+
+
+class CrossEncoderReranker:
+    """
+    Puntúa pares (consulta, documento) con un cross-encoder en CPU
+
+    Es más preciso que la similitud de embeddings (lee consulta y documento
+    juntos) y mucho más barato que pedirle al LLM que ordene los productos.
+    Los pares se puntúan por lotes y las puntuaciones se cachean por
+    (consulta, hash del documento).
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 32,
+        cache_size: int = 4096,
+        max_length: int = 512
+    ):
+        """
+        Args:
+            model_name: Modelo CrossEncoder de sentence-transformers
+            batch_size: Pares por lote de inferencia
+            cache_size: Puntuaciones cacheadas (0 desactiva la caché)
+            max_length: Tokens máximos por par
+        """
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "El reranker requiere sentence-transformers: pip install sentence-transformers"
+            ) from e
+
+        self.model = CrossEncoder(model_name, max_length=max_length, device='cpu')
+        self.batch_size = batch_size
+        self.cache = LRUCache(cache_size)
+        self.last_stats: Dict[str, float] = {}
+
+    def rerank(
+        self,
+        query: str,
+        results: List[Tuple[Document, float]],
+        top_n: int
+    ) -> List[Tuple[Document, float]]:
+        """
+        Reordena los candidatos por la puntuación del cross-encoder
+
+        Args:
+            query: Consulta de búsqueda
+            results: Tuplas (documento, distancia) de la búsqueda
+            top_n: Número de candidatos que se conservan
+
+        Returns:
+            Tuplas (documento, distancia) con distancia = 1 - puntuación del
+            cross-encoder, de menor a mayor distancia
+        """
+        start = time.perf_counter()
+        keys = [
+            (query, hashlib.sha1(doc.page_content.encode('utf-8')).hexdigest())
+            for doc, _ in results
+        ]
+        scores = [self.cache.get(key) for key in keys]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            pairs = [(query, results[i][0].page_content) for i in missing]
+            predicted = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+                self.cache.put(keys[i], scores[i])
+
+        order = sorted(range(len(results)), key=lambda i: -scores[i])[:top_n]
+        self.last_stats = {
+            "candidates": len(results),
+            "kept": len(order),
+            "scored": len(missing),
+            "cache_hits": len(results) - len(missing),
+            "rerank_ms": (time.perf_counter() - start) * 1000,
+        }
+        return [(results[i][0], 1.0 - scores[i]) for i in order]
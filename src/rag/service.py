@@ -0,0 +1,378 @@
+"""
+Servicio de búsqueda local compartido por varios procesos
+
+Un único proceso (RetrievalServer) carga el modelo de embeddings y el
+índice y atiende búsquedas por HTTP en localhost; los demás procesos usan
+RetrievalClient, que expone la misma interfaz de búsqueda que VectorStore.
+"""
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from langchain_core.documents import Document
+
+from src.rag.numpy_index import NumpyVectorStore
+from src.rag.sharded_index import ShardedVectorStore
+
+
+class RetrievalServer:
+    """
+    Servidor HTTP de búsqueda sobre un VectorStore ya cargado
+
+    Endpoints (JSON):
+    - POST /search: {"queries": [...], "k", "mode", "filters", "category"}
+      -> {"results": [[{"page_content", "metadata", "score"}, ...], ...], "stats"}
+    - POST /embed: {"texts": [...]} -> {"embeddings": [...]}
+    - GET /health: estado y número de chunks indexados
+    - GET /stats: contadores de cachés, shards y del servidor
+
+    Cada petición de búsqueda se resuelve con una sola llamada a
+    VectorStore.search_many_with_scores (embeddings en lote y una consulta
+    al índice). Cada petición se atiende en su propio hilo y las búsquedas
+    de varios clientes se solapan: VectorStore guarda last_search_stats por
+    hilo y los índices protegen su propio estado interno.
+    """
+
+    def __init__(self, vector_store, host: str = "127.0.0.1", port: int = 8765):
+        """
+        Args:
+            vector_store: VectorStore con el índice cargado
+            host: Dirección de escucha (por defecto solo localhost)
+            port: Puerto de escucha (0 = uno libre)
+        """
+        self.vector_store = vector_store
+        self._counters_lock = threading.Lock()
+        self._last_search: Dict[str, Any] = {}
+        self._started_at = time.time()
+        self._counters = {"requests": 0, "queries": 0, "errors": 0, "busy_ms": 0.0}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """Atiende peticiones hasta shutdown()"""
+        print(f"🛰️ Servicio de búsqueda escuchando en {self.url}")
+        self.httpd.serve_forever()
+
+    def start(self) -> threading.Thread:
+        """Atiende peticiones en un hilo en segundo plano"""
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        """Detiene el servidor y libera el puerto"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # Endpoints
+
+    def search(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Resuelve un lote de consultas con los parámetros de VectorStore.search_many_with_scores"""
+        queries = payload.get("queries")
+        if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+            raise ValueError("'queries' debe ser una lista de textos")
+
+        start = time.perf_counter()
+        results = self.vector_store.search_many_with_scores(
+            queries,
+            k=payload.get("k"),
+            mode=payload.get("mode"),
+            filters=payload.get("filters"),
+            category=payload.get("category")
+        )
+        stats = dict(self.vector_store.last_search_stats)
+        self._count("queries", len(queries))
+        self._count("busy_ms", (time.perf_counter() - start) * 1000)
+        with self._counters_lock:
+            self._last_search = stats
+
+        return {
+            "results": [
+                [
+                    {"page_content": doc.page_content, "metadata": doc.metadata, "score": float(score)}
+                    for doc, score in query_results
+                ]
+                for query_results in results
+            ],
+            "stats": stats,
+        }
+
+    def embed(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Calcula embeddings de consulta (con la caché de consultas del servidor)"""
+        texts = payload.get("texts")
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise ValueError("'texts' debe ser una lista de textos")
+        embeddings = self.vector_store.embed_queries(texts) if texts else []
+        return {"embeddings": [[float(value) for value in embedding] for embedding in embeddings]}
+
+    def health(self) -> Dict[str, Any]:
+        """Estado del índice y tiempo en marcha"""
+        store = self.vector_store.vectorstore
+        if store is None:
+            chunks = 0
+        elif isinstance(store, (NumpyVectorStore, ShardedVectorStore)):
+            chunks = len(store)
+        else:
+            chunks = store._collection.count()
+        return {
+            "status": "ok" if store is not None else "empty",
+            "chunks": chunks,
+            "uptime_s": time.time() - self._started_at,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del servidor, de las cachés y de los shards"""
+        with self._counters_lock:
+            counters = dict(self._counters)
+            last_search = dict(self._last_search)
+        return {
+            "server": counters,
+            "caches": self.vector_store.cache_stats(),
+            "shards": self.vector_store.shard_stats(),
+            "last_search": last_search,
+        }
+
+    def _count(self, name: str, amount: float = 1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def _handler_class(self):
+        server = self
+        routes = {
+            ("POST", "/search"): server.search,
+            ("POST", "/embed"): server.embed,
+            ("GET", "/health"): lambda _: server.health(),
+            ("GET", "/stats"): lambda _: server.stats(),
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Conexiones persistentes
+            disable_nagle_algorithm = True  # Cabeceras y cuerpo van en escrituras separadas
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def _dispatch(self, method: str):
+                route = routes.get((method, self.path.split("?")[0]))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if route is None:
+                    self._reply(404, {"error": f"Ruta desconocida: {method} {self.path}"})
+                    return
+
+                server._count("requests")
+                try:
+                    payload = json.loads(body) if body else {}
+                    self._reply(200, route(payload))
+                except ValueError as e:
+                    server._count("errors")
+                    self._reply(400, {"error": str(e)})
+                except Exception as e:
+                    server._count("errors")
+                    self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+            def _reply(self, status: int, data: Dict[str, Any]):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Sin una línea de log por petición
+
+        return Handler
+
+
+class RetrievalClient:
+    """
+    Cliente de RetrievalServer con la interfaz de búsqueda de VectorStore
+
+    Se puede pasar a los orquestadores y agentes en lugar de un VectorStore:
+    no carga el modelo de embeddings ni abre el índice. Cada hilo mantiene
+    su propia conexión persistente con el servidor.
+    """
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        """
+        Args:
+            url: URL del servidor, p. ej. http://127.0.0.1:8765
+            timeout: Segundos máximos por petición
+        """
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"URL del servicio de búsqueda no válida: {url}")
+
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def last_search_stats(self) -> Dict[str, Any]:
+        """Estadísticas de la última búsqueda hecha desde este hilo"""
+        return getattr(self._local, "search_stats", {})
+
+    @last_search_stats.setter
+    def last_search_stats(self, stats: Dict[str, Any]):
+        self._local.search_stats = stats
+
+    def load_vectorstore(self) -> "RetrievalClient":
+        """
+        Comprueba que el servidor responde (equivalente a cargar el índice)
+
+        Returns:
+            El propio cliente
+        """
+        health = self._request("GET", "/health")
+        if health.get("status") != "ok":
+            raise ValueError(f"El servicio de búsqueda en {self.url} no tiene índice cargado")
+        print(f"✓ Conectado al servicio de búsqueda en {self.url} ({health['chunks']} chunks)")
+        return self
+
+    def search(
+        self,
+        query: str,
+        k: int = None,
+        mode: str = None,
+        filters: Dict = None,
+        category: str = None
+    ) -> List[Document]:
+        """Busca documentos similares a la consulta (ver VectorStore.search)"""
+        return [doc for doc, _ in self.search_with_scores(query, k, mode, filters, category)]
+
+    def search_with_scores(
+        self,
+        query: str,
+        k: int = None,
+        mode: str = None,
+        filters: Dict = None,
+        category: str = None
+    ) -> List[tuple]:
+        """Busca documentos con scores (ver VectorStore.search_with_scores)"""
+        return self.search_many_with_scores([query], k, mode, filters, category)[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        k: int = None,
+        mode: str = None,
+        filters: Dict = None,
+        category: str = None
+    ) -> List[List[Document]]:
+        """Busca varias consultas a la vez (ver VectorStore.search_many)"""
+        return [
+            [doc for doc, _ in results]
+            for results in self.search_many_with_scores(queries, k, mode, filters, category)
+        ]
+
+    def search_many_with_scores(
+        self,
+        queries: List[str],
+        k: int = None,
+        mode: str = None,
+        filters: Dict = None,
+        category: str = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Busca varias consultas en una sola petición al servidor
+
+        Args:
+            queries: Consultas de búsqueda
+            k: Número de resultados por consulta
+            mode: vector, bm25 o hybrid (por defecto el del servidor)
+            filters: Filtros de producto comunes a todas las consultas
+            category: Categoría de interés, para consultar solo sus shards
+
+        Returns:
+            Lista de tuplas (documento, score) por consulta, en el mismo orden
+        """
+        start = time.perf_counter()
+        response = self._request("POST", "/search", {
+            "queries": list(queries),
+            "k": k,
+            "mode": mode,
+            "filters": filters,
+            "category": category,
+        })
+        self.last_search_stats = {
+            **response["stats"],
+            "round_trip_ms": (time.perf_counter() - start) * 1000,
+        }
+        return [
+            [(Document(page_content=hit["page_content"], metadata=hit["metadata"]), hit["score"]) for hit in hits]
+            for hits in response["results"]
+        ]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Calcula embeddings de consulta con el modelo del servidor (ver VectorStore.embed_queries)"""
+        return self._request("POST", "/embed", {"texts": list(texts)})["embeddings"]
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Contadores de las cachés de consultas del servidor"""
+        return self._request("GET", "/stats")["caches"]
+
+    def shard_stats(self) -> Dict[str, Dict[str, float]]:
+        """Tamaño y latencia de cada shard del servidor"""
+        return self._request("GET", "/stats")["shards"]
+
+    def server_stats(self) -> Dict[str, Any]:
+        """Todas las estadísticas del servidor"""
+        return self._request("GET", "/stats")
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Envía una petición JSON, reintentando una vez si la conexión se cae
+
+        Si el servidor cerró o rechazó la conexión persistente se reintenta
+        con una nueva. Ante un timeout u otro error de red no se reintenta
+        (el servidor puede seguir atendiendo la petición y se duplicaría la
+        espera), pero se descarta la conexión porque pudo quedar a medio leer.
+        """
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = json.loads(response.read() or b"{}")
+                break
+            except (ConnectionError, http.client.HTTPException):
+                self._drop_connection(connection)
+                if attempt:
+                    raise
+            except OSError:
+                self._drop_connection(connection)
+                raise
+
+        if response.status != 200:
+            raise ValueError(f"Servicio de búsqueda ({response.status}): {data.get('error', '')}")
+        return data
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _drop_connection(self, connection: http.client.HTTPConnection):
+        connection.close()
+        self._local.connection = None
@@ -0,0 +1,459 @@
+"""
+Índice particionado por categoría de producto con enrutado de consultas
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangChainVectorStore
+
+from src.rag.bm25 import fold_accents, tokenize
+from src.rag.numpy_index import NumpyVectorStore
+
+
+DEFAULT_SHARD = "general"
+
+
+def shard_slug(category: Any) -> str:
+    """Nombre de shard para una categoría ("Electrodomésticos" -> "electrodomesticos")"""
+    slug = re.sub(r"[^a-z0-9]+", "_", fold_accents(str(category or ""))).strip("_")
+    return slug or DEFAULT_SHARD
+
+
+def upsert_embeddings(
+    store: LangChainVectorStore,
+    ids: List[str],
+    texts: List[str],
+    embeddings: List[List[float]],
+    metadatas: List[dict]
+):
+    """Inserta o actualiza chunks con embeddings ya calculados en cualquier backend"""
+    if isinstance(store, (NumpyVectorStore, ShardedVectorStore)):
+        store.add_embeddings(ids, texts, embeddings, metadatas)
+    else:
+        store._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            documents=texts
+        )
+
+
+def search_by_vectors(
+    store: LangChainVectorStore,
+    embeddings: List[List[float]],
+    k: int,
+    where: Optional[dict] = None
+) -> List[List[Tuple[Document, float]]]:
+    """
+    Top-k de varios embeddings con una sola consulta al índice
+
+    Args:
+        store: Índice de cualquier backend
+        embeddings: Embedding de cada consulta
+        k: Número de resultados por consulta
+        where: Cláusula where sobre los metadatos
+
+    Returns:
+        Lista de tuplas (documento, distancia) por consulta
+    """
+    if isinstance(store, (NumpyVectorStore, ShardedVectorStore)):
+        return store.similarity_search_by_vectors_with_relevance_scores(embeddings, k=k, filter=where)
+
+    if isinstance(store, Chroma):
+        response = store._collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                (Document(page_content=text, metadata=metadata or {}), distance)
+                for text, metadata, distance in zip(texts, metadatas, distances)
+            ]
+            for texts, metadatas, distances in zip(
+                response["documents"],
+                response["metadatas"],
+                response["distances"]
+            )
+        ]
+
+    search_kwargs = {"filter": where} if where else {}
+    return [
+        store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, **search_kwargs)
+        for embedding in embeddings
+    ]
+
+
+def _same_word(a: str, b: str) -> bool:
+    """Igualdad de palabras admitiendo el plural ("laptop" / "laptops", "deporte" / "deportes")"""
+    return a == b or any(a + suffix == b or b + suffix == a for suffix in ("s", "es"))
+
+
+class ShardedVectorStore(LangChainVectorStore):
+    """
+    Un índice por categoría de producto (metadato "categoria")
+
+    Los chunks sin categoría van al shard "general". Las búsquedas pueden
+    limitarse a los shards de una categoría conocida (ver route()); si no,
+    se consultan todos en paralelo y se combinan los top-k por distancia.
+
+    Cada shard es un índice del backend configurado, creado con
+    open_shard(nombre): una colección de Chroma o un subdirectorio NumPy/HNSW.
+    """
+
+    REGISTRY_FILE = "shards.json"
+
+    def __init__(
+        self,
+        directory: str,
+        embedding_function: Embeddings,
+        open_shard: Callable[[str], LangChainVectorStore],
+        max_workers: int = 4
+    ):
+        """
+        Args:
+            directory: Directorio donde se guarda el registro de shards
+            embedding_function: Modelo de embeddings para las consultas
+            open_shard: Función que abre (o crea) el índice de un shard
+            max_workers: Hilos para consultar varios shards a la vez
+        """
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.max_workers = max_workers
+        self._open_shard = open_shard
+
+        self.shards: Dict[str, LangChainVectorStore] = {}
+        self.categories: Dict[str, str] = {}
+        self._local = threading.local()
+        self._search_stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    @classmethod
+    def load(
+        cls,
+        directory: str,
+        embedding_function: Embeddings,
+        open_shard: Callable[[str], LangChainVectorStore],
+        **kwargs: Any
+    ) -> "ShardedVectorStore":
+        """
+        Abre los shards registrados en el directorio (ninguno si no hay registro)
+
+        Args:
+            directory: Directorio del registro de shards
+            embedding_function: Modelo de embeddings para las consultas
+            open_shard: Función que abre el índice de un shard
+            **kwargs: Parámetros adicionales del constructor
+
+        Returns:
+            Índice particionado
+        """
+        store = cls(directory, embedding_function, open_shard, **kwargs)
+        registry_path = os.path.join(directory, cls.REGISTRY_FILE)
+        if os.path.exists(registry_path):
+            with open(registry_path, 'r', encoding='utf-8') as f:
+                categories = json.load(f)["categories"]
+            for slug, category in categories.items():
+                store._shard(slug, category)
+        return store
+
+    @property
+    def last_shard_stats(self) -> Dict[str, float]:
+        """Latencia de cada shard en la última búsqueda hecha desde este hilo"""
+        return getattr(self._local, "shard_stats", {})
+
+    def persist(self):
+        """Guarda los shards que no se persisten solos y el registro"""
+        for shard in self.shards.values():
+            if isinstance(shard, NumpyVectorStore):
+                shard.persist()
+
+        os.makedirs(self.directory, exist_ok=True)
+        registry_path = os.path.join(self.directory, self.REGISTRY_FILE)
+        with open(f"{registry_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"categories": self.categories}, f, ensure_ascii=False, indent=2)
+        os.replace(f"{registry_path}.tmp", registry_path)
+
+    def delete_collection(self):
+        """Elimina todos los shards y el registro"""
+        for shard in self.shards.values():
+            shard.delete_collection()
+        self.shards, self.categories, self._search_stats = {}, {}, {}
+        registry_path = os.path.join(self.directory, self.REGISTRY_FILE)
+        if os.path.exists(registry_path):
+            os.remove(registry_path)
+
+    # Escritura
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        """Calcula los embeddings de los textos y los añade a su shard"""
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None:
+            raise ValueError("El índice particionado requiere IDs de chunk")
+        embeddings = self.embedding_function.embed_documents(texts)
+        self.add_embeddings(list(ids), texts, embeddings, metadatas)
+        return list(ids)
+
+    def add_embeddings(
+        self,
+        ids: List[str],
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None
+    ):
+        """
+        Reparte chunks con embeddings ya calculados entre los shards
+
+        Args:
+            ids: IDs de los chunks
+            texts: Texto de cada chunk
+            embeddings: Embedding de cada chunk
+            metadatas: Metadatos de cada chunk
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        groups: Dict[str, Tuple[list, list, list, list]] = {}
+        for chunk_id, text, embedding, metadata in zip(ids, texts, embeddings, metadatas):
+            category = metadata.get("categoria")
+            slug = shard_slug(category)
+            self._shard(slug, str(category) if category else DEFAULT_SHARD)
+            group = groups.setdefault(slug, ([], [], [], []))
+            for values, value in zip(group, (chunk_id, text, list(embedding), metadata)):
+                values.append(value)
+
+        for slug, (group_ids, group_texts, group_embeddings, group_metadatas) in groups.items():
+            upsert_embeddings(self.shards[slug], group_ids, group_texts, group_embeddings, group_metadatas)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Elimina chunks por ID (en todos los shards, los IDs ausentes se ignoran)"""
+        if ids:
+            for shard in self.shards.values():
+                shard.delete(ids=ids)
+        return True
+
+    # Lectura
+
+    def route(self, category: Optional[str]) -> Optional[List[str]]:
+        """
+        Shards relevantes para una categoría expresada por el usuario
+
+        Compara palabras completas sin tildes ni mayúsculas, admitiendo el
+        plural ("laptop" -> "laptops", "electrodoméstico" -> "electrodomesticos").
+        Solo se enruta si cada palabra de la respuesta (sin palabras vacías)
+        corresponde a una categoría ("laptops y tablets"); si alguna no
+        ("para la casa y el deporte"), se consultan todos los shards. El
+        shard general (chunks sin categoría) se incluye siempre.
+
+        Args:
+            category: Categoría en texto libre (o None)
+
+        Returns:
+            Nombres de shard, o None para consultar todos
+        """
+        if not category:
+            return None
+
+        slugs = [slug for slug in self.shards if slug != DEFAULT_SHARD]
+        wanted = shard_slug(category)
+        if wanted in slugs:
+            matched = [wanted]
+        else:
+            matched = []
+            for token in tokenize(str(category)):
+                token_matches = [
+                    slug for slug in slugs
+                    if any(_same_word(token, word) for word in tokenize(slug.replace("_", " ")))
+                ]
+                if not token_matches:
+                    return None
+                matched.extend(slug for slug in token_matches if slug not in matched)
+
+        if not matched:
+            return None
+        if DEFAULT_SHARD in self.shards:
+            matched.append(DEFAULT_SHARD)
+        return matched
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        """Busca los k documentos más similares a la consulta"""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        """Busca los k documentos más similares a la consulta, con su distancia"""
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(embedding, k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        """Busca los k documentos más similares a un embedding"""
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, **kwargs)]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        """Top-k de un embedding en los shards indicados (shards=) o en todos"""
+        return self.similarity_search_by_vectors_with_relevance_scores([embedding], k, **kwargs)[0]
+
+    def similarity_search_by_vectors_with_relevance_scores(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Top-k de varios embeddings repartiendo la búsqueda entre shards
+
+        Cada shard devuelve su top-k (en paralelo si hay varios) y se
+        combinan por distancia. La latencia de cada shard queda en
+        self.last_shard_stats.
+
+        Args:
+            embeddings: Embedding de cada consulta
+            k: Número de resultados por consulta
+            **kwargs: filter (cláusula where) y shards (lista de nombres,
+                None = todos)
+
+        Returns:
+            Por cada consulta, lista de tuplas (documento, distancia) de menor
+            a mayor distancia
+        """
+        slugs = kwargs.get("shards")
+        slugs = list(self.shards) if slugs is None else [slug for slug in slugs if slug in self.shards]
+        where = kwargs.get("filter")
+
+        def search_shard(slug: str):
+            start = time.perf_counter()
+            results = search_by_vectors(self.shards[slug], embeddings, k, where)
+            return slug, results, (time.perf_counter() - start) * 1000
+
+        if len(slugs) > 1:
+            outputs = list(self._pool().map(search_shard, slugs))
+        else:
+            outputs = [search_shard(slug) for slug in slugs]
+
+        merged: List[List[Tuple[Document, float]]] = [[] for _ in embeddings]
+        for _, results, _ in outputs:
+            for query_results, shard_results in zip(merged, results):
+                query_results.extend(shard_results)
+
+        self._record_latency({slug: elapsed for slug, _, elapsed in outputs})
+        return [sorted(query_results, key=lambda hit: hit[1])[:k] for query_results in merged]
+
+    def shard_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Tamaño y latencia de búsqueda de cada shard
+
+        Returns:
+            Por shard: categoría, chunks, búsquedas, latencia media y última (ms)
+        """
+        stats = {}
+        for slug, shard in self.shards.items():
+            searches = self._search_stats.get(slug, {})
+            count = searches.get("searches", 0)
+            stats[slug] = {
+                "category": self.categories.get(slug, slug),
+                "size": self._shard_size(shard),
+                "searches": count,
+                "avg_ms": searches.get("total_ms", 0.0) / count if count else 0.0,
+                "last_ms": searches.get("last_ms", 0.0),
+            }
+        return stats
+
+    def __len__(self) -> int:
+        return sum(self._shard_size(shard) for shard in self.shards.values())
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        directory: str = None,
+        open_shard: Callable[[str], LangChainVectorStore] = None,
+        **kwargs: Any
+    ) -> "ShardedVectorStore":
+        """
+        Crea un índice particionado repartiendo los textos por su metadato "categoria"
+
+        Args:
+            texts: Textos de los chunks
+            embedding: Modelo de embeddings
+            metadatas: Metadatos de cada chunk
+            ids: IDs de los chunks (por defecto su posición)
+            directory: Directorio del registro de shards; si se indica, el
+                índice se persiste
+            open_shard: Función que abre el índice de un shard (por defecto,
+                un NumpyVectorStore en <directory>/shards/<nombre>)
+            **kwargs: Parámetros adicionales del constructor
+
+        Returns:
+            Índice particionado
+        """
+        if open_shard is None:
+            def open_shard(slug: str) -> LangChainVectorStore:
+                shard_dir = os.path.join(directory, "shards", slug) if directory else None
+                return NumpyVectorStore(shard_dir, embedding)
+
+        texts = list(texts)
+        store = cls(directory, embedding, open_shard, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids or [str(i) for i in range(len(texts))])
+        if directory:
+            store.persist()
+        return store
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    # Internos
+
+    def _shard(self, slug: str, category: str = None) -> LangChainVectorStore:
+        """Devuelve el índice de un shard, abriéndolo si hace falta"""
+        if slug not in self.shards:
+            self.shards[slug] = self._open_shard(slug)
+            self.categories[slug] = category or slug
+        return self.shards[slug]
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._stats_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _record_latency(self, latencies: Dict[str, float]):
+        """Acumula la latencia de cada shard consultado"""
+        self._local.shard_stats = latencies
+        with self._stats_lock:
+            for slug, elapsed in latencies.items():
+                stats = self._search_stats.setdefault(slug, {"searches": 0, "total_ms": 0.0})
+                stats["searches"] += 1
+                stats["total_ms"] += elapsed
+                stats["last_ms"] = elapsed
+
+    @staticmethod
+    def _shard_size(shard: LangChainVectorStore) -> int:
+        if isinstance(shard, NumpyVectorStore):
+            return len(shard)
+        return shard._collection.count()
@@ -0,0 +1,222 @@
+"""
+Snapshot binario del índice: un único archivo versionado, con checksum y
+pensado para abrirse con memory-map
+
+Formato (little-endian):
+
+    cabecera (128 bytes)
+        magic "AURASNAP", versión u32, número de secciones u32,
+        crc32 del contenido u32, dimensión u32, número de chunks u64,
+        y por sección (offset u64, tamaño u64)
+    secciones, cada una alineada a 64 bytes:
+        vectors       float32 [chunks x dimensión]
+        norms         float32 [chunks]       normas al cuadrado precalculadas
+        text_offsets  uint64  [chunks + 1]   posición de cada texto en texts
+        texts         UTF-8 concatenado
+        meta          JSON con ids, metadatos e información del índice
+        bm25          JSON con las frecuencias de término de cada chunk del
+                      índice BM25 (vacío si no se exportó); textos y
+                      metadatos se toman de las secciones texts y meta
+
+Abrir un snapshot cuesta un mmap, parsear el JSON de IDs y metadatos (los
+filtros los necesitan) y, si se pide, verificar el checksum. Vectores y
+normas son vistas sobre el mmap y los textos se decodifican al leerlos.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+MAGIC = b"AURASNAP"
+FORMAT_VERSION = 2
+SECTIONS = ("vectors", "norms", "text_offsets", "texts", "meta", "bm25")
+HEADER_SIZE = 128
+ALIGNMENT = 64
+
+_HEADER = struct.Struct("<8sIIIIQ")
+_SECTION = struct.Struct("<QQ")
+
+
+def write_snapshot(
+    path: str,
+    ids: List[str],
+    texts: Sequence[str],
+    metadatas: List[dict],
+    vectors: np.ndarray,
+    info: Optional[Dict[str, Any]] = None,
+    bm25: Optional[dict] = None
+):
+    """
+    Escribe un snapshot de forma atómica
+
+    Args:
+        path: Ruta del archivo
+        ids: ID de cada chunk
+        texts: Texto de cada chunk
+        metadatas: Metadatos de cada chunk
+        vectors: Matriz de embeddings (una fila por chunk)
+        info: Información adicional del índice (modelo de embeddings, etc.)
+        bm25: Datos del índice BM25 (ver BM25Index.to_dict); solo se guardan
+            las frecuencias de término de los chunks del snapshot
+    """
+    if not (len(ids) == len(texts) == len(metadatas)):
+        raise ValueError("ids, texts y metadatas deben tener la misma longitud")
+    vectors = np.ascontiguousarray(vectors, dtype='<f4')
+    if len(ids):
+        vectors = vectors.reshape(len(ids), -1)
+    else:
+        # Índice vacío: reshape(0, -1) no puede deducir la dimensión
+        vectors = vectors.reshape(0, vectors.shape[-1] if vectors.ndim == 2 else 0)
+
+    bm25_section = None
+    if bm25:
+        rows = set(ids)
+        bm25_section = {
+            "version": bm25["version"],
+            "term_freqs": {
+                chunk_id: term_freqs
+                for chunk_id, (_, _, term_freqs) in bm25["documents"].items()
+                if chunk_id in rows
+            },
+        }
+
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+    offsets[1:] = np.cumsum([len(text) for text in encoded])
+
+    payloads = {
+        "vectors": vectors.tobytes(),
+        "norms": np.einsum('ij,ij->i', vectors, vectors).astype('<f4').tobytes(),
+        "text_offsets": offsets.tobytes(),
+        "texts": b"".join(encoded),
+        "meta": json.dumps(
+            {"ids": list(ids), "metadatas": metadatas, "info": info or {}},
+            ensure_ascii=False
+        ).encode('utf-8'),
+        "bm25": json.dumps(bm25_section, ensure_ascii=False).encode('utf-8') if bm25_section else b"",
+    }
+
+    # Colocar las secciones alineadas tras la cabecera
+    table = []
+    body = bytearray()
+    for name in SECTIONS:
+        body.extend(b"\0" * (-(HEADER_SIZE + len(body)) % ALIGNMENT))
+        table.append((HEADER_SIZE + len(body), len(payloads[name])))
+        body.extend(payloads[name])
+
+    header = bytearray(HEADER_SIZE)
+    _HEADER.pack_into(
+        header, 0,
+        MAGIC, FORMAT_VERSION, len(SECTIONS), zlib.crc32(body),
+        vectors.shape[1], len(ids)
+    )
+    for i, entry in enumerate(table):
+        _SECTION.pack_into(header, _HEADER.size + i * _SECTION.size, *entry)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+class SnapshotTexts(Sequence):
+    """Textos de un snapshot, decodificados del mmap al accederlos"""
+
+    def __init__(self, buffer: memoryview, offsets: np.ndarray):
+        self._buffer = buffer
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return str(self._buffer[start:end], 'utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[row] for row in range(len(self)))
+
+
+class Snapshot:
+    """
+    Snapshot abierto en modo memory-map
+
+    Atributos: ids, metadatas, info, vectors y norms (vistas de solo
+    lectura sobre el archivo), texts (SnapshotTexts) y bm25 (dict o None).
+    """
+
+    def __init__(self, path: str, verify: bool = True):
+        """
+        Args:
+            path: Ruta del archivo
+            verify: Si se comprueba el checksum (lee el archivo completo)
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        if len(buffer) < HEADER_SIZE:
+            raise ValueError(f"Snapshot truncado: {path}")
+        magic, version, section_count, checksum, dim, count = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} no es un snapshot de índice")
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                f"Versión de snapshot no soportada: {version} (se esperaba {FORMAT_VERSION}). "
+                "Vuelve a exportarlo con scripts/export_snapshot.py"
+            )
+        if verify and zlib.crc32(buffer[HEADER_SIZE:]) != checksum:
+            raise ValueError(f"Checksum incorrecto, el snapshot está dañado: {path}")
+
+        sections = {}
+        for i, name in enumerate(SECTIONS[:section_count]):
+            offset, size = _SECTION.unpack_from(buffer, _HEADER.size + i * _SECTION.size)
+            if offset + size > len(buffer):
+                raise ValueError(f"Snapshot truncado: {path}")
+            sections[name] = buffer[offset:offset + size]
+
+        self.dim = dim
+        self.count = count
+        self.vectors = np.frombuffer(sections["vectors"], dtype='<f4').reshape(count, dim)
+        self.norms = np.frombuffer(sections["norms"], dtype='<f4')
+        self.texts = SnapshotTexts(sections["texts"], np.frombuffer(sections["text_offsets"], dtype='<u8'))
+
+        meta = json.loads(bytes(sections["meta"]))
+        self.ids: List[str] = meta["ids"]
+        self.metadatas: List[dict] = meta["metadatas"]
+        self.info: Dict[str, Any] = meta["info"]
+
+        self._bm25_raw = sections["bm25"]
+
+    @property
+    def bm25(self) -> Optional[dict]:
+        """
+        Datos del índice BM25 en el formato de BM25Index.to_dict
+
+        Se reconstruyen al pedirlos uniendo las frecuencias de término de la
+        sección bm25 con los textos y metadatos de cada fila.
+        """
+        if not len(self._bm25_raw):
+            return None
+        data = json.loads(bytes(self._bm25_raw))
+        term_freqs = data["term_freqs"]
+        return {
+            "version": data["version"],
+            "documents": {
+                chunk_id: [self.texts[row], self.metadatas[row], term_freqs[chunk_id]]
+                for row, chunk_id in enumerate(self.ids)
+                if chunk_id in term_freqs
+            },
+        }
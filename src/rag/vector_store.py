@@ -1,29 +1,53 @@
 """
-Sistema de almacenamiento vectorial con ChromaDB
+Sistema de almacenamiento vectorial (ChromaDB, índice NumPy exacto o HNSW,
+opcionalmente particionado por categoría)
 """
-from typing import List, Optional
+from typing import List, Optional, Dict, Tuple
+import hashlib
+import json
 import os
+import threading
+import time
+
+import numpy as np
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangChainVectorStore
 
 from src.config import config
+from src.rag.bm25 import BM25Index, reciprocal_rank_fusion
+from src.rag.document_loader import DocumentLoader
+from src.rag.embeddings import create_embeddings
+from src.rag.filters import build_where, merge_unpriced, without_price
+from src.rag.hnsw_index import HnswVectorStore
+from src.rag.index_manifest import IndexManifest
+from src.rag.ingestion import IngestionPipeline
+from src.rag.numpy_index import NumpyVectorStore
+from src.rag.query_cache import LRUCache
+from src.rag.sharded_index import ShardedVectorStore, search_by_vectors, upsert_embeddings
+from src.rag.snapshot import Snapshot, write_snapshot
 
 
 class VectorStore:
     """Gestor del almacenamiento vectorial para RAG"""
     
-    def __init__(self):
-        # Usar embeddings locales para evitar límites de API
-        print("🔧 Inicializando modelo de embeddings local...")
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        print("✓ Modelo de embeddings listo")
+    def __init__(self, embeddings: Embeddings = None):
+        """
+        Args:
+            embeddings: Modelo de embeddings a usar (por defecto el de
+                create_embeddings(), p. ej. LazyEmbeddings para no esperar
+                a que cargue)
+        """
+        if embeddings is not None:
+            self.embeddings = embeddings
+        else:
+            # Usar embeddings locales para evitar límites de API
+            print("🔧 Inicializando modelo de embeddings local...")
+            self.embeddings = create_embeddings()
+            print("✓ Modelo de embeddings listo")
         
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=config.CHUNK_SIZE,
@@ -32,9 +56,29 @@ class VectorStore:
             separators=["\n\n", "\n", ". ", " ", ""]
         )
         
-        self.vectorstore: Optional[Chroma] = None
+        self.vectorstore: Optional[LangChainVectorStore] = None
+        # Índice léxico que se mantiene junto al vectorial (mismos IDs de chunk)
+        self.bm25: Optional[BM25Index] = None
+        # Estadísticas por hilo: las búsquedas concurrentes (sesiones
+        # asíncronas, peticiones al servicio) no se pisan last_search_stats
+        self._local = threading.local()
+        
+        # Cachés de consultas: los embeddings solo dependen del modelo; los
+        # resultados se indexan por versión del índice y se vacían al cambiar
+        self.index_version = 0
+        self.query_embedding_cache = LRUCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
+        self.result_cache = LRUCache(config.QUERY_CACHE_SIZE, config.QUERY_CACHE_TTL)
     
-    def create_vectorstore(self, documents: List[Document]) -> Chroma:
+    @property
+    def last_search_stats(self) -> Dict[str, float]:
+        """Estadísticas de la última búsqueda hecha desde este hilo"""
+        return getattr(self._local, "search_stats", {})
+    
+    @last_search_stats.setter
+    def last_search_stats(self, stats: Dict[str, float]):
+        self._local.search_stats = stats
+    
+    def create_vectorstore(self, documents: List[Document]) -> LangChainVectorStore:
         """
         Crea un vectorstore a partir de documentos
         
@@ -42,88 +86,697 @@ class VectorStore:
             documents: Lista de documentos a indexar
             
         Returns:
-            Vectorstore de Chroma
+            Vectorstore del backend configurado
         """
         # Dividir documentos en chunks
-        splits = self.text_splitter.split_documents(documents)
+        splits, ids = self._split_with_ids(documents)
         
         print(f"📄 Documentos divididos en {len(splits)} chunks")
         
-        # Crear directorio si no existe
-        os.makedirs(config.CHROMA_DIR, exist_ok=True)
-        
         # Crear vectorstore
-        self.vectorstore = Chroma.from_documents(
-            documents=splits,
-            embedding=self.embeddings,
-            persist_directory=config.CHROMA_DIR
-        )
+        self._open_empty_vectorstore()
+        for start in range(0, len(splits), config.INGEST_BATCH_SIZE):
+            self._add_documents(
+                splits[start:start + config.INGEST_BATCH_SIZE],
+                ids[start:start + config.INGEST_BATCH_SIZE]
+            )
+        self._persist()
+        self._invalidate_caches()
+        
+        # Registrar los archivos indexados para futuras sincronizaciones
+        manifest = IndexManifest(config.INDEX_MANIFEST_PATH)
+        for source, chunk_ids in self._group_ids_by_source(splits, ids).items():
+            if source and os.path.isfile(source):
+                manifest.record(source, chunk_ids)
+        manifest.save()
         
         print(f"✓ Vectorstore creado con {len(splits)} embeddings")
         
         return self.vectorstore
     
-    def load_vectorstore(self) -> Chroma:
+    def create_vectorstore_streaming(
+        self,
+        directory: str,
+        loader: DocumentLoader = None,
+        batch_size: int = None
+    ) -> LangChainVectorStore:
+        """
+        Crea un vectorstore procesando el catálogo en lotes acotados
+        
+        A diferencia de create_vectorstore(), nunca materializa todos los
+        documentos ni todos los chunks: la memoria máxima depende del
+        tamaño de lote, no del tamaño del catálogo.
+        
+        Args:
+            directory: Ruta al directorio con los archivos
+            loader: Cargador de documentos a usar
+            batch_size: Chunks por lote (por defecto config.INGEST_BATCH_SIZE)
+            
+        Returns:
+            Vectorstore del backend configurado
+        """
+        loader = loader or DocumentLoader()
+        self._open_empty_vectorstore()
+        
+        pipeline = IngestionPipeline(self, batch_size=batch_size)
+        pipeline.run(loader.iter_documents(directory))
+        self._persist()
+        
+        manifest = IndexManifest(config.INDEX_MANIFEST_PATH)
+        for source, chunk_ids in pipeline.chunk_ids_by_source.items():
+            if source and os.path.isfile(source):
+                manifest.record(source, chunk_ids)
+        manifest.save()
+        
+        print(f"✓ Vectorstore creado con {pipeline.stats['chunks']} embeddings")
+        
+        return self.vectorstore
+    
+    def sync_vectorstore(self, directory: str, loader: DocumentLoader = None) -> Dict[str, int]:
+        """
+        Sincroniza el vectorstore con un directorio de forma incremental
+        
+        Solo se re-embeben los archivos añadidos o modificados (según el
+        manifiesto de hashes) y se eliminan los chunks de los archivos borrados.
+        
+        Args:
+            directory: Ruta al directorio con los archivos
+            loader: Cargador de documentos a usar
+            
+        Returns:
+            Resumen con el número de archivos añadidos, modificados,
+            eliminados y sin cambios, y de chunks indexados
+        """
+        loader = loader or DocumentLoader()
+        manifest = IndexManifest.load(config.INDEX_MANIFEST_PATH)
+        
+        if os.path.exists(config.INDEX_DIR) and manifest.exists():
+            self.load_vectorstore()
+        else:
+            # Sin manifiesto no se sabe qué chunks pertenecen a cada archivo:
+            # se parte de una colección vacía
+            if os.path.exists(config.INDEX_DIR):
+                print("⚠️ Vectorstore sin manifiesto, se re-indexará completo")
+            self._open_empty_vectorstore()
+        
+        files = loader.list_files(directory)
+        added, changed, removed, hashes = manifest.diff(files)
+        
+        # Eliminar chunks de archivos borrados o modificados
+        stale_ids = []
+        for file_path in removed + changed:
+            stale_ids.extend(manifest.forget(file_path))
+        if stale_ids:
+            self.vectorstore.delete(ids=stale_ids)
+            self.bm25.delete(stale_ids)
+        
+        # Indexar archivos nuevos o modificados
+        chunks_added = 0
+        for file_path in added + changed:
+            try:
+                documents = loader.load_file(file_path)
+            except Exception as e:
+                print(f"✗ Error cargando {os.path.basename(file_path)}: {e}")
+                continue
+            
+            splits, ids = self._split_with_ids(documents)
+            if splits:
+                self._add_documents(splits, ids)
+            manifest.record(file_path, ids, content_hash=hashes[file_path])
+            chunks_added += len(splits)
+            print(f"✓ Indexado: {os.path.basename(file_path)} ({len(splits)} chunks)")
+        
+        manifest.save()
+        self._persist()
+        self._invalidate_caches()
+        
+        summary = {
+            "added": len(added),
+            "changed": len(changed),
+            "removed": len(removed),
+            "unchanged": len(files) - len(added) - len(changed),
+            "chunks_added": chunks_added,
+            "chunks_removed": len(stale_ids),
+        }
+        
+        print(
+            f"✓ Sincronización completada: {summary['added']} nuevos, "
+            f"{summary['changed']} modificados, {summary['removed']} eliminados, "
+            f"{summary['unchanged']} sin cambios"
+        )
+        
+        return summary
+    
+    def _split_with_ids(
+        self,
+        documents: List[Document],
+        counters: Dict[str, int] = None
+    ) -> Tuple[List[Document], List[str]]:
+        """
+        Divide documentos en chunks y les asigna IDs deterministas
+        
+        El ID combina un hash de la ruta de origen con la posición del chunk
+        dentro del archivo, de modo que cada archivo puede re-indexarse sin
+        afectar a los demás.
+        
+        Args:
+            documents: Documentos a dividir
+            counters: Posición actual por archivo, para continuar la
+                numeración entre lotes del mismo archivo
+            
+        Returns:
+            Tupla (chunks, IDs)
+        """
+        splits = self.text_splitter.split_documents(documents)
+        
+        counters = {} if counters is None else counters
+        ids = []
+        for split in splits:
+            source = str(split.metadata.get("source", ""))
+            position = counters.get(source, 0)
+            counters[source] = position + 1
+            source_key = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+            ids.append(f"{source_key}-{position}")
+        
+        return splits, ids
+    
+    def _open_empty_vectorstore(self) -> LangChainVectorStore:
+        """
+        Abre el índice persistente vacío para una reconstrucción completa
+        
+        Si ya existe, se eliminan todos sus chunks y el índice BM25; si no,
+        los chunks de archivos borrados o modificados seguirían apareciendo
+        en las búsquedas. En Chroma la colección se vuelve a crear, así que
+        también se aplican los parámetros HNSW actuales.
+        """
+        os.makedirs(config.INDEX_DIR, exist_ok=True)
+        self._open_backend().delete_collection()
+        self.vectorstore = self._open_backend()
+        self.bm25 = BM25Index(config.BM25_INDEX_PATH)
+        self._invalidate_caches()
+        return self.vectorstore
+    
+    def _open_backend(self) -> LangChainVectorStore:
+        """
+        Abre el índice del backend configurado en config.VECTOR_BACKEND
+        
+        Con config.SHARD_BY_CATEGORY se abre un índice por categoría de
+        producto, cada uno del backend configurado.
+        """
+        if config.SHARD_BY_CATEGORY:
+            return ShardedVectorStore.load(
+                config.INDEX_DIR,
+                self.embeddings,
+                open_shard=self._open_shard,
+                max_workers=config.SHARD_WORKERS
+            )
+        return self._open_shard(None)
+    
+    def _open_shard(self, shard: Optional[str]) -> LangChainVectorStore:
+        """
+        Abre el índice de un shard (o el índice único si shard es None)
+        
+        En Chroma cada shard es una colección del mismo directorio; en NumPy
+        y HNSW, un subdirectorio shards/<nombre>.
+        """
+        if config.VECTOR_BACKEND == "chroma":
+            shard_kwargs = {"collection_name": f"shard_{shard}"} if shard else {}
+            # Chroma ignora los parámetros HNSW de una colección que ya existe:
+            # solo se aplican al crearla, es decir, al crear el índice o en una
+            # reconstrucción completa (create_vectorstore), no en sync_vectorstore
+            return Chroma(
+                persist_directory=config.CHROMA_DIR,
+                embedding_function=self.embeddings,
+                collection_metadata={
+                    "hnsw:space": "l2",
+                    "hnsw:M": config.HNSW_M,
+                    "hnsw:construction_ef": config.HNSW_EF_CONSTRUCTION,
+                    "hnsw:search_ef": config.HNSW_EF_SEARCH,
+                },
+                **shard_kwargs
+            )
+        if config.VECTOR_BACKEND == "numpy":
+            return NumpyVectorStore.load(self._shard_dir(config.NUMPY_INDEX_DIR, shard), self.embeddings)
+        if config.VECTOR_BACKEND == "hnsw":
+            return HnswVectorStore.load(
+                self._shard_dir(config.HNSW_INDEX_DIR, shard),
+                self.embeddings,
+                m=config.HNSW_M,
+                ef_construction=config.HNSW_EF_CONSTRUCTION,
+                ef_search=config.HNSW_EF_SEARCH
+            )
+        raise ValueError(
+            f"VECTOR_BACKEND desconocido: {config.VECTOR_BACKEND}. "
+            "Valores válidos: chroma, numpy, hnsw"
+        )
+    
+    @staticmethod
+    def _shard_dir(directory: str, shard: Optional[str]) -> str:
+        return os.path.join(directory, "shards", shard) if shard else directory
+    
+    def _persist(self):
+        """Guarda el índice BM25 y el vectorial si el backend no lo hace por sí mismo"""
+        if isinstance(self.vectorstore, (NumpyVectorStore, ShardedVectorStore)):
+            self.vectorstore.persist()
+        self.bm25.save()
+    
+    def _add_documents(self, splits: List[Document], ids: List[str]):
+        """Añade chunks al índice vectorial y al léxico"""
+        self.vectorstore.add_documents(splits, ids=ids)
+        self.bm25.add(
+            ids,
+            [split.page_content for split in splits],
+            [split.metadata for split in splits]
+        )
+    
+    def _upsert(
+        self,
+        ids: List[str],
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[dict]
+    ):
+        """
+        Inserta o actualiza chunks con embeddings ya calculados
+        
+        Args:
+            ids: IDs de los chunks
+            texts: Texto de cada chunk
+            embeddings: Embedding de cada chunk
+            metadatas: Metadatos de cada chunk
+        """
+        if not ids:
+            return
+        upsert_embeddings(self.vectorstore, ids, texts, embeddings, metadatas)
+        self.bm25.add(ids, texts, metadatas)
+        self._invalidate_caches()
+    
+    @staticmethod
+    def _group_ids_by_source(splits: List[Document], ids: List[str]) -> Dict[str, List[str]]:
+        """Agrupa los IDs de los chunks por archivo de origen"""
+        grouped: Dict[str, List[str]] = {}
+        for split, chunk_id in zip(splits, ids):
+            grouped.setdefault(str(split.metadata.get("source", "")), []).append(chunk_id)
+        return grouped
+    
+    def load_vectorstore(self) -> LangChainVectorStore:
         """
         Carga un vectorstore existente
         
         Returns:
-            Vectorstore de Chroma
+            Vectorstore del backend configurado
         """
-        if not os.path.exists(config.CHROMA_DIR):
+        if not os.path.exists(config.INDEX_DIR):
             raise ValueError(
-                f"No existe vectorstore en {config.CHROMA_DIR}. "
+                f"No existe vectorstore en {config.INDEX_DIR}. "
                 "Primero debes crear uno con create_vectorstore()"
             )
         
-        self.vectorstore = Chroma(
-            persist_directory=config.CHROMA_DIR,
-            embedding_function=self.embeddings
+        self.vectorstore = self._open_backend()
+        self.bm25 = BM25Index.load(config.BM25_INDEX_PATH)
+        self._invalidate_caches()
+        
+        print(f"✓ Vectorstore cargado desde {config.INDEX_DIR}")
+        if config.SEARCH_MODE != "vector" and not len(self.bm25):
+            print("⚠️ Índice BM25 vacío: vuelve a crear el vectorstore para usar la búsqueda híbrida")
+        
+        return self.vectorstore
+    
+    def export_snapshot(self, path: str) -> Dict[str, int]:
+        """
+        Exporta el índice cargado a un snapshot binario (ver src.rag.snapshot)
+        
+        Incluye vectores, IDs, metadatos, textos y el índice BM25, sea cual
+        sea el backend (en el índice particionado se unen todos los shards).
+        
+        Args:
+            path: Ruta del archivo de snapshot
+            
+        Returns:
+            Número de chunks exportados y tamaño del archivo en bytes
+        """
+        if self.vectorstore is None:
+            raise ValueError("Vectorstore no inicializado")
+        
+        ids, texts, metadatas, vectors = self._index_contents(self.vectorstore)
+        info = {
+            "embedding_model": config.EMBEDDING_MODEL,
+            "embedding_backend": config.EMBEDDING_BACKEND,
+            "vector_backend": config.VECTOR_BACKEND,
+            "created_at": time.time(),
+        }
+        write_snapshot(
+            path, ids, texts, metadatas, vectors,
+            info=info,
+            bm25=self.bm25.to_dict() if self.bm25 is not None and len(self.bm25) else None
+        )
+        
+        size = os.path.getsize(path)
+        print(f"✓ Snapshot exportado: {path} ({len(ids)} chunks, {size / 1e6:.1f} MB)")
+        return {"chunks": len(ids), "bytes": size}
+    
+    def load_snapshot(self, path: str, verify: bool = None) -> LangChainVectorStore:
+        """
+        Carga el índice desde un snapshot binario en modo memory-map
+        
+        El índice resultante es un NumpyVectorStore (búsqueda exacta) sobre
+        el archivo mapeado. El índice BM25 solo se reconstruye si la
+        búsqueda por defecto lo usa (config.SEARCH_MODE distinto de vector).
+        
+        Args:
+            path: Ruta del archivo de snapshot
+            verify: Si se comprueba el checksum (por defecto config.SNAPSHOT_VERIFY)
+            
+        Returns:
+            Vectorstore cargado
+        """
+        start = time.perf_counter()
+        snapshot = Snapshot(path, verify=config.SNAPSHOT_VERIFY if verify is None else verify)
+        
+        model = snapshot.info.get("embedding_model")
+        if model and model != config.EMBEDDING_MODEL:
+            print(f"⚠️ El snapshot se creó con {model} y el modelo configurado es {config.EMBEDDING_MODEL}")
+        
+        self.vectorstore = NumpyVectorStore.from_snapshot(
+            snapshot,
+            self.embeddings,
+            directory=config.NUMPY_INDEX_DIR
         )
+        bm25_data = snapshot.bm25 if config.SEARCH_MODE != "vector" else None
+        self.bm25 = BM25Index.from_dict(config.BM25_INDEX_PATH, bm25_data)
+        self._invalidate_caches()
         
-        print(f"✓ Vectorstore cargado desde {config.CHROMA_DIR}")
+        print(
+            f"✓ Snapshot cargado desde {path} ({snapshot.count} chunks "
+            f"en {(time.perf_counter() - start) * 1000:.0f} ms)"
+        )
+        if config.SEARCH_MODE != "vector" and not len(self.bm25):
+            print("⚠️ El snapshot no incluye índice BM25: vuelve a exportarlo para usar la búsqueda híbrida")
         
         return self.vectorstore
     
-    def search(self, query: str, k: int = None) -> List[Document]:
+    @staticmethod
+    def _index_contents(store: LangChainVectorStore) -> Tuple[List[str], List[str], List[dict], np.ndarray]:
+        """IDs, textos, metadatos y matriz de vectores de un índice de cualquier backend"""
+        if isinstance(store, ShardedVectorStore):
+            parts = [VectorStore._index_contents(shard) for shard in store.shards.values()]
+            parts = [part for part in parts if part[0]]
+            if not parts:
+                return [], [], [], np.empty((0, 0), dtype=np.float32)
+            return (
+                [chunk_id for part in parts for chunk_id in part[0]],
+                [text for part in parts for text in part[1]],
+                [metadata for part in parts for metadata in part[2]],
+                np.concatenate([part[3] for part in parts])
+            )
+        
+        if isinstance(store, NumpyVectorStore):
+            data = store.get()
+            return data["ids"], data["documents"], data["metadatas"], store._matrix()
+        
+        data = store._collection.get(include=["embeddings", "documents", "metadatas"])
+        vectors = np.asarray(data["embeddings"] if len(data["ids"]) else [], dtype=np.float32)
+        return data["ids"], data["documents"], [metadata or {} for metadata in data["metadatas"]], vectors
+    
+    def search(
+        self,
+        query: str,
+        k: int = None,
+        mode: str = None,
+        filters: Dict = None,
+        category: str = None
+    ) -> List[Document]:
         """
         Busca documentos similares a la consulta
         
         Args:
             query: Consulta de búsqueda
             k: Número de resultados a devolver
+            mode: vector, bm25 o hybrid (por defecto config.SEARCH_MODE)
+            filters: Filtros de producto (ver src.rag.filters.build_where)
+            category: Categoría de interés, para consultar solo sus shards
             
         Returns:
             Lista de documentos relevantes
         """
-        if not self.vectorstore:
-            raise ValueError("Vectorstore no inicializado")
-        
-        k = k or config.TOP_K_RESULTS
-        
-        results = self.vectorstore.similarity_search(query, k=k)
-        
-        return results
+        return [doc for doc, _ in self.search_with_scores(query, k, mode, filters, category)]
     
-    def search_with_scores(self, query: str, k: int = None) -> List[tuple]:
+    def search_with_scores(
+        self,
+        query: str,
+        k: int = None,
+        mode: str = None,
+        filters: Dict = None,
+        category: str = None
+    ) -> List[tuple]:
         """
         Busca documentos con scores de similitud
         
+        En modo hybrid se recuperan config.HYBRID_CANDIDATES candidatos de
+        cada índice y se combinan con Reciprocal Rank Fusion. La latencia de
+        cada parte queda en self.last_search_stats.
+        
+        Los filtros (rango de precio, categoría, marca, en stock) se aplican
+        dentro de cada índice, antes de puntuar, de modo que siempre se
+        devuelven hasta k documentos que los cumplen. Con un rango de precio,
+        los documentos sin precio (catálogos en texto libre) no se descartan:
+        se buscan aparte con el resto de filtros y se mezclan por score.
+        
         Args:
             query: Consulta de búsqueda
             k: Número de resultados a devolver
+            mode: vector, bm25 o hybrid (por defecto config.SEARCH_MODE)
+            filters: Filtros de producto, p. ej. {"precio_max": 900, "en_stock": True}
+            category: Categoría de interés, para consultar solo sus shards
+                (ver search_many_with_scores)
+            
+        Returns:
+            Lista de tuplas (documento, score); en todos los modos el score
+            es una distancia (menor = más relevante)
+        """
+        return self.search_many_with_scores([query], k, mode, filters, category)[0]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        k: int = None,
+        mode: str = None,
+        filters: Dict = None,
+        category: str = None
+    ) -> List[List[Document]]:
+        """
+        Busca varias consultas a la vez
+        
+        Args:
+            queries: Consultas de búsqueda
+            k: Número de resultados por consulta
+            mode: vector, bm25 o hybrid (por defecto config.SEARCH_MODE)
+            filters: Filtros de producto comunes a todas las consultas
+            category: Categoría de interés, para consultar solo sus shards
+            
+        Returns:
+            Lista de documentos relevantes por consulta, en el mismo orden
+        """
+        return [
+            [doc for doc, _ in results]
+            for results in self.search_many_with_scores(queries, k, mode, filters, category)
+        ]
+    
+    def search_many_with_scores(
+        self,
+        queries: List[str],
+        k: int = None,
+        mode: str = None,
+        filters: Dict = None,
+        category: str = None
+    ) -> List[List[tuple]]:
+        """
+        Busca varias consultas a la vez, con scores
+        
+        Las consultas que no están en la caché de resultados se resuelven
+        juntas: sus embeddings se calculan en un único lote y la parte
+        vectorial es una sola consulta al índice (producto matricial en
+        NumPy, knn_query por lotes en HNSW, una query con varios embeddings
+        en Chroma).
+        
+        Con el índice particionado (config.SHARD_BY_CATEGORY), la parte
+        vectorial consulta solo los shards de la categoría indicada si se
+        reconoce; si no, todos los shards en paralelo. La parte BM25 es
+        global y aplica los mismos filtros.
+        
+        Args:
+            queries: Consultas de búsqueda
+            k: Número de resultados por consulta
+            mode: vector, bm25 o hybrid (por defecto config.SEARCH_MODE)
+            filters: Filtros de producto comunes a todas las consultas
+            category: Categoría de interés en texto libre (p. ej. "laptop")
             
         Returns:
-            Lista de tuplas (documento, score)
+            Lista de tuplas (documento, score) por consulta, en el mismo orden
         """
-        if not self.vectorstore:
+        if self.vectorstore is None:
             raise ValueError("Vectorstore no inicializado")
         
         k = k or config.TOP_K_RESULTS
+        mode = mode or config.SEARCH_MODE
+        if mode not in ("vector", "bm25", "hybrid"):
+            raise ValueError(f"Modo de búsqueda desconocido: {mode}. Valores válidos: vector, bm25, hybrid")
+        
+        where = build_where(filters)
+        unpriced = without_price(filters)
+        unpriced_where = build_where(unpriced) if unpriced is not None else None
+        shards = self.vectorstore.route(category) if isinstance(self.vectorstore, ShardedVectorStore) else None
+        where_key = json.dumps([where, shards], sort_keys=True)
+        
+        results = [self.result_cache.get((self.index_version, mode, query, k, where_key)) for query in queries]
+        pending = [i for i, cached in enumerate(results) if cached is None]
+        
+        stats = {
+            "mode": mode,
+            "queries": len(queries),
+            "cache_hits": len(queries) - len(pending),
+            "cached": not pending,
+        }
+        if not pending:
+            self.last_search_stats = stats
+            return [list(cached) for cached in results]
+        
+        start = time.perf_counter()
+        pending_queries = [queries[i] for i in pending]
+        candidates = k if mode == "vector" else max(k, config.HYBRID_CANDIDATES)
+        rankings = [[] for _ in pending]
+        
+        if mode in ("vector", "hybrid"):
+            leg_start = time.perf_counter()
+            embeddings = self.embed_queries(pending_queries)
+            stats["embed_ms"] = (time.perf_counter() - leg_start) * 1000
+            vector_results = self._vector_search_many(embeddings, candidates, where, shards)
+            if unpriced is not None:
+                unfiltered = self._vector_search_many(embeddings, candidates, unpriced_where, shards)
+                vector_results = [
+                    merge_unpriced(query_results, extra, candidates)
+                    for query_results, extra in zip(vector_results, unfiltered)
+                ]
+            for ranking, query_results in zip(rankings, vector_results):
+                ranking.append([doc for doc, _ in query_results])
+            stats["vector_ms"] = (time.perf_counter() - leg_start) * 1000
+            if isinstance(self.vectorstore, ShardedVectorStore):
+                stats["shards"] = shards or "all"
+                stats["shard_ms"] = dict(self.vectorstore.last_shard_stats)
         
-        results = self.vectorstore.similarity_search_with_score(query, k=k)
+        if mode in ("bm25", "hybrid"):
+            leg_start = time.perf_counter()
+            for ranking, query in zip(rankings, pending_queries):
+                bm25_results = self.bm25.search(query, k=candidates, where=where)
+                if unpriced is not None:
+                    unfiltered = self.bm25.search(query, k=candidates, where=unpriced_where)
+                    bm25_results = merge_unpriced(bm25_results, unfiltered, candidates, higher_is_better=True)
+                ranking.append([doc for doc, _ in bm25_results])
+            stats["bm25_ms"] = (time.perf_counter() - leg_start) * 1000
         
-        return results
+        fusion_start = time.perf_counter()
+        for position, i in enumerate(pending):
+            if mode == "vector":
+                query_results = vector_results[position]
+            else:
+                query_results = reciprocal_rank_fusion(rankings[position], k, rrf_k=config.RRF_K)
+            results[i] = query_results
+            self.result_cache.put((self.index_version, mode, queries[i], k, where_key), query_results)
+        if mode != "vector":
+            stats["fusion_ms"] = (time.perf_counter() - fusion_start) * 1000
+        
+        stats["total_ms"] = (time.perf_counter() - start) * 1000
+        self.last_search_stats = stats
+        
+        return [list(query_results) for query_results in results]
+    
+    def _vector_search_many(
+        self,
+        embeddings: List[List[float]],
+        k: int,
+        where: Optional[dict] = None,
+        shards: Optional[List[str]] = None
+    ) -> List[List[tuple]]:
+        """
+        Top-k vectorial de varios embeddings con una sola consulta al índice
+        
+        Args:
+            embeddings: Embedding de cada consulta
+            k: Número de resultados por consulta
+            where: Cláusula where sobre los metadatos
+            shards: Shards a consultar en el índice particionado (None = todos)
+            
+        Returns:
+            Lista de tuplas (documento, distancia) por consulta
+        """
+        if isinstance(self.vectorstore, ShardedVectorStore):
+            return self.vectorstore.similarity_search_by_vectors_with_relevance_scores(
+                embeddings,
+                k=k,
+                filter=where,
+                shards=shards
+            )
+        return search_by_vectors(self.vectorstore, embeddings, k, where)
+    
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Obtiene los contadores de las cachés de consultas
+        
+        Returns:
+            Estadísticas de la caché de embeddings y de la de resultados
+        """
+        return {
+            "query_embeddings": self.query_embedding_cache.stats(),
+            "results": self.result_cache.stats(),
+        }
+    
+    def shard_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Obtiene el tamaño y la latencia de búsqueda de cada shard
+        
+        Returns:
+            Estadísticas por shard (vacío si el índice no está particionado)
+        """
+        if isinstance(self.vectorstore, ShardedVectorStore):
+            return self.vectorstore.shard_stats()
+        return {}
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Calcula (o recupera de la caché) los embeddings de varias consultas
+        
+        Las consultas que faltan en la caché se calculan en un único lote.
+        
+        Args:
+            queries: Textos de las consultas
+            
+        Returns:
+            Embedding de cada consulta, en el mismo orden
+        """
+        embeddings = [self.query_embedding_cache.get(query) for query in queries]
+        missing = list(dict.fromkeys(
+            query for query, embedding in zip(queries, embeddings) if embedding is None
+        ))
+        if not missing:
+            return embeddings
+        
+        if len(missing) == 1:
+            vectors = [self.embeddings.embed_query(missing[0])]
+        elif hasattr(self.embeddings, "embed_queries"):
+            vectors = self.embeddings.embed_queries(missing)
+        else:
+            vectors = self.embeddings.embed_documents(missing)
+        
+        computed = dict(zip(missing, vectors))
+        for query, embedding in computed.items():
+            self.query_embedding_cache.put(query, embedding)
+        
+        return [computed[query] if embedding is None else embedding for query, embedding in zip(queries, embeddings)]
+    
+    def _invalidate_caches(self):
+        """Descarta los resultados cacheados tras un cambio en el índice"""
+        self.index_version += 1
+        self.result_cache.clear()
     
     def get_retriever(self, k: int = None):
         """
@@ -135,7 +788,7 @@ class VectorStore:
         Returns:
             Retriever de LangChain
         """
-        if not self.vectorstore:
+        if self.vectorstore is None:
             raise ValueError("Vectorstore no inicializado")
         
         k = k or config.TOP_K_RESULTS
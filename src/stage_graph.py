@@ -0,0 +1,293 @@
+"""
+Grafo de etapas con entradas y salidas explícitas y un planificador que
+ejecuta a la vez las etapas independientes
+"""
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class Stage:
+    """
+    Etapa del grafo
+
+    La función recibe sus entradas como argumentos con nombre y devuelve
+    el valor de su única salida, o una tupla con las salidas en el orden
+    declarado. Opcionalmente tiene una versión asíncrona (corrutina con la
+    misma firma); sin ella, StageGraph.arun() ejecuta la síncrona en el
+    executor del event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        afunc: Optional[Callable[..., Awaitable[Any]]] = None
+    ):
+        """
+        Args:
+            name: Nombre único de la etapa
+            func: Función síncrona de la etapa
+            inputs: Nombres de los valores que necesita
+            outputs: Nombres de los valores que produce
+            afunc: Versión asíncrona de func (opcional)
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.afunc = afunc
+
+    def unpack(self, result: Any) -> Dict[str, Any]:
+        """Asocia el resultado de la función con los nombres de las salidas"""
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: result}
+        if not self.outputs:
+            return {}
+        if not isinstance(result, tuple) or len(result) != len(self.outputs):
+            raise ValueError(
+                f"La etapa '{self.name}' debe devolver una tupla con {len(self.outputs)} valores"
+            )
+        return dict(zip(self.outputs, result))
+
+
+class StageGraph:
+    """
+    Grafo acíclico de etapas
+
+    Las dependencias se deducen de las entradas y salidas: una etapa se
+    lanza en cuanto están disponibles todos sus valores de entrada, así que
+    las etapas sin dependencias entre sí se solapan (en hilos con run() o
+    como tareas con arun()). Cada ejecución registra el inicio, el fin y la
+    duración de cada etapa en last_timings y la ruta crítica en
+    last_critical_path.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: int = 4):
+        """
+        Args:
+            stages: Etapas del grafo
+            max_workers: Hilos máximos de run()
+
+        Raises:
+            ValueError: Si hay nombres o salidas repetidos o un ciclo
+        """
+        self.stages = {}
+        self.producers: Dict[str, str] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Etapa repetida: {stage.name}")
+            self.stages[stage.name] = stage
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(
+                        f"'{output}' lo producen '{self.producers[output]}' y '{stage.name}'"
+                    )
+                self.producers[output] = stage.name
+
+        self.max_workers = max_workers
+        self.order = self._topological_order()
+        self.last_timings: Dict[str, Dict[str, float]] = {}
+        self.last_critical_path: Tuple[List[str], float] = ([], 0.0)
+
+    def dependencies(self, name: str) -> List[str]:
+        """Etapas que producen las entradas de una etapa"""
+        return sorted({
+            self.producers[value]
+            for value in self.stages[name].inputs
+            if value in self.producers
+        })
+
+    def run(self, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Ejecuta el grafo en un pool de hilos
+
+        Args:
+            inputs: Valores iniciales (entradas que no produce ninguna etapa)
+
+        Returns:
+            Valores iniciales más todas las salidas de las etapas
+        """
+        values = self._initial_values(inputs)
+        pending = list(self.order)
+        start = time.perf_counter()
+        timings: Dict[str, Dict[str, float]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while pending or running:
+                for stage in self._ready(pending, values):
+                    pending.remove(stage.name)
+                    running[executor.submit(self._call, stage, values, start)] = stage
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        outputs, timings[stage.name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    values.update(outputs)
+
+        self._record(timings)
+        return values
+
+    async def arun(self, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Versión asíncrona de run(): cada etapa es una tarea del event loop
+
+        Args:
+            inputs: Valores iniciales (entradas que no produce ninguna etapa)
+
+        Returns:
+            Valores iniciales más todas las salidas de las etapas
+        """
+        values = self._initial_values(inputs)
+        pending = list(self.order)
+        start = time.perf_counter()
+        timings: Dict[str, Dict[str, float]] = {}
+
+        running = {}
+        while pending or running:
+            for stage in self._ready(pending, values):
+                pending.remove(stage.name)
+                running[asyncio.ensure_future(self._acall(stage, values, start))] = stage
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stage = running.pop(task)
+                try:
+                    outputs, timings[stage.name] = task.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+                values.update(outputs)
+
+        self._record(timings)
+        return values
+
+    def critical_path(self, timings: Dict[str, Dict[str, float]] = None) -> Tuple[List[str], float]:
+        """
+        Calcula la cadena de dependencias con mayor duración acumulada
+
+        Es el límite inferior de la latencia del grafo con paralelismo
+        ilimitado: solo acortando estas etapas baja la latencia total.
+
+        Args:
+            timings: Tiempos por etapa (por defecto los de la última ejecución)
+
+        Returns:
+            Tupla (nombres de las etapas en orden, duración total en ms)
+        """
+        timings = self.last_timings if timings is None else timings
+        finish: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for name in self.order:
+            if name not in timings:
+                continue
+            deps = [dep for dep in self.dependencies(name) if dep in finish]
+            before = max(deps, key=lambda dep: finish[dep]) if deps else None
+            previous[name] = before
+            finish[name] = timings[name]["duration_ms"] + (finish[before] if before else 0.0)
+
+        if not finish:
+            return [], 0.0
+        name = max(finish, key=finish.get)
+        total = finish[name]
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1], total
+
+    def report(self) -> str:
+        """Resumen de la última ejecución: duración por etapa y ruta crítica"""
+        if not self.last_timings:
+            return "Sin ejecuciones"
+        wall_ms = max(timing["end_ms"] for timing in self.last_timings.values())
+        stages = ", ".join(
+            f"{name} {timing['duration_ms']:.0f} ms"
+            for name, timing in sorted(self.last_timings.items(), key=lambda item: item[1]["start_ms"])
+        )
+        path, path_ms = self.last_critical_path
+        return (
+            f"{stages}; total {wall_ms:.0f} ms, "
+            f"ruta crítica {' → '.join(path)} ({path_ms:.0f} ms)"
+        )
+
+    def _topological_order(self) -> List[str]:
+        """Orden de las etapas compatible con sus dependencias"""
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 = visitando, 2 = terminado
+
+        def visit(name: str):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Ciclo en el grafo de etapas en '{name}'")
+            state[name] = 1
+            for dep in self.dependencies(name):
+                visit(dep)
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _initial_values(self, inputs: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Comprueba que se proporcionan las entradas que no produce ninguna etapa"""
+        values = dict(inputs or {})
+        missing = sorted({
+            value
+            for stage in self.stages.values()
+            for value in stage.inputs
+            if value not in self.producers and value not in values
+        })
+        if missing:
+            raise ValueError(f"Faltan entradas del grafo de etapas: {', '.join(missing)}")
+        return values
+
+    def _ready(self, pending: List[str], values: Dict[str, Any]) -> List[Stage]:
+        """Etapas pendientes con todas sus entradas disponibles"""
+        return [
+            self.stages[name]
+            for name in pending
+            if all(value in values for value in self.stages[name].inputs)
+        ]
+
+    @staticmethod
+    def _call(stage: Stage, values: Dict[str, Any], origin: float):
+        began = time.perf_counter()
+        result = stage.func(**{value: values[value] for value in stage.inputs})
+        return stage.unpack(result), StageGraph._timing(origin, began)
+
+    @staticmethod
+    async def _acall(stage: Stage, values: Dict[str, Any], origin: float):
+        kwargs = {value: values[value] for value in stage.inputs}
+        began = time.perf_counter()
+        if stage.afunc is not None:
+            result = await stage.afunc(**kwargs)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, lambda: stage.func(**kwargs))
+        return stage.unpack(result), StageGraph._timing(origin, began)
+
+    @staticmethod
+    def _timing(origin: float, began: float) -> Dict[str, float]:
+        ended = time.perf_counter()
+        return {
+            "start_ms": (began - origin) * 1000,
+            "end_ms": (ended - origin) * 1000,
+            "duration_ms": (ended - began) * 1000,
+        }
+
+    def _record(self, timings: Dict[str, Dict[str, float]]):
+        self.last_timings = timings
+        self.last_critical_path = self.critical_path(timings)
@@ -0,0 +1,139 @@
+"""
+Flujo de análisis y recomendación común a los orquestadores
+"""
+from typing import Any, Dict, Optional
+from enum import Enum
+
+from src.config import config
+from src.stage_graph import Stage, StageGraph
+
+
+class WorkflowState(Enum):
+    """Estados del flujo de trabajo"""
+    INIT = "init"
+    COLLECTING_INFO = "collecting_info"
+    ANALYZING_PREFERENCES = "analyzing_preferences"
+    GENERATING_RECOMMENDATIONS = "generating_recommendations"
+    COMPLETED = "completed"
+
+
+class RecommendationWorkflow:
+    """
+    Grafo de etapas del análisis y la recomendación
+
+    Las subclases tienen analyzer, recommender, state y workflow_data y
+    aportan las etapas que dependen de su recolector: _analyze() y
+    _aanalyze() (análisis del usuario) y _search_inputs() (filtros y
+    categoría de la búsqueda).
+    """
+
+    def _analyze(self) -> str:
+        """Etapa de análisis del usuario"""
+        raise NotImplementedError
+
+    async def _aanalyze(self) -> str:
+        """Versión asíncrona de _analyze()"""
+        raise NotImplementedError
+
+    def _search_inputs(self) -> tuple:
+        """Etapa de filtros y categoría de la búsqueda"""
+        raise NotImplementedError
+
+    def _build_workflow_graph(self) -> StageGraph:
+        """
+        Construye el grafo de etapas del análisis y la recomendación
+
+        Los filtros y la categoría de la búsqueda salen directamente de lo
+        recopilado, así que se calculan a la vez que el análisis. Por
+        defecto la cadena es análisis → criterios → query del LLM →
+        búsqueda → recomendaciones. Con config.WORKFLOW_EARLY_RETRIEVAL la
+        query es el propio análisis: la búsqueda se solapa con la
+        generación de criterios y se ahorra la llamada al LLM de la query,
+        a cambio de buscar con un texto más largo y menos preciso.
+
+        Returns:
+            Grafo de etapas
+        """
+        if config.WORKFLOW_EARLY_RETRIEVAL:
+            query_stage = Stage(
+                "search_query", lambda user_analysis: user_analysis,
+                inputs=["user_analysis"], outputs=["search_query"]
+            )
+        else:
+            query_stage = Stage(
+                "search_query", self.analyzer.generate_search_query,
+                inputs=["user_analysis", "criteria"], outputs=["search_query"],
+                afunc=self.analyzer.agenerate_search_query
+            )
+
+        return StageGraph([
+            Stage(
+                "analysis", self._analyze,
+                outputs=["user_analysis"],
+                afunc=self._aanalyze
+            ),
+            Stage(
+                "search_inputs", self._search_inputs,
+                outputs=["filters", "category"]
+            ),
+            Stage(
+                "criteria", self.analyzer.generate_criteria,
+                inputs=["user_analysis"], outputs=["criteria"],
+                afunc=self.analyzer.agenerate_criteria
+            ),
+            query_stage,
+            Stage(
+                "retrieval", self._retrieve,
+                inputs=["search_query", "filters", "category"],
+                outputs=["products", "search_stats", "retrieval_stats", "products_context"]
+            ),
+            Stage(
+                "recommendations", self.recommender.generate_recommendations,
+                inputs=["products_context", "user_analysis", "criteria"], outputs=["recommendations"],
+                afunc=self.recommender.agenerate_recommendations
+            ),
+        ])
+
+    def _retrieve(self, search_query: str, filters: Optional[Dict[str, Any]], category: Optional[str]) -> tuple:
+        """Etapa de búsqueda: contexto de productos del recomendador"""
+        print("🎯 Buscando los mejores productos para ti...")
+        self.state = WorkflowState.GENERATING_RECOMMENDATIONS
+
+        return self.recommender.build_context(search_query, filters, category)
+
+    def _complete_workflow(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Guarda los resultados de las etapas y construye la respuesta final"""
+        timings = self.workflow_graph.last_timings
+        path, path_ms = self.workflow_graph.last_critical_path
+        print(f"⏱️ Etapas: {self.workflow_graph.report()}")
+
+        self.analyzer.save_results(values['criteria'], values['search_query'])
+        values['retrieval_stats']["generation_ms"] = timings['recommendations']['duration_ms']
+        recommender_result = self.recommender.save_results(
+            values['products'],
+            values['recommendations'],
+            values['search_stats'],
+            values['retrieval_stats'],
+            self.workflow_data['filters']
+        )
+
+        self.workflow_data['criteria'] = values['criteria']
+        self.workflow_data['search_query'] = values['search_query']
+        self.workflow_data['recommendations'] = recommender_result['recommendations']
+        self.workflow_data['products_found'] = recommender_result['products_found']
+        self.workflow_data['stage_timings'] = timings
+        self.workflow_data['critical_path'] = {"stages": path, "ms": path_ms}
+
+        # Completado
+        self.state = WorkflowState.COMPLETED
+
+        return {
+            "message": self._format_final_response(),
+            "status": "completed",
+            "recommendations": self.workflow_data['recommendations'],
+            "products_found": self.workflow_data['products_found']
+        }
+
+    def _format_final_response(self) -> str:
+        """Respuesta final con las recomendaciones"""
+        raise NotImplementedError
@@ -0,0 +1,56 @@
+"""
+Fixtures compartidas por los tests
+"""
+import hashlib
+import os
+from typing import List
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class FakeEmbeddings(Embeddings):
+    """Embeddings deterministas a partir del hash del texto (sin cargar ningún modelo)"""
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+@pytest.fixture
+def products_dir() -> str:
+    """Directorio con los catálogos de ejemplo del repositorio"""
+    return os.path.join(ROOT, "data", "products")
+
+
+@pytest.fixture
+def fake_embeddings() -> FakeEmbeddings:
+    return FakeEmbeddings()
+
+
+@pytest.fixture
+def numpy_index(tmp_path, monkeypatch):
+    """Configura un índice NumPy sin particionar en un directorio temporal"""
+    from src.config import config
+
+    index_dir = str(tmp_path / "index")
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(config, "SHARD_BY_CATEGORY", False)
+    monkeypatch.setattr(config, "NUMPY_INDEX_DIR", index_dir)
+    monkeypatch.setattr(config, "INDEX_DIR", index_dir)
+    monkeypatch.setattr(config, "INDEX_MANIFEST_PATH", os.path.join(index_dir, "manifest.json"))
+    monkeypatch.setattr(config, "BM25_INDEX_PATH", os.path.join(index_dir, "bm25.json"))
+    return index_dir
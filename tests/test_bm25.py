@@ -0,0 +1,96 @@
+"""
+Tests del índice BM25 y de la fusión Reciprocal Rank Fusion
+"""
+import math
+
+import pytest
+from langchain_core.documents import Document
+
+from src.rag.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def _index(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.json"))
+    index.add(
+        ["a", "b", "c"],
+        [
+            "Aspiradora robot Roomba j7+ con mapeo",
+            "Cafetera Nespresso Vertuo de cápsulas",
+            "Robot de cocina con báscula",
+        ],
+        [{"precio": 799.99}, {"precio": 199.99}, {"precio": 349.0}],
+    )
+    return index
+
+
+def test_tokenize_folds_accents_and_drops_stopwords():
+    assert tokenize("La Cámara de FOTOS HOME002") == ["camara", "fotos", "home002"]
+
+
+def test_tokenize_keeps_trailing_plus_in_model_names():
+    assert tokenize("Galaxy J7+ y J7, C++ 5+3") == ["galaxy", "j7+", "j7", "c++", "5", "3"]
+
+
+def test_search_ranks_by_bm25_score(tmp_path):
+    index = _index(tmp_path)
+
+    results = index.search("robot roomba", k=3)
+
+    assert [doc.page_content.split()[0] for doc, _ in results] == ["Aspiradora", "Robot"]
+    assert results[0][1] > results[1][1] > 0
+    # "robot" aparece en dos de tres chunks: idf = ln(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    length_norm = 1.5 * (1 - 0.75 + 0.75 * 3 / 4)  # 3 términos, media 12 / 3
+    assert results[1][1] == pytest.approx(math.log(1 + 1.5 / 2.5) * 2.5 / (1 + length_norm))
+
+
+def test_search_applies_where_clause(tmp_path):
+    index = _index(tmp_path)
+
+    results = index.search("robot", k=3, where={"precio": {"$lte": 500}})
+
+    assert [doc.metadata["precio"] for doc, _ in results] == [349.0]
+
+
+def test_replace_delete_and_reload(tmp_path):
+    index = _index(tmp_path)
+    index.add(["a"], ["Licuadora de vaso"], [{}])
+    index.delete(["c"])
+    index.save()
+
+    reloaded = BM25Index.load(index.path)
+
+    assert len(reloaded) == 2
+    assert reloaded.search("robot") == []
+    assert reloaded.search("licuadora")[0][0].page_content == "Licuadora de vaso"
+    assert reloaded._total_length == sum(reloaded._lengths.values())
+
+
+def test_rrf_rewards_documents_in_both_rankings():
+    a, b, c = (Document(page_content=text, metadata={"source": "x"}) for text in "abc")
+
+    fused = reciprocal_rank_fusion([[a, b], [b, c]], k=3, rrf_k=60)
+
+    assert [doc.page_content for doc, _ in fused] == ["b", "a", "c"]
+    best = 2 / 61
+    assert fused[0][1] == pytest.approx(1 - (1 / 62 + 1 / 61) / best)
+    assert fused[1][1] == pytest.approx(1 - (1 / 61) / best)
+
+
+def test_rrf_first_everywhere_has_zero_distance():
+    a, b = Document(page_content="a"), Document(page_content="b")
+
+    fused = reciprocal_rank_fusion([[a, b], [a, b]], k=1)
+
+    assert fused == [(a, pytest.approx(0.0))]
+
+
+def test_index_from_previous_version_is_retokenized(tmp_path):
+    data = {
+        "version": 1,
+        "documents": {"a": ["Samsung Galaxy J7+", {"marca": "Samsung"}, {"samsung": 1, "galaxy": 1, "j7": 1}]},
+    }
+
+    index = BM25Index.from_dict(str(tmp_path / "bm25.json"), data)
+
+    assert index.to_dict()["documents"]["a"][2] == {"samsung": 1, "galaxy": 1, "j7+": 1}
+    assert [doc.metadata for doc, _ in index.search("j7+", k=1)] == [{"marca": "Samsung"}]
@@ -0,0 +1,214 @@
+"""
+Tests del cargador de documentos
+"""
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.rag.document_loader import DocumentLoader
+
+
+def _snapshot(documents):
+    return [(doc.page_content, doc.metadata) for doc in documents]
+
+
+def test_parallel_load_matches_sequential(products_dir):
+    loader = DocumentLoader()
+    sequential = loader.load_documents(products_dir, workers=1)
+    parallel = loader.load_documents(products_dir, workers=2)
+
+    assert sequential
+    assert _snapshot(parallel) == _snapshot(sequential)
+
+
+def test_documents_follow_file_order(products_dir):
+    loader = DocumentLoader()
+    documents = loader.load_documents(products_dir, workers=2)
+
+    sources = [doc.metadata["source"] for doc in documents]
+    first_seen = list(dict.fromkeys(sources))
+    assert first_seen == loader.list_files(products_dir)
+
+
+def test_failing_file_is_reported_not_raised(tmp_path, products_dir, capsys):
+    shutil.copy(f"{products_dir}/productos_tecnologia.json", tmp_path / "ok.json")
+    (tmp_path / "roto.json").write_text("{no es json", encoding="utf-8")
+
+    documents = DocumentLoader().load_documents(str(tmp_path), workers=2)
+
+    assert documents
+    assert all(doc.metadata["source"].endswith("ok.json") for doc in documents)
+    assert "Error cargando roto.json" in capsys.readouterr().out
+
+
+def _iterrows_to_documents(df, file_path):
+    """Conversión anterior con iterrows(), usada como referencia"""
+    return [
+        ({"source": file_path, "row": idx}, "\n".join(f"{col}: {row[col]}" for col in df.columns))
+        for idx, row in df.iterrows()
+    ]
+
+
+def _sample_frames(products_dir, tmp_path):
+    """CSV de ejemplo tal cual, con huecos (NaN) y con las columnas reordenadas, también como XLSX"""
+    csv_path = f"{products_dir}/productos_hogar.csv"
+    base = pd.read_csv(csv_path)
+
+    with_gaps = base.copy()
+    with_gaps.loc[0, "precio"] = np.nan
+    with_gaps.loc[1, "stock"] = np.nan
+    with_gaps.loc[2, "marca"] = np.nan
+    gaps_path = tmp_path / "huecos.csv"
+    with_gaps.to_csv(gaps_path, index=False)
+
+    reordered_path = tmp_path / "reordenado.csv"
+    base[list(reversed(base.columns))].to_csv(reordered_path, index=False)
+
+    xlsx_path = tmp_path / "huecos.xlsx"
+    with_gaps.to_excel(xlsx_path, index=False)
+
+    loader = DocumentLoader()
+    return [
+        (csv_path, pd.read_csv(csv_path), loader._load_csv),
+        (str(gaps_path), pd.read_csv(gaps_path), loader._load_csv),
+        (str(reordered_path), pd.read_csv(reordered_path), loader._load_csv),
+        (str(xlsx_path), pd.read_excel(xlsx_path), loader._load_excel),
+    ]
+
+
+def test_dataframe_conversion_matches_iterrows(products_dir, tmp_path):
+    for file_path, df, load in _sample_frames(products_dir, tmp_path):
+        documents = load(file_path)
+        expected = _iterrows_to_documents(df, file_path)
+
+        assert [doc.page_content for doc in documents] == [content for _, content in expected]
+        assert [
+            {"source": doc.metadata["source"], "row": doc.metadata["row"]} for doc in documents
+        ] == [metadata for metadata, _ in expected]
+
+
+def test_dataframe_conversion_keeps_nan_cells_out_of_metadata(products_dir, tmp_path):
+    file_path, df, load = _sample_frames(products_dir, tmp_path)[1]
+    documents = load(file_path)
+
+    assert "precio: nan" in documents[0].page_content
+    assert "precio" not in documents[0].metadata
+    assert "stock" not in documents[1].metadata
+    assert "marca" not in documents[2].metadata
+    assert documents[3].metadata["precio"] == df.loc[3, "precio"]
+
+
+def test_dataframe_conversion_uses_python_types(products_dir, tmp_path):
+    for file_path, _, load in _sample_frames(products_dir, tmp_path):
+        for doc in load(file_path):
+            for name, value in doc.metadata.items():
+                assert type(value) in (str, int, float), (file_path, name, type(value))
+            assert type(doc.metadata["row"]) is int
+            assert type(doc.metadata.get("stock", 0)) is int
+            assert type(doc.metadata.get("precio", 0.0)) is float
+
+
+def test_streamed_csv_falls_back_to_csv_loader(tmp_path):
+    # Una fila con más campos que la cabecera hace fallar a pandas
+    file_path = tmp_path / "irregular.csv"
+    file_path.write_text("a,b\n1,2\n3,4,5\n", encoding="utf-8")
+    loader = DocumentLoader()
+
+    streamed = list(loader.iter_file(str(file_path)))
+
+    assert _snapshot(streamed) == _snapshot(loader.load_file(str(file_path)))
+    assert [doc.metadata["row"] for doc in streamed] == [0, 1]
+
+
+def test_streamed_csv_matches_full_load(products_dir):
+    file_path = f"{products_dir}/productos_hogar.csv"
+    loader = DocumentLoader()
+
+    streamed = list(loader.iter_file(file_path, chunk_rows=3))
+
+    assert _snapshot(streamed) == _snapshot(loader.load_file(file_path))
+
+
+def test_csv_prices_in_spanish_format(tmp_path):
+    file_path = tmp_path / "precios.csv"
+    file_path.write_text(
+        'id,precio,stock\n'
+        'A,1.200,1.500\n'
+        'B,"1.299,99",3\n'
+        'C,"1,5",2\n'
+        'D,"$1,299.99",0\n'
+        'E,899.99,7\n',
+        encoding="utf-8",
+    )
+    loader = DocumentLoader()
+
+    for documents in (loader.load_file(str(file_path)), list(loader.iter_file(str(file_path), chunk_rows=2))):
+        assert [doc.metadata["precio"] for doc in documents] == [1200.0, 1299.99, 1.5, 1299.99, 899.99]
+        assert [doc.metadata["stock"] for doc in documents] == [1500, 3, 2, 0, 7]
+        assert "precio: 1.200" in documents[0].page_content
+
+
+def _excel_with_blank_rows(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["nombre", "precio", "stock"])
+    sheet.append(["Cafetera", 89.5, 3])
+    sheet.append([None, None, None])
+    sheet.append(["Tostadora", 35.0, 7])
+    sheet.append(["Batidora", 49.99, 2])
+    # Filas vacías al final, como las que arrastran las hojas editadas
+    sheet.append([None, None, None])
+    sheet.append([None, None, None])
+    file_path = tmp_path / "catalogo.xlsx"
+    workbook.save(file_path)
+    return str(file_path)
+
+
+def test_streamed_excel_keeps_row_numbers_of_full_load(tmp_path):
+    file_path = _excel_with_blank_rows(tmp_path)
+    loader = DocumentLoader()
+    full = loader.load_file(file_path)
+
+    assert [doc.metadata["row"] for doc in full] == [0, 1, 2, 3]
+    assert _snapshot(loader.iter_file(file_path, chunk_rows=10)) == _snapshot(full)
+    for chunk_rows in (1, 2, 3):
+        streamed = list(loader.iter_file(file_path, chunk_rows=chunk_rows))
+        assert [doc.metadata for doc in streamed] == [doc.metadata for doc in full], chunk_rows
+
+
+def test_streamed_excel_falls_back_to_unstructured_loader(tmp_path, monkeypatch):
+    from langchain_core.documents import Document
+
+    from src.rag import document_loader
+
+    file_path = _excel_with_blank_rows(tmp_path)
+
+    class FakeExcelLoader:
+        def __init__(self, path):
+            self.path = path
+
+        def lazy_load(self):
+            for i in range(4):
+                yield Document(page_content=f"fila {i}", metadata={"source": self.path})
+
+    loader = DocumentLoader()
+    convert = loader._rows_to_documents
+    calls = []
+
+    def failing_after_first_block(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise ValueError("hoja dañada")
+        return convert(*args)
+
+    monkeypatch.setattr(document_loader, "UnstructuredExcelLoader", FakeExcelLoader)
+    monkeypatch.setattr(loader, "_rows_to_documents", failing_after_first_block)
+
+    streamed = list(loader.iter_file(file_path, chunk_rows=2))
+
+    # El primer bloque incluye la fila vacía intermedia (filas 0 a 2)
+    assert [doc.metadata.get("row") for doc in streamed[:3]] == [0, 1, 2]
+    assert [doc.page_content for doc in streamed[3:]] == ["fila 3"]
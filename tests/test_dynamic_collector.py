@@ -0,0 +1,146 @@
+"""
+Tests de los turnos estructurados del recolector dinámico
+"""
+import pytest
+
+from src.agents.dynamic_collector import DynamicInformationCollectorAgent
+from src.config import config
+
+
+@pytest.fixture
+def collector(monkeypatch):
+    monkeypatch.setattr(config, "GOOGLE_API_KEY", "test")
+    return DynamicInformationCollectorAgent()
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('{"completo": false, "pregunta": "¿Qué presupuesto tienes?"}',
+     {"completo": False, "pregunta": "¿Qué presupuesto tienes?"}),
+    ('```json\n{"completo": true, "pregunta": null}\n```', {"completo": True, "pregunta": None}),
+    ('Claro: {"informacion": {"categoria": "laptop"}} ¡gracias!', {"informacion": {"categoria": "laptop"}}),
+])
+def test_parse_turn_extracts_json(content, expected):
+    assert DynamicInformationCollectorAgent._parse_turn(content) == expected
+
+
+@pytest.mark.parametrize("content", [
+    "¿Qué presupuesto tienes?",
+    '{"completo": false, "pregunta": "¿Qué uso le darás?"',
+    "{'completo': False}",
+    "} al revés {",
+    "",
+])
+def test_parse_turn_rejects_malformed_json(content):
+    assert DynamicInformationCollectorAgent._parse_turn(content) is None
+
+
+def test_merge_information_fields(collector):
+    collector._merge_information({
+        "presupuesto": "hasta 800 dólares",
+        "categoria": "laptop",
+        "caracteristicas": ["16 GB de RAM", "pantalla 14"],
+        "prioridades": "batería",
+        "preferencias_marca": ["Lenovo", "Dell", ""],
+        "uso_principal": "null",
+        "restricciones": [],
+        "color": "rojo",
+    })
+    collector._merge_information({
+        "categoria": "laptop ligera",
+        "caracteristicas": ["16 GB de RAM", "SSD"],
+        "prioridades": ["precio"],
+        "presupuesto": None,
+    })
+
+    info = collector.information_gathered
+    assert info["presupuesto"] == "hasta 800 dólares"
+    assert info["categoria"] == "laptop ligera"
+    assert info["caracteristicas"] == ["16 GB de RAM", "pantalla 14", "SSD"]
+    assert info["prioridades"] == ["batería", "precio"]
+    assert info["preferencias_marca"] == "Lenovo, Dell"
+    assert info["uso_principal"] is None
+    assert info["restricciones"] == []
+    assert "color" not in info
+
+
+def test_accept_turn_records_question(collector):
+    question = collector._accept_turn(
+        '{"informacion": {"categoria": "smartphone"}, "completo": false, "pregunta": "¿Cuál es tu presupuesto?"}'
+    )
+
+    assert question == "¿Cuál es tu presupuesto?"
+    assert collector.information_gathered["categoria"] == "smartphone"
+    assert collector.questions_asked == 1
+    assert collector.conversation_history[-1] == {"role": "assistant", "content": question}
+
+
+@pytest.mark.parametrize("content", [
+    '{"informacion": {"presupuesto": "500"}, "completo": true, "pregunta": "¿Algo más?"}',
+    '{"informacion": {"presupuesto": "500"}, "completo": false, "pregunta": null}',
+])
+def test_accept_turn_completion_ends_questions(collector, content):
+    assert collector._accept_turn(content) is None
+    assert collector.information_gathered["presupuesto"] == "500"
+    assert collector.questions_asked == 0
+
+
+def test_accept_turn_without_json_falls_back_to_plain_question(collector):
+    assert collector._accept_turn("¿Para qué usarás el producto?") == "¿Para qué usarás el producto?"
+    assert collector._accept_turn("INFORMACIÓN_COMPLETA") is None
+    assert collector.questions_asked == 1
+
+
+def _conversation(collector, *turns):
+    for question, answer in turns:
+        collector._accept_question(question)
+        collector._record_user_response(answer)
+
+
+def test_budget_from_answer_to_budget_question(collector):
+    _conversation(
+        collector,
+        ("¿Qué producto estás buscando?", "Una laptop para 2 personas"),
+        ("¿Cuánto te gustaría gastar como máximo?", "unos 900"),
+        ("¿Qué uso le darás?", "programar"),
+    )
+
+    assert collector.information_gathered["presupuesto"] is None
+    assert collector.collected_budget() == "unos 900"
+
+
+def test_budget_without_budget_question_uses_all_answers(collector):
+    _conversation(
+        collector,
+        ("¿Qué necesitas?", "Una cafetera"),
+        ("¿Algo más que deba saber?", "que no pase de 120 dólares"),
+    )
+
+    assert "120 dólares" in collector.collected_budget()
+
+
+def test_structured_budget_takes_precedence(collector):
+    _conversation(collector, ("¿Cuál es tu presupuesto?", "unos 900"))
+    collector._merge_information({"presupuesto": "hasta 700 dólares"})
+
+    assert collector.collected_budget() == "hasta 700 dólares"
+
+
+def test_category_from_answer_to_category_question(collector):
+    _conversation(
+        collector,
+        ("¡Hola! ¿Para qué ocasión compras?", "Es un regalo"),
+        ("¿Qué tipo de producto estás buscando?", "Laptops"),
+        ("¿Cuál es tu presupuesto?", "800 dólares"),
+    )
+
+    assert collector.collected_category() == "Laptops"
+
+
+def test_category_falls_back_to_first_message(collector):
+    assert collector.collected_category() is None
+
+    _conversation(collector, ("¿En qué te puedo ayudar?", "smartphone"), ("¿Cuál es tu presupuesto?", "300"))
+    assert collector.collected_category() == "smartphone"
+
+    collector._merge_information({"categoria": "tablet"})
+    assert collector.collected_category() == "tablet"
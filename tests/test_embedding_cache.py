@@ -0,0 +1,123 @@
+"""
+Tests de la caché persistente de embeddings
+"""
+import multiprocessing
+import sqlite3
+
+import numpy as np
+
+from src.rag.embedding_cache import EmbeddingCache
+
+DIM = 8
+BATCH = 10
+
+
+def _vector(key: str):
+    seed = int(EmbeddingCache.key(key)[:8], 16)
+    return np.random.default_rng(seed).random(DIM).astype(np.float32).tolist()
+
+
+def _open(directory, max_entries=10_000):
+    return EmbeddingCache(str(directory), "modelo", True, max_entries)
+
+
+def _writer(directory, worker: int, batches: int):
+    cache = _open(directory)
+    for batch in range(batches):
+        keys = [f"w{worker}-b{batch}-{i}" for i in range(BATCH)]
+        cache.put_many({key: _vector(key) for key in keys})
+    cache.close()
+
+
+def test_roundtrip_and_reopen(tmp_path):
+    cache = _open(tmp_path)
+    items = {EmbeddingCache.key(text): _vector(text) for text in ("a", "b", "c")}
+    cache.put_many(items)
+    cache.close()
+
+    reopened = _open(tmp_path)
+    found = reopened.get_many(list(items) + ["desconocida"])
+
+    assert set(found) == set(items)
+    for key, vector in items.items():
+        np.testing.assert_allclose(found[key], vector, rtol=1e-6)
+    assert reopened.stats()["misses"] == 1
+
+
+def test_eviction_reuses_slots(tmp_path):
+    cache = _open(tmp_path, max_entries=4)
+    for i in range(10):
+        cache.put_many({f"k{i}": _vector(f"k{i}")})
+
+    assert len(cache) == 4
+    assert cache._get_meta("next_slot", int) == 4
+    assert set(cache.get_many([f"k{i}" for i in range(10)])) == {"k6", "k7", "k8", "k9"}
+
+
+
+def test_batch_larger_than_cache_keeps_last_entries(tmp_path):
+    cache = _open(tmp_path, max_entries=4)
+    cache.put_many({"viejo": _vector("viejo")})
+    cache.put_many({f"k{i}": _vector(f"k{i}") for i in range(10)})
+
+    assert len(cache) == 4
+    assert cache._get_meta("next_slot", int) == 4
+    assert set(cache.get_many(["viejo"] + [f"k{i}" for i in range(10)])) == {"k6", "k7", "k8", "k9"}
+
+def test_concurrent_processes_get_distinct_slots(tmp_path):
+    first = _open(tmp_path)
+    first.put_many({"inicial": _vector("inicial")})
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_writer, args=(tmp_path, worker, 40))
+        for worker in range(4)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    # Más filas que la reserva inicial de la matriz: los procesos la amplían
+    cache = _open(tmp_path)
+    assert cache._matrix.shape[0] > EmbeddingCache._GROWTH
+    slots = [slot for (slot,) in cache._conn.execute("SELECT slot FROM entries")]
+    assert len(slots) == len(set(slots)) == 1 + 4 * 40 * BATCH
+
+    keys = [f"w{w}-b{b}-{i}" for w in range(4) for b in range(40) for i in range(BATCH)]
+    # Tanto una instancia nueva como una abierta antes de ampliar la matriz
+    for reader in (cache, first):
+        found = reader.get_many(keys)
+        assert set(found) == set(keys)
+        for key in keys:
+            np.testing.assert_allclose(found[key], _vector(key), rtol=1e-6)
+
+
+def test_lookup_blocks_writers_until_rows_are_copied(tmp_path):
+    cache = _open(tmp_path, max_entries=2)
+    cache.put_many({"a": _vector("a"), "b": _vector("b")})
+    writer = _open(tmp_path, max_entries=2)
+    writer._conn.execute("PRAGMA busy_timeout = 0")
+
+    lookup = cache._lookup_slots
+    blocked = []
+
+    def lookup_then_write(keys):
+        slots = lookup(keys)
+        # Otro proceso intenta desalojar "a" y reutilizar su fila
+        try:
+            writer.put_many({"c": _vector("c")})
+        except sqlite3.OperationalError:
+            blocked.append(True)
+        return slots
+
+    cache._lookup_slots = lookup_then_write
+    found = cache.get_many(["a", "b"])
+
+    assert blocked
+    np.testing.assert_allclose(found["a"], _vector("a"), rtol=1e-6)
+
+    # Terminada la lectura, el escritor puede continuar
+    writer.put_many({"c": _vector("c")})
+    assert len(writer) == 2
@@ -0,0 +1,84 @@
+"""
+Tests de los filtros de producto y del análisis del presupuesto
+"""
+import pytest
+
+from src.config import config
+from src.rag.filters import build_where, extract_price, matches, parse_budget, recommendation_filters
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("800 dólares", {"precio_max": 800}),
+    ("$1,299.99", {"precio_max": 1299.99}),
+    ("1.299,99 €", {"precio_max": 1299.99}),
+    ("1000", {"precio_max": 1000}),
+    ("Tengo alrededor de 1000 dólares", {"precio_max": 1000}),
+    ("hasta 800 para el regalo", {"precio_max": 800}),
+    ("Mi presupuesto es de 1.500 euros", {"precio_max": 1500}),
+    ("entre 500 y 1.000", {"precio_min": 500, "precio_max": 1000}),
+    ("de 500 a 800 dólares", {"precio_min": 500, "precio_max": 800}),
+    ("desde 500 dólares", {"precio_min": 500}),
+    ("mínimo 300, máximo 900", {"precio_min": 300, "precio_max": 900}),
+    ("unos 5 millones", {"precio_max": 5_000_000}),
+    ("5 mil pesos", {"precio_max": 5_000}),
+    ("entre 2 y 3 millones", {"precio_min": 2_000_000, "precio_max": 3_000_000}),
+    (1200, {"precio_max": 1200}),
+])
+def test_parse_budget(text, expected):
+    assert parse_budget(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hasta 800 dólares para 2 personas", {"precio_max": 800}),
+    ("somos 2 y gastaría 700€", {"precio_max": 700}),
+    ("hasta 4 personas", {}),
+    ("entre 2 y 3 personas", {}),
+    ("2 personas", {}),
+    ("No tengo presupuesto", {}),
+    (None, {}),
+])
+def test_parse_budget_ignores_numbers_that_are_not_prices(text, expected):
+    assert parse_budget(text) == expected
+
+
+def test_build_where_combines_conditions():
+    where = build_where({"precio_max": 900, "categoria": ["Laptops", "Tablets"], "en_stock": True})
+
+    assert where == {"$and": [
+        {"precio": {"$lte": 900.0}},
+        {"categoria": {"$in": ["Laptops", "Tablets"]}},
+        {"stock": {"$gt": 0}},
+    ]}
+    assert matches({"precio": 850.0, "categoria": "Laptops", "stock": 3}, where)
+    assert not matches({"precio": 950.0, "categoria": "Laptops", "stock": 3}, where)
+    assert not matches({"precio": 850.0, "categoria": "Laptops", "stock": 0}, where)
+
+
+def test_build_where_rejects_unknown_keys():
+    with pytest.raises(ValueError):
+        build_where({"color": "rojo"})
+
+
+def test_matches_treats_incomparable_types_as_no_match():
+    assert not matches({"precio": "barato"}, {"precio": {"$lte": 100}})
+
+
+def test_recommendation_filters_follow_config(monkeypatch):
+    monkeypatch.setattr(config, "FILTER_BY_BUDGET", True)
+    monkeypatch.setattr(config, "FILTER_IN_STOCK", True)
+    assert recommendation_filters("hasta 800 dólares") == {"precio_max": 800, "en_stock": True}
+
+    monkeypatch.setattr(config, "FILTER_BY_BUDGET", False)
+    assert recommendation_filters("hasta 800 dólares") == {"en_stock": True}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$1,299.99", 1299.99),
+    ("1.299,99 €", 1299.99),
+    ("1.200", 1200.0),
+    ("1,5", 1.5),
+    ("-5", -5.0),
+    ("sin precio", None),
+])
+def test_extract_price(text, expected):
+    assert extract_price(text) == expected
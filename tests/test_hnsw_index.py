@@ -0,0 +1,84 @@
+"""
+Tests del índice aproximado HNSW (requiere el extra opcional hnsw)
+"""
+import pytest
+
+pytest.importorskip("hnswlib")
+
+from src.rag.hnsw_index import HnswVectorStore  # noqa: E402
+
+
+def test_persisted_index_finds_exact_match(tmp_path, fake_embeddings):
+    texts = [f"producto {i}" for i in range(50)]
+    store = HnswVectorStore(str(tmp_path), fake_embeddings)
+    store.add_texts(texts, ids=[f"id{i}" for i in range(50)])
+    store.persist()
+
+    reloaded = HnswVectorStore.load(str(tmp_path), fake_embeddings)
+    for text in ("producto 3", "producto 42"):
+        assert reloaded.similarity_search(text, k=1)[0].page_content == text
+
+
+def _store(tmp_path, fake_embeddings, count=50):
+    store = HnswVectorStore(str(tmp_path), fake_embeddings)
+    store.add_texts([f"producto {i}" for i in range(count)], ids=[f"id{i}" for i in range(count)])
+    store.persist()
+    return store
+
+
+def test_sync_updates_graph_without_rebuilding(tmp_path, fake_embeddings):
+    store = _store(tmp_path, fake_embeddings)
+    index = store._index
+
+    store.add_texts(["producto nuevo", "producto 7 revisado"], ids=["nuevo", "id7"])
+    store.delete(["id3"])
+
+    assert store._index is index
+    assert not store._dirty
+    assert store.similarity_search("producto nuevo", k=1)[0].page_content == "producto nuevo"
+    assert store.similarity_search("producto 7 revisado", k=1)[0].page_content == "producto 7 revisado"
+    assert "producto 3" not in [doc.page_content for doc in store.similarity_search("producto 3", k=5)]
+    assert len(store.similarity_search("producto", k=100)) == 50
+
+
+def test_incremental_changes_survive_reload(tmp_path, fake_embeddings):
+    store = _store(tmp_path, fake_embeddings)
+    store.delete(["id0", "id1"])
+    store.add_texts(["producto nuevo"], ids=["nuevo"])
+    store.persist()
+
+    reloaded = HnswVectorStore.load(str(tmp_path), fake_embeddings)
+
+    assert not reloaded._dirty
+    for text in ("producto nuevo", "producto 42"):
+        assert reloaded.similarity_search(text, k=1)[0].page_content == text
+    assert "producto 0" not in [doc.page_content for doc in reloaded.similarity_search("producto 0", k=5)]
+
+    reloaded.add_texts(["otro producto"], ids=["otro"])
+    assert reloaded.similarity_search("otro producto", k=1)[0].page_content == "otro producto"
+
+
+def test_rebuilds_graph_when_too_many_nodes_are_deleted(tmp_path, fake_embeddings):
+    store = _store(tmp_path, fake_embeddings, count=20)
+    index = store._index
+
+    store.delete([f"id{i}" for i in range(6)])
+
+    assert store._dirty
+    assert store.similarity_search("producto 10", k=1)[0].page_content == "producto 10"
+    assert store._index is not index
+    assert store._index.get_current_count() == 14
+
+
+def test_filtered_search_maps_labels_to_rows(tmp_path, fake_embeddings, monkeypatch):
+    monkeypatch.setattr(HnswVectorStore, "EXACT_FILTER_THRESHOLD", 0)
+    store = HnswVectorStore(str(tmp_path), fake_embeddings)
+    texts = [f"producto {i}" for i in range(30)]
+    store.add_texts(texts, metadatas=[{"par": i % 2 == 0} for i in range(30)], ids=[f"id{i}" for i in range(30)])
+    store.persist()
+    store.delete(["id0", "id2"])
+
+    results = store.similarity_search("producto 4", k=5, filter={"par": True})
+
+    assert results[0].page_content == "producto 4"
+    assert all(doc.metadata["par"] for doc in results)
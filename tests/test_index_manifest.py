@@ -0,0 +1,44 @@
+"""
+Tests del manifiesto de archivos indexados
+"""
+import os
+
+from src.rag.index_manifest import IndexManifest
+
+
+def test_diff_detects_added_changed_removed(tmp_path):
+    kept, edited, deleted = (tmp_path / name for name in ("a.txt", "b.txt", "c.txt"))
+    for path in (kept, edited, deleted):
+        path.write_text(path.name, encoding="utf-8")
+
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    for path in (kept, edited, deleted):
+        manifest.record(str(path), [f"{path.name}-0"])
+    manifest.save()
+
+    edited.write_text("contenido nuevo", encoding="utf-8")
+    deleted.unlink()
+    new = tmp_path / "d.txt"
+    new.write_text("d", encoding="utf-8")
+
+    manifest = IndexManifest.load(str(tmp_path / "manifest.json"))
+    added, changed, removed, hashes = manifest.diff([str(kept), str(edited), str(new)])
+
+    assert added == [str(new)]
+    assert changed == [str(edited)]
+    assert removed == [str(deleted)]
+    assert set(hashes) == {str(new), str(edited)}
+    assert manifest.forget(str(deleted)) == ["c.txt-0"]
+
+
+def test_touched_file_with_same_content_is_unchanged(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("igual", encoding="utf-8")
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    manifest.record(str(path), ["a-0"])
+
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert manifest.diff([str(path)]) == ([], [], [], {})
+    assert manifest.files[str(path)]["mtime"] == os.stat(path).st_mtime
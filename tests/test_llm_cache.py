@@ -0,0 +1,91 @@
+"""
+Tests de la caché persistente de respuestas del LLM
+"""
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.agents import llm_cache
+from src.agents.llm_cache import LLMResponseCache
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _messages(question: str = "¿Qué laptop me recomiendas?"):
+    return [SystemMessage(content="Eres un asistente de compras"), HumanMessage(content=question)]
+
+
+def test_key_depends_on_model_temperature_and_messages():
+    key = LLMResponseCache.key("gemini", 0.7, _messages())
+
+    assert key == LLMResponseCache.key("gemini", 0.7, _messages())
+    assert key != LLMResponseCache.key("otro-modelo", 0.7, _messages())
+    assert key != LLMResponseCache.key("gemini", 0.0, _messages())
+    assert key != LLMResponseCache.key("gemini", 0.7, _messages("¿Y una tablet?"))
+    # El mismo texto con otro rol es otra llamada
+    swapped = [HumanMessage(content="Eres un asistente de compras"), _messages()[1]]
+    assert key != LLMResponseCache.key("gemini", 0.7, swapped)
+
+
+def test_roundtrip_and_stats(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    key = LLMResponseCache.key("gemini", 0.7, _messages())
+
+    assert cache.get(key) is None
+    cache.put(key, "gemini", "La laptop X", 850.0)
+    cache.close()
+
+    reopened = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    assert reopened.get(key) == ("La laptop X", 850.0)
+    assert reopened.stats() == {"hits": 1, "misses": 0, "hit_ratio": 1.0, "saved_ms": 850.0, "entries": 1}
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), ttl=60)
+    cache.put("antigua", "gemini", "respuesta", 100.0)
+
+    clock.now += 59
+    assert cache.get("antigua") == ("respuesta", 100.0)
+
+    clock.now += 2
+    assert cache.get("antigua") is None
+    assert len(cache) == 0
+
+
+def test_expired_entries_are_purged_on_put(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), ttl=60)
+    cache.put("antigua", "gemini", "respuesta", 100.0)
+
+    clock.now += 120
+    cache.put("nueva", "gemini", "respuesta", 100.0)
+
+    assert len(cache) == 1
+    assert cache.get("nueva") is not None
+
+
+def test_evicts_least_recently_used_over_max_entries(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), max_entries=2)
+
+    for key in ("a", "b"):
+        clock.now += 1
+        cache.put(key, "gemini", key, 10.0)
+    clock.now += 1
+    assert cache.get("a") is not None  # "b" pasa a ser la menos usada
+
+    clock.now += 1
+    cache.put("c", "gemini", "c", 10.0)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
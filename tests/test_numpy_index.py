@@ -0,0 +1,72 @@
+"""
+Tests del índice vectorial exacto con NumPy
+"""
+import os
+
+import numpy as np
+
+from src.rag import numpy_index
+from src.rag.numpy_index import NumpyVectorStore
+
+
+def _build(directory, embeddings, texts):
+    return NumpyVectorStore.from_texts(
+        texts,
+        embeddings,
+        metadatas=[{"n": i} for i in range(len(texts))],
+        ids=[f"id{i}" for i in range(len(texts))],
+        directory=str(directory),
+    )
+
+
+def test_search_matches_brute_force(tmp_path, fake_embeddings):
+    texts = [f"producto {i}" for i in range(20)]
+    store = _build(tmp_path, fake_embeddings, texts)
+
+    query = fake_embeddings.embed_query("producto 7")
+    vectors = np.asarray(fake_embeddings.embed_documents(texts), dtype=np.float32)
+    expected = np.argsort(((vectors - np.asarray(query, dtype=np.float32)) ** 2).sum(axis=1), kind="stable")[:5]
+
+    results = store.similarity_search_by_vector_with_relevance_scores(query, k=5)
+    assert [doc.page_content for doc, _ in results] == [texts[i] for i in expected]
+
+    filtered = store.similarity_search_by_vector(query, k=5, filter={"n": {"$gte": 15}})
+    assert {doc.metadata["n"] for doc in filtered} == {15, 16, 17, 18, 19}
+
+
+
+def test_default_ids_stay_unique_after_delete(tmp_path, fake_embeddings):
+    store = NumpyVectorStore(str(tmp_path), fake_embeddings)
+    first = store.add_texts(["producto 0", "producto 1"])
+    store.delete([first[0]])
+    second = store.add_texts(["producto 2"])
+
+    assert len(set(first + second)) == 3
+    assert len(store) == 2
+    assert {doc.page_content for doc in store.similarity_search("producto", k=5)} == {"producto 1", "producto 2"}
+
+def test_persist_releases_mapping_before_replacing(tmp_path, fake_embeddings, monkeypatch):
+    store = _build(tmp_path, fake_embeddings, ["a", "b", "c"])
+    vectors_path = os.path.join(str(tmp_path), NumpyVectorStore.VECTORS_FILE)
+    assert isinstance(store._vectors, np.memmap)
+
+    replaced = []
+    real_replace = os.replace
+
+    def checked_replace(src, dst):
+        # En Windows reemplazar un archivo mapeado falla
+        if dst == vectors_path:
+            assert not isinstance(store._vectors, np.memmap)
+        replaced.append(dst)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(numpy_index.os, "replace", checked_replace)
+    store.add_texts(["d"], metadatas=[{"n": 3}], ids=["id3"])
+    store.delete(["id0"])
+    store.persist()
+    store.persist()
+
+    assert replaced.count(vectors_path) == 2
+    reloaded = NumpyVectorStore.load(str(tmp_path), fake_embeddings)
+    assert reloaded.get()["ids"] == ["id1", "id2", "id3"]
+    np.testing.assert_array_equal(np.asarray(reloaded._vectors), np.asarray(store._vectors))
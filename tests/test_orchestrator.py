@@ -0,0 +1,53 @@
+"""
+Tests del grafo de etapas de los orquestadores
+"""
+import pytest
+
+from src.config import config
+from src.orchestrator import MultiAgentOrchestrator
+from src.orchestrator_dynamic import DynamicMultiAgentOrchestrator
+
+
+@pytest.fixture
+def offline_llm(monkeypatch):
+    monkeypatch.setattr(config, "GOOGLE_API_KEY", "test")
+    monkeypatch.setattr(config, "FOLLOWUP_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "RERANK_ENABLED", False)
+
+
+@pytest.mark.parametrize("orchestrator_class", [MultiAgentOrchestrator, DynamicMultiAgentOrchestrator])
+def test_default_workflow_searches_with_llm_query(offline_llm, orchestrator_class):
+    graph = orchestrator_class(vector_store=None).workflow_graph
+
+    assert graph.dependencies("search_inputs") == []
+    assert graph.dependencies("search_query") == ["analysis", "criteria"]
+    assert graph.dependencies("retrieval") == ["search_inputs", "search_query"]
+    assert graph.dependencies("recommendations") == ["analysis", "criteria", "retrieval"]
+
+
+@pytest.mark.parametrize("orchestrator_class", [MultiAgentOrchestrator, DynamicMultiAgentOrchestrator])
+def test_early_retrieval_overlaps_retrieval_with_criteria(offline_llm, monkeypatch, orchestrator_class):
+    monkeypatch.setattr(config, "WORKFLOW_EARLY_RETRIEVAL", True)
+    graph = orchestrator_class(vector_store=None).workflow_graph
+
+    assert graph.dependencies("search_query") == ["analysis"]
+    assert "criteria" not in graph.dependencies("retrieval")
+    assert graph.dependencies("recommendations") == ["analysis", "criteria", "retrieval"]
+
+
+def test_dynamic_search_inputs_without_structured_turns(offline_llm, monkeypatch):
+    monkeypatch.setattr(config, "COLLECTOR_STRUCTURED_TURNS", False)
+    monkeypatch.setattr(config, "FILTER_BY_BUDGET", True)
+    monkeypatch.setattr(config, "FILTER_IN_STOCK", False)
+    orchestrator = DynamicMultiAgentOrchestrator(vector_store=None)
+    collector = orchestrator.collector
+    collector._accept_question("¿Qué producto estás buscando?")
+    collector._record_user_response("Un portátil")
+    collector._accept_question("¿Cuál es tu presupuesto aproximado?")
+    collector._record_user_response("hasta 800 dólares")
+
+    filters, category = orchestrator._search_inputs()
+
+    assert filters == {"precio_max": 800.0}
+    assert category == "Un portátil"
+    assert orchestrator.workflow_data["filters"] == filters
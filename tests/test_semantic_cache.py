@@ -0,0 +1,87 @@
+"""
+Tests de la caché semántica de preguntas de seguimiento
+"""
+import numpy as np
+
+from src.agents.semantic_cache import SemanticAnswerCache
+
+BARATO = [1.0, 0.0, 0.0]
+
+
+class _Embed:
+    """Embeddings fijos por pregunta; las no listadas son ortogonales entre sí"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def __call__(self, texts):
+        return [self.vectors.get(text, np.eye(3)[2].tolist()) for text in texts]
+
+
+def _cache(vectors):
+    return SemanticAnswerCache(_Embed(vectors), threshold=0.92)
+
+
+def _store(cache, question, context, answer):
+    cached, vector = cache.lookup(question, context)
+    assert cached is None
+    cache.store(question, context, answer, vector, latency_ms=900.0)
+
+
+def test_reuses_answer_for_paraphrase():
+    cache = _cache({"¿Cuál es más barato?": BARATO, "¿Cuál cuesta menos?": [0.95, 0.31, 0.0]})
+    context = SemanticAnswerCache.fingerprint("análisis", "recomendaciones")
+    _store(cache, "¿Cuál es más barato?", context, "La tablet")
+
+    answer, _ = cache.lookup("¿Cuál cuesta menos?", context)
+
+    assert answer == "La tablet"
+    assert cache.stats()["saved_ms"] == 900.0
+
+
+def test_does_not_reuse_answer_for_antonym():
+    # Los embeddings de frases suelen puntuar los antónimos por encima del umbral
+    cache = _cache({"¿Cuál es más barato?": BARATO, "¿Cuál es más caro?": BARATO})
+    context = SemanticAnswerCache.fingerprint("análisis", "recomendaciones")
+    _store(cache, "¿Cuál es más barato?", context, "La tablet")
+
+    answer, _ = cache.lookup("¿Cuál es más caro?", context)
+
+    assert answer is None
+
+
+def test_does_not_reuse_answer_below_threshold():
+    cache = _cache({"¿Cuál es más barato?": BARATO, "¿Tiene garantía?": [0.5, 0.87, 0.0]})
+    context = SemanticAnswerCache.fingerprint("análisis", "recomendaciones")
+    _store(cache, "¿Cuál es más barato?", context, "La tablet")
+
+    assert cache.lookup("¿Tiene garantía?", context)[0] is None
+
+
+def test_new_context_invalidates_answers():
+    cache = _cache({"¿Cuál es más barato?": BARATO})
+    before = SemanticAnswerCache.fingerprint("análisis", "recomendaciones")
+    _store(cache, "¿Cuál es más barato?", before, "La tablet")
+
+    after = SemanticAnswerCache.fingerprint("análisis", "otras recomendaciones")
+
+    assert after != before
+    assert cache.lookup("¿Cuál es más barato?", after)[0] is None
+    assert cache.lookup("¿Cuál es más barato?", before)[0] == "La tablet"
+
+
+def test_fingerprint_separates_parts():
+    assert SemanticAnswerCache.fingerprint("ab", "c") != SemanticAnswerCache.fingerprint("a", "bc")
+    assert SemanticAnswerCache.fingerprint("a", "b") == SemanticAnswerCache.fingerprint("a", "b")
+
+
+def test_evicts_least_recently_used():
+    vectors = {f"p{i}": np.eye(3)[i].tolist() for i in range(3)}
+    cache = SemanticAnswerCache(_Embed(vectors), threshold=0.92, max_entries=2)
+    for question in ("p0", "p1"):
+        _store(cache, question, "ctx", question)
+    cache.lookup("p0", "ctx")
+    _store(cache, "p2", "ctx", "p2")
+
+    assert cache.lookup("p1", "ctx")[0] is None
+    assert cache.lookup("p0", "ctx")[0] == "p0"
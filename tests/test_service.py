@@ -0,0 +1,122 @@
+"""
+Tests del servicio de búsqueda compartido (servidor en un puerto libre)
+"""
+import socket
+import threading
+import time
+
+import pytest
+
+from src.rag.document_loader import DocumentLoader
+from src.rag.service import RetrievalClient, RetrievalServer
+from src.rag.vector_store import VectorStore
+
+
+@pytest.fixture
+def service(products_dir, numpy_index, fake_embeddings):
+    store = VectorStore(embeddings=fake_embeddings)
+    store.create_vectorstore(DocumentLoader().load_documents(products_dir, workers=1))
+    server = RetrievalServer(store, port=0)
+    server.start()
+    yield store, server
+    server.shutdown()
+
+
+def _hits(results):
+    return [(doc.page_content, doc.metadata, round(score, 5)) for doc, score in results]
+
+
+def test_client_search_matches_local_search(service):
+    store, server = service
+    client = RetrievalClient(server.url, timeout=5).load_vectorstore()
+
+    for mode in ("vector", "bm25", "hybrid"):
+        local = store.search_with_scores("cafetera", k=3, mode=mode)
+        remote = client.search_with_scores("cafetera", k=3, mode=mode)
+        assert _hits(remote) == _hits(local), mode
+
+    queries = ["cafetera", "zapatillas para correr"]
+    assert [_hits(results) for results in client.search_many_with_scores(queries, k=2, filters={"precio_max": 300})] == \
+        [_hits(results) for results in store.search_many_with_scores(queries, k=2, filters={"precio_max": 300})]
+    assert [doc.page_content for doc in client.search("cafetera", k=2)] == \
+        [doc.page_content for doc in store.search("cafetera", k=2)]
+    assert client.server_stats()["server"]["queries"] >= 5
+
+
+class _FailingConnection:
+    closed = False
+
+    def __init__(self, error):
+        self.error = error
+
+    def request(self, *args, **kwargs):
+        raise self.error
+
+    def close(self):
+        self.closed = True
+
+
+def test_client_reconnects_after_connection_reset(service):
+    _, server = service
+    client = RetrievalClient(server.url, timeout=5)
+    stale = _FailingConnection(ConnectionResetError("reset"))
+    client._local.connection = stale
+
+    assert client.search("cafetera", k=1)
+    assert stale.closed
+    assert client._local.connection is not stale
+
+
+def test_client_does_not_retry_timeouts(service):
+    _, server = service
+    client = RetrievalClient(server.url, timeout=5)
+    stalled = _FailingConnection(socket.timeout("timed out"))
+    client._local.connection = stalled
+
+    with pytest.raises(socket.timeout):
+        client.search("cafetera", k=1)
+    assert stalled.closed
+    assert getattr(client._local, "connection", None) is None
+    assert client.search("cafetera", k=1)
+
+
+def test_server_overlaps_concurrent_searches():
+    class SlowStore:
+        last_search_stats = {}
+
+        def __init__(self):
+            self.active = 0
+            self.max_active = 0
+            self.lock = threading.Lock()
+
+        def search_many_with_scores(self, queries, **kwargs):
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            time.sleep(0.2)
+            with self.lock:
+                self.active -= 1
+            return [[] for _ in queries]
+
+    store = SlowStore()
+    server = RetrievalServer(store, port=0)
+    server.start()
+    try:
+        clients = [threading.Thread(target=RetrievalClient(server.url, timeout=5).search, args=("cafetera",))
+                   for _ in range(2)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+    finally:
+        server.shutdown()
+
+    assert store.max_active == 2
+
+
+def test_client_reports_server_errors(service):
+    _, server = service
+    client = RetrievalClient(server.url, timeout=5)
+
+    with pytest.raises(ValueError, match="400"):
+        client.search("cafetera", mode="desconocido")
@@ -0,0 +1,106 @@
+"""
+Tests del índice particionado por categoría
+"""
+import pytest
+
+from src.rag.numpy_index import NumpyVectorStore
+from src.rag.sharded_index import DEFAULT_SHARD, ShardedVectorStore, shard_slug
+
+PRODUCTS = [
+    ("Laptop Dell XPS 13", "Laptops"),
+    ("Laptop Lenovo ThinkPad", "Laptops"),
+    ("Aspiradora robot Roomba", "Electrodomésticos"),
+    ("Cafetera Nespresso", "Electrodomésticos"),
+    ("Zapatillas para correr", "Deportes"),
+    ("Guía de compra en texto libre", None),
+]
+
+
+@pytest.fixture
+def sharded(tmp_path, fake_embeddings):
+    texts = [text for text, _ in PRODUCTS]
+    metadatas = [{"categoria": category} if category else {} for _, category in PRODUCTS]
+    return ShardedVectorStore.from_texts(
+        texts, fake_embeddings, metadatas=metadatas, directory=str(tmp_path)
+    )
+
+
+def test_shard_slug():
+    assert shard_slug("Electrodomésticos") == "electrodomesticos"
+    assert shard_slug("Audio y Vídeo") == "audio_y_video"
+    assert shard_slug(None) == DEFAULT_SHARD
+
+
+def test_from_texts_routes_texts_by_category(sharded, tmp_path, fake_embeddings):
+    assert set(sharded.shards) == {"laptops", "electrodomesticos", "deportes", DEFAULT_SHARD}
+    assert sharded.categories["electrodomesticos"] == "Electrodomésticos"
+    assert len(sharded) == len(PRODUCTS)
+    assert all(isinstance(shard, NumpyVectorStore) for shard in sharded.shards.values())
+
+    reloaded = ShardedVectorStore.load(
+        str(tmp_path), fake_embeddings,
+        open_shard=lambda slug: NumpyVectorStore.load(str(tmp_path / "shards" / slug), fake_embeddings)
+    )
+    assert reloaded.shard_stats()["laptops"]["size"] == 2
+    assert reloaded.similarity_search("Cafetera Nespresso", k=1)[0].page_content == "Cafetera Nespresso"
+
+
+@pytest.mark.parametrize("category, expected", [
+    ("Laptops", ["laptops", DEFAULT_SHARD]),
+    ("laptop", ["laptops", DEFAULT_SHARD]),
+    ("electrodoméstico", ["electrodomesticos", DEFAULT_SHARD]),
+    ("deporte", ["deportes", DEFAULT_SHARD]),
+    ("laptops y deportes", ["laptops", "deportes", DEFAULT_SHARD]),
+])
+def test_route_matches_whole_words(sharded, category, expected):
+    assert sharded.route(category) == expected
+
+
+@pytest.mark.parametrize("category", [
+    None,
+    "",
+    "para la casa y el deporte",  # "casa" no es ninguna categoría
+    "lapto",
+    "depor",
+    "algo para regalar",
+])
+def test_route_falls_back_to_all_shards(sharded, category):
+    assert sharded.route(category) is None
+
+
+def test_routed_search_only_queries_selected_shards(sharded, fake_embeddings):
+    embedding = fake_embeddings.embed_query("Laptop Dell XPS 13")
+
+    results = sharded.similarity_search_by_vectors_with_relevance_scores(
+        [embedding], k=10, shards=sharded.route("laptop")
+    )[0]
+
+    assert {doc.metadata.get("categoria") for doc, _ in results} <= {"Laptops", None}
+    assert results[0][0].page_content == "Laptop Dell XPS 13"
+    assert set(sharded.last_shard_stats) == {"laptops", DEFAULT_SHARD}
+
+
+def test_scatter_gather_merges_by_distance(sharded, fake_embeddings):
+    embedding = fake_embeddings.embed_query("Zapatillas para correr")
+
+    results = sharded.similarity_search_by_vectors_with_relevance_scores([embedding], k=len(PRODUCTS))[0]
+
+    distances = [distance for _, distance in results]
+    assert distances == sorted(distances)
+    assert len(results) == len(PRODUCTS)
+    assert results[0][0].page_content == "Zapatillas para correr"
+
+
+def test_shard_stats_accumulate_per_shard(sharded, fake_embeddings):
+    embedding = fake_embeddings.embed_query("laptop")
+    sharded.similarity_search_by_vectors_with_relevance_scores([embedding], k=2)
+    sharded.similarity_search_by_vectors_with_relevance_scores([embedding], k=2, shards=["laptops"])
+
+    stats = sharded.shard_stats()
+
+    assert stats["laptops"]["searches"] == 2
+    assert stats["deportes"]["searches"] == 1
+    assert stats["laptops"]["size"] == 2
+    assert stats[DEFAULT_SHARD]["category"] == DEFAULT_SHARD
+    assert stats["laptops"]["last_ms"] >= 0.0
+    assert stats["laptops"]["avg_ms"] >= 0.0
@@ -0,0 +1,124 @@
+"""
+Tests del formato binario de snapshot (cabecera, checksum y alineación)
+"""
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+from src.rag.bm25 import BM25Index
+from src.rag.snapshot import (
+    ALIGNMENT, FORMAT_VERSION, HEADER_SIZE, MAGIC, SECTIONS, Snapshot, _HEADER, _SECTION, write_snapshot,
+)
+
+
+def _write(path, count=5, dim=8, bm25=None):
+    ids = [f"id{i}" for i in range(count)]
+    texts = [f"Producto {i}: cafetera eléctrica" for i in range(count)]
+    metadatas = [{"source": "catalogo.json", "row": i} for i in range(count)]
+    vectors = np.random.default_rng(0).standard_normal((count, dim)).astype(np.float32)
+    write_snapshot(str(path), ids, texts, metadatas, vectors, info={"embedding_model": "test"}, bm25=bm25)
+    return ids, texts, metadatas, vectors
+
+
+def _sections(raw):
+    return [
+        _SECTION.unpack_from(raw, _HEADER.size + i * _SECTION.size)
+        for i in range(len(SECTIONS))
+    ]
+
+
+def test_roundtrip_preserves_contents(tmp_path):
+    path = tmp_path / "index.snapshot"
+    ids, texts, metadatas, vectors = _write(path)
+
+    snapshot = Snapshot(str(path))
+
+    assert snapshot.ids == ids
+    assert list(snapshot.texts) == texts
+    assert snapshot.texts[-1] == texts[-1]
+    assert snapshot.metadatas == metadatas
+    assert snapshot.info == {"embedding_model": "test"}
+    np.testing.assert_array_equal(snapshot.vectors, vectors)
+    np.testing.assert_allclose(snapshot.norms, (vectors ** 2).sum(axis=1), rtol=1e-6)
+    assert snapshot.bm25 is None
+
+
+def test_header_and_section_alignment(tmp_path):
+    path = tmp_path / "index.snapshot"
+    _write(path, count=3, dim=5)
+    raw = path.read_bytes()
+
+    magic, version, section_count, checksum, dim, count = _HEADER.unpack_from(raw, 0)
+    assert (magic, version, section_count, dim, count) == (MAGIC, FORMAT_VERSION, len(SECTIONS), 5, 3)
+    assert checksum == zlib.crc32(raw[HEADER_SIZE:])
+
+    sections = _sections(raw)
+    assert all(offset % ALIGNMENT == 0 for offset, _ in sections)
+    assert sections[0] == (HEADER_SIZE, 3 * 5 * 4)
+    offsets = [offset for offset, _ in sections]
+    assert offsets == sorted(offsets)
+    last_offset, last_size = sections[-1]
+    assert last_offset + last_size == len(raw)
+
+
+def test_corrupted_body_fails_checksum(tmp_path):
+    path = tmp_path / "index.snapshot"
+    _write(path)
+    raw = bytearray(path.read_bytes())
+    raw[HEADER_SIZE + 1] ^= 0xFF
+    path.write_bytes(bytes(raw))
+
+    with pytest.raises(ValueError, match="Checksum"):
+        Snapshot(str(path))
+    assert Snapshot(str(path), verify=False).count == 5
+
+
+def test_rejects_other_files_and_versions(tmp_path):
+    path = tmp_path / "index.snapshot"
+    _write(path)
+    raw = bytearray(path.read_bytes())
+
+    other = tmp_path / "other.bin"
+    other.write_bytes(b"NOTASNAP" + bytes(raw[8:]))
+    with pytest.raises(ValueError, match="no es un snapshot"):
+        Snapshot(str(other))
+
+    _HEADER.pack_into(raw, 0, *((MAGIC, FORMAT_VERSION + 1) + _HEADER.unpack_from(raw, 0)[2:]))
+    path.write_bytes(bytes(raw))
+    with pytest.raises(ValueError, match="Versión"):
+        Snapshot(str(path))
+
+
+def test_empty_index(tmp_path):
+    path = tmp_path / "index.snapshot"
+    write_snapshot(str(path), [], [], [], np.empty((0, 0), dtype=np.float32))
+
+    snapshot = Snapshot(str(path))
+
+    assert snapshot.count == 0 and snapshot.ids == [] and len(snapshot.texts) == 0
+    assert snapshot.vectors.shape == (0, 0)
+
+    write_snapshot(str(path), [], [], [], np.empty((0, 8), dtype=np.float32))
+    assert Snapshot(str(path)).vectors.shape == (0, 8)
+
+
+def test_bm25_section_stores_only_term_statistics(tmp_path):
+    path = tmp_path / "index.snapshot"
+    bm25 = BM25Index(str(tmp_path / "bm25.json"))
+    ids = [f"id{i}" for i in range(5)]
+    texts = [f"Producto {i}: cafetera eléctrica" for i in range(5)]
+    bm25.add(ids, texts, [{"source": "catalogo.json", "row": i} for i in range(5)])
+    _write(path, bm25=bm25.to_dict())
+
+    snapshot = Snapshot(str(path))
+    offset, size = _sections(path.read_bytes())[SECTIONS.index("bm25")]
+    raw_section = path.read_bytes()[offset:offset + size].decode("utf-8")
+
+    assert set(json.loads(raw_section)) == {"version", "term_freqs"}
+    assert not any(text in raw_section for text in texts)
+    assert snapshot.bm25 == bm25.to_dict()
+
+    restored = BM25Index.from_dict(str(tmp_path / "restored.json"), snapshot.bm25)
+    assert [doc.page_content for doc, _ in restored.search("producto 3", k=1)] == texts[3:4]
@@ -0,0 +1,142 @@
+"""
+Tests del grafo de etapas y su planificador
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.stage_graph import Stage, StageGraph
+
+
+def _diamond(log, wait=None):
+    """a → (b, c) → d, con b y c independientes"""
+    def step(name, value):
+        def run(**inputs):
+            log.append(name)
+            if wait and name in ("b", "c"):
+                wait()
+            return value + sum(inputs.values())
+        return run
+
+    return StageGraph([
+        Stage("d", step("d", 1000), inputs=["b_out", "c_out"], outputs=["d_out"]),
+        Stage("b", step("b", 10), inputs=["a_out"], outputs=["b_out"]),
+        Stage("c", step("c", 100), inputs=["a_out"], outputs=["c_out"]),
+        Stage("a", step("a", 1), inputs=["seed"], outputs=["a_out"]),
+    ])
+
+
+def test_runs_stages_after_their_dependencies():
+    log = []
+    graph = _diamond(log)
+
+    values = graph.run({"seed": 0})
+
+    assert values["d_out"] == 1000 + (10 + 1) + (100 + 1)
+    assert log[0] == "a" and log[-1] == "d"
+    assert graph.dependencies("d") == ["b", "c"]
+    assert graph.order.index("a") < graph.order.index("b") < graph.order.index("d")
+
+
+def test_runs_independent_stages_concurrently():
+    # Si b y c no se ejecutasen a la vez, la barrera caducaría
+    barrier = threading.Barrier(2, timeout=5)
+    graph = _diamond([], wait=barrier.wait)
+
+    graph.run({"seed": 0})
+
+    timings = graph.last_timings
+    assert timings["b"]["start_ms"] < timings["c"]["end_ms"]
+    assert timings["c"]["start_ms"] < timings["b"]["end_ms"]
+
+
+def test_arun_runs_independent_stages_concurrently():
+    async def slow(a_out):
+        await asyncio.sleep(0.2)
+        return a_out
+
+    graph = StageGraph([
+        Stage("a", lambda: 1, outputs=["a_out"]),
+        Stage("b", None, inputs=["a_out"], outputs=["b_out"], afunc=slow),
+        Stage("c", None, inputs=["a_out"], outputs=["c_out"], afunc=slow),
+        Stage("d", lambda b_out, c_out: b_out + c_out, inputs=["b_out", "c_out"], outputs=["d_out"]),
+    ])
+    start = time.perf_counter()
+
+    values = asyncio.run(graph.arun())
+
+    assert values["d_out"] == 2
+    assert time.perf_counter() - start < 0.35
+
+
+def test_stage_with_several_outputs():
+    graph = StageGraph([Stage("par", lambda: (1, 2), outputs=["x", "y"])])
+
+    assert graph.run() == {"x": 1, "y": 2}
+
+    wrong = StageGraph([Stage("par", lambda: 1, outputs=["x", "y"])])
+    with pytest.raises(ValueError):
+        wrong.run()
+
+
+def test_stage_errors_propagate():
+    def fail(a_out):
+        raise RuntimeError("falla la etapa")
+
+    graph = StageGraph([
+        Stage("a", lambda: 1, outputs=["a_out"]),
+        Stage("b", fail, inputs=["a_out"], outputs=["b_out"]),
+        Stage("c", lambda b_out: b_out, inputs=["b_out"], outputs=["c_out"]),
+    ])
+
+    with pytest.raises(RuntimeError, match="falla la etapa"):
+        graph.run()
+    with pytest.raises(RuntimeError, match="falla la etapa"):
+        asyncio.run(graph.arun())
+
+
+def test_rejects_invalid_graphs():
+    with pytest.raises(ValueError, match="Ciclo"):
+        StageGraph([
+            Stage("a", lambda y: y, inputs=["y"], outputs=["x"]),
+            Stage("b", lambda x: x, inputs=["x"], outputs=["y"]),
+        ])
+    with pytest.raises(ValueError):
+        StageGraph([Stage("a", lambda: 1, outputs=["x"]), Stage("b", lambda: 2, outputs=["x"])])
+    with pytest.raises(ValueError, match="seed"):
+        _diamond([]).run()
+
+
+def test_critical_path_follows_longest_chain():
+    graph = _diamond([])
+    timings = {
+        name: {"start_ms": 0.0, "end_ms": 0.0, "duration_ms": duration}
+        for name, duration in {"a": 5.0, "b": 10.0, "c": 40.0, "d": 1.0}.items()
+    }
+
+    assert graph.critical_path(timings) == (["a", "c", "d"], 46.0)
+
+
+def test_last_critical_path_is_recorded():
+    def sleeper(name, seconds):
+        def run(**_):
+            time.sleep(seconds)
+            return name
+        return run
+
+    graph = StageGraph([
+        Stage("a", sleeper("a", 0.01), outputs=["a_out"]),
+        Stage("lenta", sleeper("lenta", 0.15), inputs=["a_out"], outputs=["lenta_out"]),
+        Stage("rapida", sleeper("rapida", 0.01), inputs=["a_out"], outputs=["rapida_out"]),
+        Stage("fin", sleeper("fin", 0.01), inputs=["lenta_out", "rapida_out"], outputs=["fin_out"]),
+    ])
+
+    graph.run()
+
+    path, total_ms = graph.last_critical_path
+    assert path == ["a", "lenta", "fin"]
+    assert total_ms >= 170
+    assert set(graph.last_timings) == {"a", "lenta", "rapida", "fin"}
+    assert "ruta crítica a → lenta → fin" in graph.report()
@@ -0,0 +1,104 @@
+"""
+Tests de indexación del VectorStore (backend NumPy, embeddings falsos)
+"""
+import shutil
+
+from src.rag.document_loader import DocumentLoader
+from src.rag.vector_store import VectorStore
+
+
+def _catalog(tmp_path, products_dir):
+    catalog = tmp_path / "catalog"
+    catalog.mkdir()
+    for name in ("productos_tecnologia.json", "productos_hogar.csv"):
+        shutil.copy(f"{products_dir}/{name}", catalog / name)
+    return catalog
+
+
+def _sources(store):
+    ids, _, metadatas, _ = store._index_contents(store.vectorstore)
+    return {metadata["source"] for metadata in metadatas}, ids
+
+
+def test_full_rebuild_drops_removed_files(tmp_path, products_dir, numpy_index, fake_embeddings):
+    catalog = _catalog(tmp_path, products_dir)
+    store = VectorStore(embeddings=fake_embeddings)
+    store.create_vectorstore(DocumentLoader().load_documents(str(catalog), workers=1))
+    assert len(_sources(store)[0]) == 2
+
+    (catalog / "productos_hogar.csv").unlink()
+    store = VectorStore(embeddings=fake_embeddings)
+    store.create_vectorstore(DocumentLoader().load_documents(str(catalog), workers=1))
+
+    sources, ids = _sources(store)
+    assert sources == {str(catalog / "productos_tecnologia.json")}
+    assert sorted(store.bm25._documents) == sorted(ids)
+
+    reloaded = VectorStore(embeddings=fake_embeddings)
+    reloaded.load_vectorstore()
+    assert _sources(reloaded)[0] == sources
+    assert len(reloaded.bm25) == len(ids)
+
+
+def test_sync_removes_deleted_file_chunks(tmp_path, products_dir, numpy_index, fake_embeddings):
+    catalog = _catalog(tmp_path, products_dir)
+    store = VectorStore(embeddings=fake_embeddings)
+    first = store.sync_vectorstore(str(catalog))
+    assert first["added"] == 2
+
+    (catalog / "productos_hogar.csv").unlink()
+    summary = VectorStore(embeddings=fake_embeddings).sync_vectorstore(str(catalog))
+
+    assert summary["removed"] == 1 and summary["chunks_added"] == 0
+    reloaded = VectorStore(embeddings=fake_embeddings)
+    reloaded.load_vectorstore()
+    assert _sources(reloaded)[0] == {str(catalog / "productos_tecnologia.json")}
+
+
+def test_price_filter_keeps_unpriced_documents(products_dir, numpy_index, fake_embeddings):
+    store = VectorStore(embeddings=fake_embeddings)
+    store.create_vectorstore(DocumentLoader().load_documents(products_dir, workers=1))
+    total = len(store._index_contents(store.vectorstore)[0])
+
+    for mode in ("vector", "bm25", "hybrid"):
+        results = store.search_with_scores(
+            "cafetera o zapatillas para correr", k=total, mode=mode, filters={"precio_max": 300}
+        )
+        metadatas = [doc.metadata for doc, _ in results]
+
+        assert all(metadata["precio"] <= 300 for metadata in metadatas if "precio" in metadata), mode
+        assert any(metadata["source"].endswith("productos_deportes.txt") for metadata in metadatas), mode
+        assert any("precio" in metadata for metadata in metadatas), mode
+        if mode == "vector":
+            distances = [score for _, score in results]
+            assert distances == sorted(distances)
+
+
+def test_snapshot_roundtrip_restores_hybrid_search(tmp_path, products_dir, numpy_index, fake_embeddings, monkeypatch):
+    from src.config import config
+
+    monkeypatch.setattr(config, "SEARCH_MODE", "hybrid")
+    store = VectorStore(embeddings=fake_embeddings)
+    store.create_vectorstore(DocumentLoader().load_documents(str(_catalog(tmp_path, products_dir)), workers=1))
+    path = str(tmp_path / "index.snapshot")
+    exported = store.export_snapshot(path)
+
+    loaded = VectorStore(embeddings=fake_embeddings)
+    loaded.load_snapshot(path)
+
+    assert exported["chunks"] == len(loaded.bm25) == len(store.bm25)
+    assert loaded.bm25.to_dict() == store.bm25.to_dict()
+    query = "cafetera"
+    assert [doc.page_content for doc in loaded.search(query, k=3, mode="hybrid")] == \
+        [doc.page_content for doc in store.search(query, k=3, mode="hybrid")]
+
+
+def test_snapshot_of_empty_index(tmp_path, numpy_index, fake_embeddings):
+    store = VectorStore(embeddings=fake_embeddings)
+    store.create_vectorstore([])
+    path = str(tmp_path / "index.snapshot")
+
+    assert store.export_snapshot(path)["chunks"] == 0
+    loaded = VectorStore(embeddings=fake_embeddings)
+    loaded.load_snapshot(path)
+    assert loaded.search("cafetera", k=3, mode="vector") == []